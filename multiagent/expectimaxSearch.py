@@ -0,0 +1,435 @@
+# expectimaxSearch.py
+# -------------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+Expectimax search engine shared by the expectimax agents in multiAgents.py.
+
+With the default options the engine runs plain depth-limited expectimax,
+modelling every ghost as choosing uniformly among its legal actions.  The
+optional features trade exactness or generality for speed:
+
+  ghostCache      memoizes ghost action distributions per ghost
+                  configuration, Pacman position and scared flag
+  evalBounds      (low, high) range of the evaluation function; enables
+                  Star1 pruning at chance nodes and Star2 probing of the
+                  Pacman nodes below them
+  minProbability  drops ghost outcomes below this probability
+  sampleWidth     replaces a chance node by a sparse sample of this many
+                  ghost actions
+
+Evaluation functions may optionally provide beginSearch(), called before
+each move, and trackSuccessor(parent, child), called for every generated
+state (see evaluationFeatures.FeatureEvaluator).
+
+The engine keeps node counts and per-move latencies so that different
+configurations can be compared (see compareSearches and the command line
+interface at the bottom of this file).
+"""
+
+import random
+import time
+
+from ghostAgents import RandomGhost
+
+
+class GhostDistributionCache:
+    """
+    Memoizes the action distributions of ghost agents.
+
+    A ghost's distribution only depends on its configuration (position and
+    direction), on Pacman's position and on whether it is scared, so the
+    distribution returned by the ghost agent is stored under that key and
+    reused across the whole search tree and across moves.  Entries are
+    tuples of (action, probability) pairs sorted by decreasing probability.
+
+    Ghosts without an entry in ghostAgents are modelled by ghostType.
+    """
+
+    def __init__(self, ghostAgents=None, ghostType=RandomGhost):
+        self.ghostType = ghostType
+        self.ghostAgents = {}
+        for agent in ghostAgents or []:
+            self.ghostAgents[agent.index] = agent
+        self.table = {}
+        self.hits = 0
+        self.misses = 0
+
+    def getGhostAgent(self, index):
+        if index not in self.ghostAgents:
+            self.ghostAgents[index] = self.ghostType(index)
+        return self.ghostAgents[index]
+
+    def getDistribution(self, state, index):
+        ghostState = state.getGhostState(index)
+        conf = ghostState.configuration
+        key = (index, conf.pos, conf.direction,
+               state.getPacmanPosition(), ghostState.scaredTimer > 0)
+        outcomes = self.table.get(key)
+        if outcomes is None:
+            self.misses += 1
+            dist = self.getGhostAgent(index).getDistribution(state)
+            outcomes = [(action, prob)
+                        for action, prob in dist.items() if prob > 0]
+            outcomes.sort(key=lambda outcome: -outcome[1])
+            outcomes = tuple(outcomes)
+            self.table[key] = outcomes
+        else:
+            self.hits += 1
+        return outcomes
+
+    def clear(self):
+        self.table = {}
+
+
+class ExpectimaxSearch:
+    """
+    Depth-limited expectimax over Pacman (max) and ghost (chance) layers.
+
+    depth counts full plies: every agent moves once per unit of depth, as in
+    MultiAgentSearchAgent.
+    """
+
+    def __init__(self, evaluationFunction, depth=2, ghostCache=None,
+                 evalBounds=None, probe=True, minProbability=0.0,
+                 sampleWidth=0, seed=None):
+        self.setEvaluationFunction(evaluationFunction)
+        self.depth = depth
+        self.ghostCache = ghostCache
+        self.evalBounds = evalBounds
+        self.probe = probe
+        self.minProbability = minProbability
+        self.sampleWidth = sampleWidth
+        self.random = random.Random(seed) if sampleWidth else None
+        self.resetStatistics()
+
+    def setEvaluationFunction(self, evaluationFunction):
+        self.evaluationFunction = evaluationFunction
+        self.beginSearch = getattr(evaluationFunction, 'beginSearch', None)
+        self.trackSuccessor = getattr(evaluationFunction, 'trackSuccessor', None)
+
+    ##############
+    # Statistics #
+    ##############
+
+    def resetStatistics(self):
+        self.nodesExpanded = 0
+        self.nodesGenerated = 0
+        self.leafEvaluations = 0
+        self.cutoffs = 0
+        self.moveTimes = []
+        self.moveNodes = []
+
+    def getStatistics(self):
+        """
+        Returns a dict summarising the work done since the last reset.
+        """
+        numMoves = len(self.moveTimes)
+        stats = {
+            'moves': numMoves,
+            'nodesExpanded': self.nodesExpanded,
+            'nodesGenerated': self.nodesGenerated,
+            'leafEvaluations': self.leafEvaluations,
+            'cutoffs': self.cutoffs,
+            'totalTime': sum(self.moveTimes),
+            'meanMoveTime': sum(self.moveTimes) / numMoves if numMoves else 0.0,
+            'maxMoveTime': max(self.moveTimes) if numMoves else 0.0,
+            'meanMoveNodes': sum(self.moveNodes) / float(numMoves) if numMoves else 0.0,
+        }
+        if self.ghostCache is not None:
+            stats['cacheHits'] = self.ghostCache.hits
+            stats['cacheMisses'] = self.ghostCache.misses
+        return stats
+
+    ##########
+    # Search #
+    ##########
+
+    def getAction(self, gameState):
+        """
+        Returns the expectimax action for Pacman from gameState.
+        """
+        startTime = time.time()
+        startNodes = self.nodesExpanded
+        if self.beginSearch is not None:
+            self.beginSearch()
+        bestAction = None
+        if self.evalBounds is None:
+            bestValue = float('-inf')
+            for action in gameState.getLegalActions(0):
+                value = self.expectValue(
+                    self.successor(gameState, 0, action), 1, self.depth)
+                if value > bestValue:
+                    bestValue, bestAction = value, action
+        else:
+            low, high = self.evalBounds
+            bestValue = low
+            for action in gameState.getLegalActions(0):
+                value = self.starValue(self.successor(
+                    gameState, 0, action), 1, self.depth, bestValue, high)
+                if bestAction is None or value > bestValue:
+                    bestValue, bestAction = value, action
+        self.moveTimes.append(time.time() - startTime)
+        self.moveNodes.append(self.nodesExpanded - startNodes)
+        return bestAction
+
+    def successor(self, state, agentIndex, action):
+        self.nodesGenerated += 1
+        child = state.generateSuccessor(agentIndex, action)
+        if self.trackSuccessor is not None:
+            self.trackSuccessor(state, child)
+        return child
+
+    def evaluate(self, state):
+        self.leafEvaluations += 1
+        value = self.evaluationFunction(state)
+        if self.evalBounds is not None:
+            low, high = self.evalBounds
+            value = min(max(value, low), high)
+        return value
+
+    def nextAgent(self, state, agentIndex, depth):
+        agentIndex += 1
+        if agentIndex == state.getNumAgents():
+            return 0, depth - 1
+        return agentIndex, depth
+
+    def getOutcomes(self, state, agentIndex):
+        """
+        Returns the (action, probability) pairs searched at a chance node,
+        after caching, probability pruning and sparse sampling.
+        """
+        if self.ghostCache is not None:
+            outcomes = self.ghostCache.getDistribution(state, agentIndex)
+        else:
+            actions = state.getLegalActions(agentIndex)
+            if not actions:
+                return ()
+            prob = 1.0 / len(actions)
+            outcomes = tuple((action, prob) for action in actions)
+
+        if self.minProbability > 0:
+            kept = [(a, p) for a, p in outcomes if p >= self.minProbability]
+            if kept and len(kept) < len(outcomes):
+                total = sum(p for a, p in kept)
+                outcomes = tuple((a, p / total) for a, p in kept)
+
+        if 0 < self.sampleWidth < len(outcomes):
+            actions = [a for a, p in outcomes]
+            weights = [p for a, p in outcomes]
+            counts = {}
+            for action in self.random.choices(actions, weights, k=self.sampleWidth):
+                counts[action] = counts.get(action, 0) + 1
+            outcomes = tuple((a, counts[a] / float(self.sampleWidth))
+                             for a in actions if a in counts)
+        return outcomes
+
+    # Plain expectimax
+
+    def value(self, state, agentIndex, depth):
+        if depth == 0 or state.isWin() or state.isLose():
+            return self.evaluate(state)
+        if agentIndex == 0:
+            return self.maxValue(state, depth)
+        return self.expectValue(state, agentIndex, depth)
+
+    def maxValue(self, state, depth):
+        actions = state.getLegalActions(0)
+        if not actions:
+            return self.evaluate(state)
+        self.nodesExpanded += 1
+        return max(self.value(self.successor(state, 0, action), 1, depth)
+                   for action in actions)
+
+    def expectValue(self, state, agentIndex, depth):
+        if depth == 0 or state.isWin() or state.isLose():
+            return self.evaluate(state)
+        outcomes = self.getOutcomes(state, agentIndex)
+        if not outcomes:
+            return self.evaluate(state)
+        self.nodesExpanded += 1
+        nextIndex, nextDepth = self.nextAgent(state, agentIndex, depth)
+        total = 0.0
+        for action, prob in outcomes:
+            total += prob * self.value(self.successor(state, agentIndex, action),
+                                       nextIndex, nextDepth)
+        return total
+
+    # Star1 / Star2 pruning
+    #
+    # Values returned by the windowed search are fail-soft: a value <= alpha
+    # is an upper bound on the true value, a value >= beta a lower bound, and
+    # anything strictly inside the window is exact.
+
+    def starValue(self, state, agentIndex, depth, alpha, beta):
+        if depth == 0 or state.isWin() or state.isLose():
+            return self.evaluate(state)
+        if agentIndex == 0:
+            return self.starMaxValue(state, depth, alpha, beta)
+        return self.starExpectValue(state, agentIndex, depth, alpha, beta)
+
+    def starMaxValue(self, state, depth, alpha, beta, probed=None):
+        """
+        Fail-soft alpha-beta max node.  probed is an optional (action, value)
+        pair whose exact value was already computed by a Star2 probe.
+        """
+        actions = state.getLegalActions(0)
+        if not actions:
+            return self.evaluate(state)
+        self.nodesExpanded += 1
+        best = float('-inf')
+        for action in actions:
+            if probed is not None and action == probed[0]:
+                value = probed[1]
+            else:
+                value = self.starValue(self.successor(state, 0, action), 1, depth,
+                                       max(alpha, best), beta)
+            if value > best:
+                best = value
+                if best >= beta:
+                    self.cutoffs += 1
+                    return best
+        return best
+
+    def starExpectValue(self, state, agentIndex, depth, alpha, beta):
+        outcomes = self.getOutcomes(state, agentIndex)
+        if not outcomes:
+            return self.evaluate(state)
+        self.nodesExpanded += 1
+        low, high = self.evalBounds
+        nextIndex, nextDepth = self.nextAgent(state, agentIndex, depth)
+        children = [(prob, self.successor(state, agentIndex, action))
+                    for action, prob in outcomes]
+
+        # Star2: when the children are Pacman nodes, the value of any one of
+        # their moves is a lower bound on their value.
+        lowerBounds = [low] * len(children)
+        probes = [None] * len(children)
+        if self.probe and nextIndex == 0 and nextDepth > 0:
+            for i, (prob, child) in enumerate(children):
+                if child.isWin() or child.isLose():
+                    continue
+                actions = child.getLegalActions(0)
+                if not actions:
+                    continue
+                value = self.starValue(self.successor(child, 0, actions[0]), 1,
+                                       nextDepth, low, high)
+                lowerBounds[i] = value
+                probes[i] = (actions[0], value)
+            bound = sum(prob * lowerBounds[i]
+                        for i, (prob, child) in enumerate(children))
+            if bound >= beta:
+                self.cutoffs += 1
+                return bound
+
+        # Star1: bound the unsearched remainder by the evaluation range (or
+        # by the probed lower bounds) and narrow each child's window.
+        searched = 0.0
+        remainingLow = sum(prob * lowerBounds[i]
+                           for i, (prob, child) in enumerate(children))
+        remainingProb = 1.0
+        for i, (prob, child) in enumerate(children):
+            remainingLow -= prob * lowerBounds[i]
+            remainingProb -= prob
+            remainingHigh = max(remainingProb, 0.0) * high
+            childAlpha = (alpha - searched - remainingHigh) / prob
+            childBeta = (beta - searched - remainingLow) / prob
+            if nextIndex == 0 and probes[i] is not None and nextDepth > 0:
+                value = self.starMaxValue(child, nextDepth, max(childAlpha, low),
+                                          min(childBeta, high), probes[i])
+            else:
+                value = self.starValue(child, nextIndex, nextDepth,
+                                       max(childAlpha, low), min(childBeta, high))
+            if value <= childAlpha:
+                self.cutoffs += 1
+                return searched + prob * value + remainingHigh
+            if value >= childBeta:
+                self.cutoffs += 1
+                return searched + prob * value + remainingLow
+            searched += prob * value
+        return searched
+
+
+def compareSearches(layoutName='smallClassic', depth=2, numMoves=20,
+                    ghostType='RandomGhost', evalBounds=None,
+                    minProbability=0.0, sampleWidth=0, seed=0):
+    """
+    Plays numMoves Pacman moves with the plain expectimax engine and runs a
+    configured engine on the same states, printing node counts, per-move
+    latency and how often the two engines agree on the chosen action.
+    """
+    import ghostAgents
+    import layout
+    import pacman
+    import multiAgents
+
+    random.seed(seed)
+    lay = layout.getLayout(layoutName)
+    ghostClass = getattr(ghostAgents, ghostType)
+    ghosts = [ghostClass(i + 1) for i in range(lay.getNumGhosts())]
+    evalFn = multiAgents.scoreEvaluationFunction
+
+    baseline = ExpectimaxSearch(evalFn, depth)
+    candidate = ExpectimaxSearch(evalFn, depth, GhostDistributionCache(ghosts),
+                                 evalBounds, minProbability=minProbability,
+                                 sampleWidth=sampleWidth, seed=seed)
+
+    state = pacman.GameState()
+    state.initialize(lay, len(ghosts))
+    agreements = 0
+    moves = 0
+    while moves < numMoves and not (state.isWin() or state.isLose()):
+        action = baseline.getAction(state)
+        if candidate.getAction(state) == action:
+            agreements += 1
+        moves += 1
+        state = state.generateSuccessor(0, action)
+        for ghost in ghosts:
+            if state.isWin() or state.isLose():
+                break
+            state = state.generateSuccessor(ghost.index, ghost.getAction(state))
+
+    for name, engine in [('baseline', baseline), ('candidate', candidate)]:
+        stats = engine.getStatistics()
+        print('%-10s nodes/move %10.1f  generated %9d  mean %.4fs  max %.4fs' % (
+            name, stats['meanMoveNodes'], stats['nodesGenerated'],
+            stats['meanMoveTime'], stats['maxMoveTime']))
+    candidateStats = candidate.getStatistics()
+    print('ghost cache hits/misses: %d/%d' % (
+        candidateStats['cacheHits'], candidateStats['cacheMisses']))
+    print('agreement with baseline: %d/%d moves' % (agreements, moves))
+    return baseline.getStatistics(), candidateStats
+
+
+if __name__ == '__main__':
+    """
+    Compares the plain expectimax engine against a cached/pruned one:
+
+    > python expectimaxSearch.py -l smallClassic -d 2 --evalMin -1000 --evalMax 2000
+    """
+    from optparse import OptionParser
+    parser = OptionParser()
+    parser.add_option('-l', '--layout', dest='layout', default='smallClassic')
+    parser.add_option('-d', '--depth', dest='depth', type='int', default=2)
+    parser.add_option('-n', '--numMoves', dest='numMoves', type='int', default=20)
+    parser.add_option('-g', '--ghosts', dest='ghost', default='RandomGhost')
+    parser.add_option('--evalMin', dest='evalMin', type='float', default=None)
+    parser.add_option('--evalMax', dest='evalMax', type='float', default=None)
+    parser.add_option('--minProb', dest='minProb', type='float', default=0.0)
+    parser.add_option('--sampleWidth', dest='sampleWidth', type='int', default=0)
+    options, otherjunk = parser.parse_args()
+    bounds = None
+    if options.evalMin is not None and options.evalMax is not None:
+        bounds = (options.evalMin, options.evalMax)
+    compareSearches(options.layout, options.depth, options.numMoves,
+                    options.ghost, bounds, options.minProb, options.sampleWidth)
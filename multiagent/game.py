@@ -565,6 +565,8 @@ class Game:
         self.agentTimeout = False
         import io
         self.agentOutput = [io.StringIO() for agent in agents]
+        # Optional gameProfiler.GameProfiler collecting timings for this game
+        self.profiler = None
 
     def getProgress(self):
         if self.gameOver:
@@ -605,7 +607,23 @@ class Game:
         """
         Main control loop for game play.
         """
+        profiler = self.profiler
+        if profiler is None:
+            self._runGame(None)
+            return
+        profiler.startGame(self.agents)
+        # An agent crash ends the game early, which still ends its profile
+        try:
+            self._runGame(profiler)
+        finally:
+            profiler.endGame()
+
+    def _runGame(self, profiler):
+        if profiler is not None:
+            start = profiler.clock()
         self.display.initialize(self.state.data)
+        if profiler is not None:
+            profiler.record('display', start)
         self.numMoves = 0
 
         # self.display.initialize(self.state.makeObservation(1).data)
@@ -622,6 +640,8 @@ class Game:
                 return
             if ("registerInitialState" in dir(agent)):
                 self.mute(i)
+                if profiler is not None:
+                    token = profiler.startAgent()
                 if self.catchExceptions:
                     try:
                         timed_func = TimeoutFunction(
@@ -644,6 +664,8 @@ class Game:
                         return
                 else:
                     agent.registerInitialState(self.state.deepCopy())
+                if profiler is not None:
+                    profiler.endAgent(i, 'registerInitialState', token)
                 # TODO: could this exceed the total time
                 self.unmute()
 
@@ -658,6 +680,8 @@ class Game:
             # Generate an observation of the state
             if 'observationFunction' in dir(agent):
                 self.mute(agentIndex)
+                if profiler is not None:
+                    token = profiler.startAgent()
                 if self.catchExceptions:
                     try:
                         timed_func = TimeoutFunction(agent.observationFunction, int(
@@ -676,6 +700,8 @@ class Game:
                 else:
                     observation = agent.observationFunction(
                         self.state.deepCopy())
+                if profiler is not None:
+                    profiler.endAgent(agentIndex, 'observationFunction', token)
                 self.unmute()
             else:
                 observation = self.state.deepCopy()
@@ -683,6 +709,8 @@ class Game:
             # Solicit an action
             action = None
             self.mute(agentIndex)
+            if profiler is not None:
+                token = profiler.startAgent()
             if self.catchExceptions:
                 try:
                     timed_func = TimeoutFunction(agent.getAction, int(
@@ -730,10 +758,14 @@ class Game:
                     return
             else:
                 action = agent.getAction(observation)
+            if profiler is not None:
+                profiler.endAgent(agentIndex, 'getAction', token)
             self.unmute()
 
             # Execute the action
             self.moveHistory.append((agentIndex, action))
+            if profiler is not None:
+                start = profiler.clock()
             if self.catchExceptions:
                 try:
                     self.state = self.state.generateSuccessor(
@@ -745,14 +777,22 @@ class Game:
                     return
             else:
                 self.state = self.state.generateSuccessor(agentIndex, action)
+            if profiler is not None:
+                profiler.record('generateSuccessor', start)
+                start = profiler.clock()
 
             # Change the display
             self.display.update(self.state.data)
             ###idx = agentIndex - agentIndex % 2 + 1
             ###self.display.update( self.state.makeObservation(idx).data )
+            if profiler is not None:
+                profiler.record('display', start)
+                start = profiler.clock()
 
             # Allow for game specific conditions (winning, losing, etc.)
             self.rules.process(self.state, self)
+            if profiler is not None:
+                profiler.record('rules', start)
             # Track progress
             if agentIndex == numAgents + 1:
                 self.numMoves += 1
@@ -767,7 +807,11 @@ class Game:
             if "final" in dir(agent):
                 try:
                     self.mute(agentIndex)
+                    if profiler is not None:
+                        token = profiler.startAgent()
                     agent.final(self.state)
+                    if profiler is not None:
+                        profiler.endAgent(agentIndex, 'final', token)
                     self.unmute()
                 except Exception as data:
                     if not self.catchExceptions:
@@ -775,4 +819,8 @@ class Game:
                     self._agentCrash(agentIndex)
                     self.unmute()
                     return
+        if profiler is not None:
+            start = profiler.clock()
         self.display.finish()
+        if profiler is not None:
+            profiler.record('display', start)
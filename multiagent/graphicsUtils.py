@@ -32,6 +32,9 @@ _canvas_y = None
 _canvas_col = None      # Current colour (set to black below)
 _canvas_tsize = 12
 _canvas_tserifs = 0
+_use_recording_canvas = False  # Draw on a RecordingCanvas instead of Tk
+_recording_canvas = None  # The last RecordingCanvas, kept after end_graphics
+_batch_depth = 0      # > 0 while canvas updates are being batched
 
 
 def formatColor(r, g, b):
@@ -62,17 +65,24 @@ def sleep(secs):
 def begin_graphics(width=640, height=480, color=formatColor(0, 0, 0), title=None):
 
     global _root_window, _canvas, _canvas_x, _canvas_y, _canvas_xs, _canvas_ys, _bg_color
+    global _recording_canvas
 
     # Check for duplicate call
     if _root_window is not None:
         # Lose the window.
         _root_window.destroy()
+        _root_window = None
 
     # Save the canvas size parameters
     _canvas_xs, _canvas_ys = width - 1, height - 1
     _canvas_x, _canvas_y = 0, _canvas_ys
     _bg_color = color
 
+    if _use_recording_canvas:
+        _canvas = _recording_canvas = RecordingCanvas(width, height)
+        draw_background()
+        return
+
     # Create the root window
     _root_window = tkinter.Tk()
     _root_window.protocol('WM_DELETE_WINDOW', _destroy_window)
@@ -160,8 +170,8 @@ def end_graphics():
     global _root_window, _canvas, _mouse_enabled
     try:
         try:
-            sleep(1)
             if _root_window != None:
+                sleep(1)
                 _root_window.destroy()
         except SystemExit as e:
             print('Ending graphics raised an exception:', e)
@@ -223,7 +233,30 @@ def image(pos, file="../../blueghost.gif"):
 
 
 def refresh():
-    _canvas.update_idletasks()
+    if _batch_depth == 0:
+        _canvas.update_idletasks()
+
+
+def begin_batch():
+    """
+    Defers refreshes and event processing until the matching end_batch, so
+    that all canvas changes of one frame reach the screen together.
+    """
+    global _batch_depth
+    _batch_depth += 1
+
+
+def end_batch():
+    global _batch_depth
+    _batch_depth -= 1
+    if _batch_depth == 0:
+        _canvas.update_idletasks()
+        _do_one_event(tkinter._tkinter.DONT_WAIT)
+
+
+def _do_one_event(arg):
+    if _root_window is not None and _batch_depth == 0:
+        _root_window.dooneevent(arg)
 
 
 def moveCircle(id, pos, r, endpoints=None):
@@ -354,7 +387,7 @@ def wait_for_keys():
 
 
 def remove_from_screen(x,
-                       d_o_e=lambda arg: _root_window.dooneevent(arg),
+                       d_o_e=_do_one_event,
                        d_w=tkinter._tkinter.DONT_WAIT):
     _canvas.delete(x)
     d_o_e(d_w)
@@ -368,7 +401,7 @@ def _adjust_coords(coord_list, x, y):
 
 
 def move_to(object, x, y=None,
-            d_o_e=lambda arg: _root_window.dooneevent(arg),
+            d_o_e=_do_one_event,
             d_w=tkinter._tkinter.DONT_WAIT):
     if y is None:
         try:
@@ -378,8 +411,9 @@ def move_to(object, x, y=None,
 
     horiz = True
     newCoords = []
-    current_x, current_y = _canvas.coords(object)[0:2]  # first point
-    for coord in _canvas.coords(object):
+    coords = _canvas.coords(object)
+    current_x, current_y = coords[0:2]  # first point
+    for coord in coords:
         if horiz:
             inc = x - current_x
         else:
@@ -393,7 +427,7 @@ def move_to(object, x, y=None,
 
 
 def move_by(object, x, y=None,
-            d_o_e=lambda arg: _root_window.dooneevent(arg),
+            d_o_e=_do_one_event,
             d_w=tkinter._tkinter.DONT_WAIT, lift=False):
     if y is None:
         try:
@@ -418,6 +452,97 @@ def move_by(object, x, y=None,
         _canvas.tag_raise(object)
 
 
+class RecordingCanvas:
+    """
+    Stand-in for tkinter.Canvas that keeps drawn items in memory and logs
+    every call instead of rendering, so displays can run and be inspected
+    without a window.  Enable it with use_recording_canvas() before
+    begin_graphics; the last one created is returned by
+    get_recording_canvas(), also after end_graphics.
+
+    items maps item ids to {'type', 'coords', 'options'} and calls holds
+    (method name, item id or None) pairs in call order.
+    """
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.items = {}
+        self.calls = []
+        self.nextId = 1
+
+    def _create(self, kind, coords, options):
+        id = self.nextId
+        self.nextId += 1
+        self.items[id] = {'type': kind, 'coords': list(coords), 'options': dict(options)}
+        self.calls.append(('create_' + kind, id))
+        return id
+
+    def create_polygon(self, coords, **options):
+        return self._create('polygon', coords, options)
+
+    def create_arc(self, x0, y0, x1, y1, **options):
+        return self._create('arc', [x0, y0, x1, y1], options)
+
+    def create_line(self, x0, y0, x1, y1, **options):
+        return self._create('line', [x0, y0, x1, y1], options)
+
+    def create_text(self, x, y, **options):
+        return self._create('text', [x, y], options)
+
+    def create_image(self, x, y, **options):
+        return self._create('image', [x, y], options)
+
+    def coords(self, id, *coords):
+        if not coords:
+            self.calls.append(('coords', id))
+            return list(self.items[id]['coords'])
+        self.calls.append(('move', id))
+        self.items[id]['coords'] = list(coords)
+
+    def itemconfigure(self, id, **options):
+        self.calls.append(('itemconfigure', id))
+        self.items[id]['options'].update(options)
+
+    def delete(self, id):
+        self.calls.append(('delete', id))
+        if id == 'all':
+            self.items = {}
+        else:
+            self.items.pop(id, None)
+
+    def tag_lower(self, id, *below):
+        self.calls.append(('tag_lower', id))
+
+    def tag_raise(self, id, *above):
+        self.calls.append(('tag_raise', id))
+
+    def update(self):
+        self.calls.append(('update', None))
+
+    def update_idletasks(self):
+        self.calls.append(('update', None))
+
+    def postscript(self, **options):
+        return ''
+
+    def countCalls(self, method):
+        return len([call for call in self.calls if call[0] == method])
+
+    def resetCalls(self):
+        self.calls = []
+
+
+def use_recording_canvas(enabled=True):
+    "Makes later begin_graphics calls draw on a RecordingCanvas."
+    global _use_recording_canvas
+    _use_recording_canvas = enabled
+
+
+def get_recording_canvas():
+    return _recording_canvas
+
+
 def writePostscript(filename):
     "Writes the current canvas to a postscript file."
     psfile = file(filename, 'w')
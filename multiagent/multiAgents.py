@@ -18,6 +18,9 @@ import random, util
 
 from game import Agent
 from pacman import GameState
+import evaluationFeatures
+import expectimaxSearch
+import ghostAgents
 
 class ReflexAgent(Agent):
     """
@@ -28,7 +31,7 @@ class ReflexAgent(Agent):
     it in any way you see fit, so long as you don't touch our method
     headers.
     """
-
+    evaluator = None
 
     def getAction(self, gameState: GameState):
         """
@@ -41,6 +44,8 @@ class ReflexAgent(Agent):
         """
         # Collect legal moves and successor states
         legalMoves = gameState.getLegalActions()
+        # A fresh evaluator, so its caches only last for this move
+        self.evaluator = evaluationFeatures.FeatureEvaluator(REFLEX_WEIGHTS)
 
         # Choose one of the best actions
         scores = [self.evaluationFunction(gameState, action) for action in legalMoves]
@@ -59,23 +64,22 @@ class ReflexAgent(Agent):
         The evaluation function takes in the current and proposed successor
         GameStates (pacman.py) and returns a number, where higher numbers are better.
 
-        The code below extracts some useful information from the state, like the
-        remaining food (newFood) and Pacman position after moving (newPos).
-        newScaredTimes holds the number of moves that each ghost will remain
-        scared because of Pacman having eaten a power pellet.
-
-        Print out these variables to see what you're getting, then combine them
-        to create a masterful evaluation function.
+        This one scores the successor with the features in REFLEX_WEIGHTS (see
+        evaluationFeatures.py), using the evaluator getAction made for the
+        current move.
         """
-        # Useful information you can extract from a GameState (pacman.py)
+        if self.evaluator is None:
+            self.evaluator = evaluationFeatures.FeatureEvaluator(REFLEX_WEIGHTS)
         successorGameState = currentGameState.generatePacmanSuccessor(action)
-        newPos = successorGameState.getPacmanPosition()
-        newFood = successorGameState.getFood()
-        newGhostStates = successorGameState.getGhostStates()
-        newScaredTimes = [ghostState.scaredTimer for ghostState in newGhostStates]
+        self.evaluator.trackSuccessor(currentGameState, successorGameState)
+        return self.evaluator(successorGameState)
 
-        "*** YOUR CODE HERE ***"
-        return successorGameState.getScore()
+REFLEX_WEIGHTS = {
+    'score': 1.0,
+    'inverse-closest-food': 10.0,
+    '#-of-ghosts-1-step-away': -200.0,
+    'scared-ghosts': 50.0,
+}
 
 def scoreEvaluationFunction(currentGameState: GameState):
     """
@@ -107,6 +111,17 @@ class MultiAgentSearchAgent(Agent):
         self.evaluationFunction = util.lookup(evalFn, globals())
         self.depth = int(depth)
 
+    def getEvaluator(self):
+        """
+        The evaluation function to search one move with.  Functions backed by
+        declared features (FEATURE_WEIGHTS) get a FeatureEvaluator of their
+        own, whose caches last for that move only.
+        """
+        weights = FEATURE_WEIGHTS.get(self.evaluationFunction)
+        if weights is None:
+            return self.evaluationFunction
+        return evaluationFeatures.FeatureEvaluator(weights)
+
 class MinimaxAgent(MultiAgentSearchAgent):
     """
     Your minimax agent (question 2)
@@ -162,18 +177,73 @@ class ExpectimaxAgent(MultiAgentSearchAgent):
         All ghosts should be modeled as choosing uniformly at random from their
         legal moves.
         """
-        "*** YOUR CODE HERE ***"
-        util.raiseNotDefined()
+        search = expectimaxSearch.ExpectimaxSearch(self.getEvaluator(), self.depth)
+        return search.getAction(gameState)
+
+class CachedExpectimaxAgent(MultiAgentSearchAgent):
+    """
+    An expectimax agent that memoizes ghost action distributions and can
+    prune chance nodes (see expectimaxSearch.py).
+
+    Extra options, passed with -a:
+      ghost        ghost agent class in ghostAgents.py used as the ghost model
+      evalMin/Max  known range of the evaluation function; enables Star1/Star2
+      minProb      ignore ghost moves less likely than this
+      sampleWidth  sparse-sample this many ghost moves per chance node
+
+    The engine is kept across moves, so its statistics (getStatistics) cover
+    the whole game.
+    """
+
+    def __init__(self, evalFn = 'scoreEvaluationFunction', depth = '2', ghost = 'RandomGhost',
+                 evalMin = None, evalMax = None, minProb = '0', sampleWidth = '0'):
+        MultiAgentSearchAgent.__init__(self, evalFn, depth)
+        self.ghostCache = expectimaxSearch.GhostDistributionCache(
+            ghostType=getattr(ghostAgents, ghost))
+        evalBounds = None
+        if evalMin is not None and evalMax is not None:
+            evalBounds = (float(evalMin), float(evalMax))
+        self.search = expectimaxSearch.ExpectimaxSearch(
+            self.evaluationFunction, self.depth, self.ghostCache, evalBounds,
+            minProbability=float(minProb), sampleWidth=int(sampleWidth))
+
+    def registerInitialState(self, gameState: GameState):
+        self.ghostCache.clear()
+
+    def getAction(self, gameState: GameState):
+        self.search.depth = self.depth
+        self.search.setEvaluationFunction(self.getEvaluator())
+        return self.search.getAction(gameState)
+
+    def getStatistics(self):
+        return self.search.getStatistics()
 
 def betterEvaluationFunction(currentGameState: GameState):
     """
     Your extreme ghost-hunting, pellet-nabbing, food-gobbling, unstoppable
     evaluation function (question 5).
 
-    DESCRIPTION: <write something here so we know what you did>
+    DESCRIPTION: a weighted sum of the features declared in
+    evaluationFeatures.py: the game score, the inverse maze distance to the
+    closest food and capsule, a bonus for scared ghosts within reach and a
+    penalty for active ghosts next to Pacman.  Maze distances come from
+    per-layout tables; searches evaluate with a FeatureEvaluator per move
+    (MultiAgentSearchAgent.getEvaluator), which also caches leaf values.
     """
-    "*** YOUR CODE HERE ***"
-    util.raiseNotDefined()
+    return evaluationFeatures.FeatureEvaluator(BETTER_WEIGHTS).evaluate(currentGameState)
+
+BETTER_WEIGHTS = {
+    'score': 1.0,
+    'inverse-closest-food': 10.0,
+    'inverse-closest-capsule': 20.0,
+    'capsule-count': -20.0,
+    'scared-ghosts': 100.0,
+    '#-of-ghosts-1-step-away': -100.0,
+}
+
+# The weights behind evaluation functions that are weighted sums of
+# declared features
+FEATURE_WEIGHTS = {betterEvaluationFunction: BETTER_WEIGHTS}
 
 # Abbreviation
 better = betterEvaluationFunction
@@ -58,6 +58,54 @@ import os
 ###################################################
 
 
+class StateTracker:
+    """
+    Records the states generated by GameState.generateSuccessor while it is
+    active.  With retain=True the parent and child of every transition are
+    kept in a set (the autograder compares the number of distinct states an
+    agent explores); with retain=False only the number of generated
+    successors is counted.
+
+    Trackers are only consulted while active, so normal play pays nothing:
+
+        with GameState.trackStates() as tracker:
+            agent.getAction(state)
+        numExplored = len(tracker.getStates())
+    """
+
+    def __init__(self, retain=True):
+        self.retain = retain
+        self.states = set()
+        self.count = 0
+
+    def record(self, parent, child):
+        self.count += 1
+        if self.retain:
+            self.states.add(parent)
+            self.states.add(child)
+
+    def getCount(self):
+        return self.count
+
+    def getStates(self):
+        return self.states
+
+    def start(self):
+        GameState.trackers.append(self)
+        return self
+
+    def stop(self):
+        if self in GameState.trackers:
+            GameState.trackers.remove(self)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
+
+
 class GameState:
     """
     A GameState specifies the full game state, including the food, capsules,
@@ -77,20 +125,21 @@ class GameState:
     # Accessor methods: use these to access state data #
     ####################################################
 
-    # static variable keeps track of which states have had getLegalActions called
-    explored = set()
+    # static variable holds the active StateTrackers (see trackStates)
+    trackers = []
 
-    def getAndResetExplored():
-        tmp = GameState.explored.copy()
-        GameState.explored = set()
-        return tmp
-    getAndResetExplored = staticmethod(getAndResetExplored)
+    def trackStates(retain=True):
+        """
+        Returns a StateTracker to use as a context manager around the code
+        whose generated states should be recorded.
+        """
+        return StateTracker(retain)
+    trackStates = staticmethod(trackStates)
 
     def getLegalActions(self, agentIndex=0):
         """
         Returns the legal actions for the agent specified.
         """
-#        GameState.explored.add(self)
         if self.isWin() or self.isLose():
             return []
 
@@ -129,8 +178,8 @@ class GameState:
         # Book keeping
         state.data._agentMoved = agentIndex
         state.data.score += state.data.scoreChange
-        GameState.explored.add(self)
-        GameState.explored.add(state)
+        for tracker in GameState.trackers:
+            tracker.record(self, state)
         return state
 
     def getLegalPacmanActions(self):
@@ -550,10 +599,20 @@ def readCommand(argv):
                       help=default('How many episodes are training (suppresses output)'), default=0)
     parser.add_option('--frameTime', dest='frameTime', type='float',
                       help=default('Time to delay between frames; <0 means keyboard'), default=0.1)
+    parser.add_option('--frameSkip', dest='frameSkip', type='int',
+                      help=default('Only draw every K-th move; the game runs at full speed'), metavar='K', default=1)
+    parser.add_option('--fps', dest='fps', type='float',
+                      help='Draw at most this many frames per second; the game runs at full speed', default=None)
     parser.add_option('-c', '--catchExceptions', action='store_true', dest='catchExceptions',
                       help='Turns on exception handling and timeouts during games', default=False)
     parser.add_option('--timeout', dest='timeout', type='int',
                       help=default('Maximum length of time an agent can spend computing in a single game'), default=30)
+    parser.add_option('--profile', action='store_true', dest='profile',
+                      help='Time agents and the game loop and print a summary', default=False)
+    parser.add_option('--profileOutput', dest='profileOutput',
+                      help='Write the --profile statistics to this JSON file', metavar='FILE', default=None)
+    parser.add_option('--flamegraph', dest='flamegraph',
+                      help='Sample the call stack and write collapsed stacks to FILE', metavar='FILE', default=None)
 
     options, otherjunk = parser.parse_args(argv)
     if len(otherjunk) != 0:
@@ -601,11 +660,16 @@ def readCommand(argv):
     else:
         import graphicsDisplay
         args['display'] = graphicsDisplay.PacmanGraphics(
-            options.zoom, frameTime=options.frameTime)
+            options.zoom, frameTime=options.frameTime, frameSkip=options.frameSkip, fps=options.fps)
     args['numGames'] = options.numGames
     args['record'] = options.record
     args['catchExceptions'] = options.catchExceptions
     args['timeout'] = options.timeout
+    if options.profile or options.profileOutput:
+        import gameProfiler
+        args['profiler'] = gameProfiler.GameProfiler()
+        args['profileOutput'] = options.profileOutput
+    args['flamegraph'] = options.flamegraph
 
     # Special case: recorded games don't use the runGames method or args structure
     if options.gameToReplay != None:
@@ -672,13 +736,25 @@ def replayGame(layout, actions, display):
     display.finish()
 
 
-def runGames(layout, pacman, ghosts, display, numGames, record, numTraining=0, catchExceptions=False, timeout=30):
+def runGames(layout, pacman, ghosts, display, numGames, record, numTraining=0, catchExceptions=False, timeout=30,
+             profiler=None, profileOutput=None, flamegraph=None):
     import __main__
     __main__.__dict__['_display'] = display
 
     rules = ClassicGameRules(timeout)
     games = []
 
+    tracker = None
+    if profiler is not None:
+        tracker = GameState.trackStates(retain=False).start()
+        profiler.stateCounter = tracker.getCount
+
+    sampler = None
+    if flamegraph:
+        import gameProfiler
+        sampler = gameProfiler.SamplingProfiler()
+        sampler.start()
+
     for i in range(numGames):
         beQuiet = i < numTraining
         if beQuiet:
@@ -691,6 +767,7 @@ def runGames(layout, pacman, ghosts, display, numGames, record, numTraining=0, c
             rules.quiet = False
         game = rules.newGame(layout, pacman, ghosts,
                              gameDisplay, beQuiet, catchExceptions)
+        game.profiler = profiler
         game.run()
         if not beQuiet:
             games.append(game)
@@ -716,6 +793,15 @@ def runGames(layout, pacman, ghosts, display, numGames, record, numTraining=0, c
         print('Record:       ', ', '.join(
             [['Loss', 'Win'][int(w)] for w in wins]))
 
+    if sampler is not None:
+        sampler.stop()
+        sampler.writeCollapsed(flamegraph)
+    if profiler is not None:
+        tracker.stop()
+        profiler.printSummary()
+        if profileOutput:
+            profiler.writeJSON(profileOutput)
+
     return games
 
 
@@ -0,0 +1,218 @@
+# agentCheckpoint.py
+# ------------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+Saving and loading learned ReinforcementAgents.
+
+A checkpoint holds what an agent has learned and where it is in training:
+its weights (agents with getWeights, such as ApproximateQAgent) or
+Q-values (agents with a qValues table), its episode counters and
+epsilon/alpha/discount, and the state of the random module, which drives
+exploration and the ghosts.  Replay buffers are not saved.
+
+Loading restores the table, the episode counters and the random state.
+The agent keeps the numTraining, epsilon, alpha and discount it was
+constructed with (from -x and -a on the command line), so a run resumed
+with more training games keeps learning.  The saved hyperparameters are
+for reference only.
+
+Keys (feature names, or (state, action) pairs whose states may be Pacman
+GameStates) are pickled.  They are unpickled with only plain data and the
+game's own state classes allowed (see KEY_CLASSES), which keeps a crafted
+file from naming arbitrary callables.  Even so, only load checkpoints from
+sources you trust.
+
+File layout (little-endian), version 1:
+
+  header    '<4sHB'   magic b'QCKP', version, kind (0 weights, 1 Q-values)
+  counters  '<qqdddddd' episodesSoFar, numTraining, accumTrainRewards,
+                      accumTestRewards, epsilon, alpha, discount, reserved
+  random    '<iB'     random state version, has gauss; then 625 '<I'
+                      words and a '<d' gauss value
+  keys      '<Q'      length, then the zlib-compressed pickle of the list
+                      of keys (feature names, or (state, action) pairs)
+  values    '<Q'      count, then that many '<f8' values, one per key
+  checksum  '<I'      CRC-32 of everything before it
+
+saveAgent writes to a temporary file next to the target and renames it
+into place, so an interrupted save never leaves a truncated checkpoint.
+
+From the command line:
+
+> python pacman.py -p ApproximateQAgent -a extractor=SimpleExtractor -x 2000 -n 2010 -l mediumClassic -q --checkpoint agent.qck --checkpointEvery 100
+> python pacman.py -p ApproximateQAgent -a extractor=SimpleExtractor -x 2000 -n 2010 -l mediumClassic -q --resume agent.qck
+"""
+
+import io
+import os
+import pickle
+import random
+import struct
+import sys
+import tempfile
+import zlib
+
+import numpy as np
+
+MAGIC = b'QCKP'
+VERSION = 1
+WEIGHTS, QVALUES = 0, 1
+
+HEADER = struct.Struct('<4sHB')
+COUNTERS = struct.Struct('<qqdddddd')
+RANDOM = struct.Struct('<iB625Id')
+LENGTH = struct.Struct('<Q')
+CHECKSUM = struct.Struct('<I')
+
+# The only classes a checkpoint's keys may hold.  pacman.py pickles its
+# GameState as __main__.GameState when it is run as a script; elsewhere
+# that is read as pacman.GameState.
+KEY_CLASSES = set([
+    ('game', 'AgentState'), ('game', 'Configuration'), ('game', 'GameStateData'),
+    ('game', 'Grid'), ('layout', 'Layout'),
+    ('pacman', 'GameState'), ('__main__', 'GameState'),
+])
+
+
+class KeyUnpickler(pickle.Unpickler):
+    " Unpickles checkpoint keys, refusing any class not in KEY_CLASSES "
+
+    def find_class(self, module, name):
+        if (module, name) not in KEY_CLASSES:
+            raise pickle.UnpicklingError('Checkpoint keys may not refer to %s.%s' % (module, name))
+        if module == '__main__' and not hasattr(sys.modules['__main__'], name):
+            module = 'pacman'
+        return pickle.Unpickler.find_class(self, module, name)
+
+
+def decodeKeys(data):
+    return KeyUnpickler(io.BytesIO(zlib.decompress(data))).load()
+
+
+def getTable(agent):
+    """
+    Returns (kind, table) for the learned table of agent.
+    """
+    if hasattr(agent, 'getWeights'):
+        return WEIGHTS, agent.getWeights()
+    if hasattr(agent, 'qValues'):
+        return QVALUES, agent.qValues
+    raise Exception('Agent %s has neither weights nor Q-values to save' % type(agent).__name__)
+
+
+def encodeRandomState(state):
+    version, words, gauss = state
+    return RANDOM.pack(version, gauss is not None, *words, 0.0 if gauss is None else gauss)
+
+
+def decodeRandomState(data):
+    fields = RANDOM.unpack(data)
+    version, hasGauss, words, gauss = fields[0], fields[1], fields[2:-1], fields[-1]
+    return version, tuple(words), gauss if hasGauss else None
+
+
+def dumps(agent):
+    """
+    The checkpoint of agent as bytes.
+    """
+    kind, table = getTable(agent)
+    items = list(table.items())
+    keys = zlib.compress(pickle.dumps([key for key, _ in items], pickle.HIGHEST_PROTOCOL))
+    values = np.array([value for _, value in items], dtype='<f8')
+    parts = [
+        HEADER.pack(MAGIC, VERSION, kind),
+        COUNTERS.pack(agent.episodesSoFar, agent.numTraining,
+                      agent.accumTrainRewards, agent.accumTestRewards,
+                      agent.epsilon, agent.alpha, agent.discount, 0.0),
+        encodeRandomState(random.getstate()),
+        LENGTH.pack(len(keys)), keys,
+        LENGTH.pack(len(values)), values.tobytes(),
+    ]
+    data = b''.join(parts)
+    return data + CHECKSUM.pack(zlib.crc32(data))
+
+
+def loads(agent, data, restoreRandom=True):
+    """
+    Restores agent's table and episode counters (and, unless restoreRandom
+    is false, the random module) from checkpoint bytes.  The agent must be
+    of the kind that was saved; its hyperparameters are left alone.
+    """
+    if len(data) < HEADER.size + CHECKSUM.size:
+        raise Exception('Checkpoint is truncated')
+    body, (checksum,) = data[:-CHECKSUM.size], CHECKSUM.unpack(data[-CHECKSUM.size:])
+    if zlib.crc32(body) != checksum:
+        raise Exception('Checkpoint is corrupt (checksum mismatch)')
+    magic, version, kind = HEADER.unpack_from(body, 0)
+    if magic != MAGIC:
+        raise Exception('Not an agent checkpoint')
+    if version != VERSION:
+        raise Exception('Unsupported checkpoint version %d (expected %d)' % (version, VERSION))
+    expected, table = getTable(agent)
+    if kind != expected:
+        raise Exception('Checkpoint holds %s but the agent learns %s' % (
+            ['weights', 'Q-values'][kind], ['weights', 'Q-values'][expected]))
+
+    offset = HEADER.size
+    counters = COUNTERS.unpack_from(body, offset)
+    offset += COUNTERS.size
+    randomState = decodeRandomState(body[offset:offset + RANDOM.size])
+    offset += RANDOM.size
+    (length,) = LENGTH.unpack_from(body, offset)
+    offset += LENGTH.size
+    keys = decodeKeys(body[offset:offset + length])
+    offset += length
+    (count,) = LENGTH.unpack_from(body, offset)
+    offset += LENGTH.size
+    values = np.frombuffer(body, dtype='<f8', count=count, offset=offset)
+    if count != len(keys):
+        raise Exception('Checkpoint is corrupt (%d keys, %d values)' % (len(keys), count))
+
+    for key, value in zip(keys, values.tolist()):
+        table[key] = value
+    agent.episodesSoFar, _, agent.accumTrainRewards, agent.accumTestRewards = counters[:4]
+    if agent.episodesSoFar >= agent.numTraining:
+        # As stopEpisode does once training is over
+        agent.epsilon = 0.0
+        agent.alpha = 0.0
+    if restoreRandom:
+        random.setstate(randomState)
+
+
+def saveAgent(agent, path):
+    """
+    Atomically writes the checkpoint of agent to path.
+    """
+    data = dumps(agent)
+    directory = os.path.dirname(os.path.abspath(path))
+    handle, temporary = tempfile.mkstemp(prefix='.checkpoint-', dir=directory)
+    try:
+        # mkstemp creates the file private; give it the usual permissions.
+        umask = os.umask(0)
+        os.umask(umask)
+        os.chmod(temporary, 0o666 & ~umask)
+        with os.fdopen(handle, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary, path)
+    except BaseException:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+        raise
+
+
+def loadAgent(agent, path, restoreRandom=True):
+    with open(path, 'rb') as f:
+        loads(agent, f.read(), restoreRandom)
@@ -0,0 +1,237 @@
+# batchGridworld.py
+# -----------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+Vectorized gridworld episodes for fast tabular Q-learning.
+
+BatchGridworldEnvironment runs K independent episodes of a Gridworld at
+once.  States and actions are the integer ids of the compiled MDP (see
+mdpCompiler.py); each step samples all K successors from a precomputed
+cumulative transition table, in the same way as
+GridworldEnvironment.getRandomNextState.
+
+BatchQLearner keeps Q-values in a dense [state, action] array and applies
+the QLearningAgent rules to a whole batch: epsilon-greedy choice with
+random tie breaking among the best actions, and
+Q(s,a) <- (1 - alpha) Q(s,a) + alpha (r + discount * max_a' Q(s',a')).
+Transitions of one step are applied as if one after another in episode
+order; the only difference from K sequential QLearningAgent updates is
+that every sample in the step reads next-state values from before it.
+
+From the command line (see gridworld.py):
+
+> python gridworld.py -a q -k 100000 -b 64 -g BridgeGrid
+"""
+
+import numpy as np
+
+import mdpCompiler
+import util
+
+
+class BatchGridworldEnvironment:
+    """
+    K gridworld episodes stepped together.  self.states holds the current
+    state id of every episode.
+    """
+
+    def __init__(self, gridworld, numEnvs, seed=None, compiled=None):
+        if compiled is None:
+            compiled = mdpCompiler.compileMDP(gridworld)
+        self.compiled = compiled
+        self.numEnvs = numEnvs
+        self.random = np.random.default_rng(seed)
+        self.startState = compiled.getStateId(gridworld.getStartState())
+        self.done = compiled.fixed
+
+        # Successor table padded to the widest row: next state, reward and
+        # cumulative probability per (row, k).  Padding repeats the last
+        # successor, and the last bound of a row is infinite so rounding
+        # can never run off its end.
+        lengths = np.diff(compiled.indptr)
+        width = max(int(lengths.max(initial=0)), 1)
+        columns = np.arange(width)
+        entries = compiled.indptr[:-1, None] + np.minimum(columns, np.maximum(lengths, 1)[:, None] - 1)
+        # Rows of illegal actions are empty; point them at any valid entry.
+        entries = np.minimum(entries, len(compiled.probs) - 1)
+        self.nextStates = compiled.indices[entries]
+        self.rewards = compiled.rewards[entries]
+        probs = np.where(columns < lengths[:, None], compiled.probs[entries], 0.0)
+        # Accumulate column by column, like the running sum of
+        # getRandomNextState, so both see the same bounds.
+        self.bounds = np.zeros((compiled.numRows, width))
+        total = np.zeros(compiled.numRows)
+        for k in range(width):
+            total = total + probs[:, k]
+            self.bounds[:, k] = total
+        self.bounds[columns >= lengths[:, None] - 1] = np.inf
+
+        self.states = np.full(numEnvs, self.startState, dtype=np.int64)
+
+    def reset(self, which=None):
+        """
+        Puts all episodes, or those selected by which, back at the start.
+        """
+        if which is None:
+            self.states[:] = self.startState
+        else:
+            self.states[which] = self.startState
+
+    def isDone(self):
+        return self.done[self.states]
+
+    def step(self, actions, which=None):
+        """
+        Applies one action id per selected episode (all by default) and
+        returns (next states, rewards) for them.
+        """
+        states = self.states if which is None else self.states[which]
+        rows = states * self.compiled.numActions + actions
+        draws = self.random.random(len(rows))
+        choice = (draws[:, None] < self.bounds[rows]).argmax(axis=1)
+        nextStates = self.nextStates[rows, choice]
+        rewards = self.rewards[rows, choice]
+        if which is None:
+            self.states = nextStates
+        else:
+            self.states[which] = nextStates
+        return nextStates, rewards
+
+
+class BatchQLearner:
+    """
+    Tabular Q-learning on a dense [state, action] array.
+    """
+
+    def __init__(self, compiled, alpha=0.5, epsilon=0.3, discount=0.9, seed=None):
+        self.compiled = compiled
+        self.alpha = alpha
+        self.epsilon = epsilon
+        self.discount = discount
+        self.random = np.random.default_rng(seed)
+        self.qTable = np.zeros((compiled.numStates, compiled.numActions))
+        self.legalCounts = compiled.actionMask.sum(axis=1)
+        # Legal action ids of every state, in the MDP's order, left-aligned.
+        self.legalActions = np.zeros((compiled.numStates, max(self.legalCounts.max(initial=0), 1)),
+                                     dtype=np.int64)
+        for s, actionIds in enumerate(compiled.stateActions):
+            self.legalActions[s, :len(actionIds)] = actionIds
+
+    def getValues(self, states):
+        """
+        max_a Q(s, a) over legal actions, 0 where there are none.
+        """
+        q = np.where(self.compiled.actionMask[states], self.qTable[states], -np.inf)
+        values = q.max(axis=1, initial=-np.inf)
+        values[self.legalCounts[states] == 0] = 0.0
+        return values
+
+    def getGreedyActions(self, states):
+        mask = self.compiled.actionMask[states]
+        q = np.where(mask, self.qTable[states], -np.inf)
+        best = mask & (q == q.max(axis=1, keepdims=True))
+        # A random key per best action picks uniformly among ties.
+        keys = np.where(best, self.random.random(best.shape), -1.0)
+        return keys.argmax(axis=1)
+
+    def getActions(self, states):
+        """
+        Epsilon-greedy action ids for a batch of states with legal actions.
+        """
+        actions = self.getGreedyActions(states)
+        explore = self.random.random(len(states)) < self.epsilon
+        if explore.any():
+            explored = states[explore]
+            picks = (self.random.random(len(explored)) * self.legalCounts[explored]).astype(np.int64)
+            actions[explore] = self.legalActions[explored, picks]
+        return actions
+
+    def update(self, states, actions, nextStates, rewards):
+        """
+        Applies a batch of transitions.  Transitions that share a (state,
+        action) pair are applied one after another in batch order, so the
+        pair ends at (1 - alpha)^n Q + sum_i alpha (1 - alpha)^(n-1-i) sample_i
+        as it would after n sequential updates.
+        """
+        samples = rewards + self.discount * self.getValues(nextStates)
+        keys = states * self.compiled.numActions + actions
+        order = np.argsort(keys, kind='stable')
+        sortedKeys = keys[order]
+        firsts = np.flatnonzero(np.concatenate(([True], sortedKeys[1:] != sortedKeys[:-1])))
+        counts = np.diff(np.append(firsts, len(keys)))
+        ranks = np.arange(len(keys)) - np.repeat(firsts, counts)
+        remaining = np.repeat(counts, counts) - 1 - ranks
+        keep = 1.0 - self.alpha
+        weighted = self.alpha * keep ** remaining * samples[order]
+        pairs = sortedKeys[firsts]
+        flat = self.qTable.reshape(-1)
+        flat[pairs] = keep ** counts * flat[pairs] + np.add.reduceat(weighted, firsts)
+
+    def exportQValues(self):
+        """
+        The Q-values of all legal pairs as a util.Counter keyed by
+        (state, action), the layout QLearningAgent uses.
+        """
+        qValues = util.Counter()
+        states, actions = self.compiled.states, self.compiled.actions
+        for s, actionIds in enumerate(self.compiled.stateActions):
+            for a in actionIds:
+                qValues[(states[s], actions[a])] = float(self.qTable[s, a])
+        return qValues
+
+    def copyToAgent(self, agent):
+        for key, value in self.exportQValues().items():
+            agent.qValues[key] = value
+
+
+def trainQLearning(gridworld, episodes, numEnvs=64, alpha=0.5, epsilon=0.3,
+                   discount=0.9, seed=None):
+    """
+    Runs episodes Q-learning episodes, numEnvs at a time.  Returns the
+    discounted return of every episode in order of completion and the
+    BatchQLearner holding the learned table.
+    """
+    env = BatchGridworldEnvironment(gridworld, min(numEnvs, max(episodes, 1)), seed)
+    learner = BatchQLearner(env.compiled, alpha, epsilon, discount,
+                            None if seed is None else seed + 1)
+    numEnvs = env.numEnvs
+    returns = np.zeros(numEnvs)
+    totalDiscount = np.ones(numEnvs)
+    running = np.zeros(numEnvs, dtype=bool)
+    running[:min(numEnvs, episodes)] = True
+    started = int(running.sum())
+    finished = []
+    while running.any():
+        active = np.flatnonzero(running)
+        done = env.done[env.states[active]]
+        if done.any():
+            ended = active[done]
+            finished.extend(returns[ended].tolist())
+            relaunch = ended[:max(episodes - started, 0)]
+            started += len(relaunch)
+            running[ended] = False
+            running[relaunch] = True
+            env.reset(relaunch)
+            returns[relaunch] = 0.0
+            totalDiscount[relaunch] = 1.0
+            active = np.flatnonzero(running)
+            if len(active) == 0:
+                break
+        states = env.states[active]
+        actions = learner.getActions(states)
+        nextStates, rewards = env.step(actions, active)
+        learner.update(states, actions, nextStates, rewards)
+        returns[active] += rewards * totalDiscount[active]
+        totalDiscount[active] *= discount
+    return np.array(finished), learner
@@ -331,7 +331,11 @@ class CrawlingRobot:
         self.lastStep = stepCount
 #        self.lastVel = velocity
 
-    def __init__(self, canvas):
+    def __init__(self, canvas=None):
+        """
+            canvas: the Tk canvas to draw on, or None for a robot that
+            only simulates (see headlessCrawler.py)
+        """
 
         ## Canvas ##
         self.canvas = canvas
@@ -351,28 +355,28 @@ class CrawlingRobot:
         self.maxHandAngle = 0
         self.minHandAngle = -(5.0/6.0) * PI
 
-        ## Draw Ground ##
-        self.totWidth = canvas.winfo_reqwidth()
-        self.totHeight = canvas.winfo_reqheight()
+        ## Ground ##
+        if canvas is not None:
+            self.totWidth = canvas.winfo_reqwidth()
+            self.totHeight = canvas.winfo_reqheight()
+        else:
+            self.totWidth, self.totHeight = 1000, 200
         self.groundHeight = 40
         self.groundY = self.totHeight - self.groundHeight
 
-        self.ground = canvas.create_rectangle(0,
-            self.groundY,self.totWidth,self.totHeight, fill='blue')
-
-        ## Robot Body ##
+        ## Robot Body, Arm and Hand ##
         self.robotWidth = 80
         self.robotHeight = 40
         self.robotPos = (20, self.groundY)
-        self.robotBody = canvas.create_polygon(0,0,0,0,0,0,0,0, fill='green')
-
-        ## Robot Arm ##
         self.armLength = 60
-        self.robotArm = canvas.create_line(0,0,0,0,fill='orange',width=5)
-
-        ## Robot Hand ##
         self.handLength = 40
-        self.robotHand = canvas.create_line(0,0,0,0,fill='red',width=3)
+
+        if canvas is not None:
+            self.ground = canvas.create_rectangle(0,
+                self.groundY,self.totWidth,self.totHeight, fill='blue')
+            self.robotBody = canvas.create_polygon(0,0,0,0,0,0,0,0, fill='green')
+            self.robotArm = canvas.create_line(0,0,0,0,fill='orange',width=5)
+            self.robotHand = canvas.create_line(0,0,0,0,fill='red',width=3)
 
         self.positions = [0,0]
   #      self.angleSums = [0,0]
@@ -0,0 +1,344 @@
+# evaluationFeatures.py
+# ---------------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+Feature-based evaluation of Pacman game states with cached layout tables.
+
+Features are plain functions declared once in FEATURES.  They read from:
+
+  LayoutTables  static tables built once per maze: open cells, neighbour
+                lists and maze (BFS) distances, see getLayoutTables
+  FoodInfo      the remaining food of a state together with a lazily
+                computed multi-source BFS distance field to the nearest
+                food, shared by every state with the same food grid
+
+A FeatureEvaluator combines features with weights.  Successor states that
+do not eat food share their parent's food grid, so their FoodInfo is found
+by identity; when a search tells the evaluator about a transition
+(trackSuccessor), a child that eats a pellet derives its FoodInfo from the
+parent instead of rescanning the grid.  Leaf values are cached per state
+for the duration of one search (beginSearch).
+
+The same file is shipped with the reinforcement project so that the
+feature extractors in featureExtractors.py can share these tables.
+"""
+
+from game import Actions
+import util
+
+# Tables of the layouts seen most recently; emptied when it holds
+# MAX_LAYOUT_TABLES layouts, so a long run over many mazes stays bounded.
+LAYOUT_TABLES_CACHE = {}
+MAX_LAYOUT_TABLES = 4
+_lastTables = None
+
+
+def getLayoutTables(walls):
+    """
+    Returns the LayoutTables for a walls Grid, building them on first use.
+    """
+    global _lastTables
+    # Game.run hands agents deep copies of the layout, so the Grid object
+    # changes every turn; comparing with the last walls seen (identity,
+    # then list equality, which runs in C) avoids rehashing the grid.
+    if _lastTables is not None:
+        if _lastTables.walls is walls:
+            return _lastTables
+        if _lastTables.walls.data == walls.data:
+            _lastTables.walls = walls
+            return _lastTables
+    tables = LAYOUT_TABLES_CACHE.get(walls)
+    if tables is None:
+        tables = LayoutTables(walls)
+        if len(LAYOUT_TABLES_CACHE) >= MAX_LAYOUT_TABLES:
+            LAYOUT_TABLES_CACHE.clear()
+        LAYOUT_TABLES_CACHE[walls] = tables
+    tables.walls = walls
+    _lastTables = tables
+    return tables
+
+
+class LayoutTables:
+    """
+    Static tables for one maze.
+
+    Cells are numbered in the order of Grid.asList(False).  neighbors[i]
+    lists the cell ids adjacent to cell i, and legalNeighbors[cell] matches
+    Actions.getLegalNeighbors(cell, walls), including the cell itself.
+    Distances from a source cell are computed by BFS on first request and
+    kept, so mazeDistance fills in an all-pairs table as it is used.
+    """
+
+    def __init__(self, walls):
+        self.walls = walls
+        self.width = walls.width
+        self.height = walls.height
+        self.cells = walls.asList(False)
+        self.cellIndex = dict((cell, i) for i, cell in enumerate(self.cells))
+        self.legalNeighbors = {}
+        self.neighbors = []
+        for cell in self.cells:
+            legal = Actions.getLegalNeighbors(cell, walls)
+            self.legalNeighbors[cell] = frozenset(legal)
+            self.neighbors.append(tuple(self.cellIndex[n]
+                                        for n in legal if n != cell))
+        self.distances = {}
+
+    def getCellId(self, pos):
+        x, y = pos
+        return self.cellIndex.get((int(x + 0.5), int(y + 0.5)))
+
+    def distanceField(self, sources):
+        """
+        Multi-source BFS: returns a list holding, for every cell id, the
+        maze distance to the closest source cell (None if unreachable).
+        """
+        field = [None] * len(self.cells)
+        frontier = []
+        for pos in sources:
+            cellId = self.getCellId(pos)
+            if cellId is not None and field[cellId] is None:
+                field[cellId] = 0
+                frontier.append(cellId)
+        dist = 0
+        neighbors = self.neighbors
+        while frontier:
+            dist += 1
+            nextFrontier = []
+            for cellId in frontier:
+                for n in neighbors[cellId]:
+                    if field[n] is None:
+                        field[n] = dist
+                        nextFrontier.append(n)
+            frontier = nextFrontier
+        return field
+
+    def distancesFrom(self, pos):
+        cellId = self.getCellId(pos)
+        field = self.distances.get(cellId)
+        if field is None:
+            field = self.distanceField([self.cells[cellId]])
+            self.distances[cellId] = field
+        return field
+
+    def mazeDistance(self, pos1, pos2):
+        return self.distancesFrom(pos1)[self.getCellId(pos2)]
+
+
+class FoodInfo:
+    """
+    The remaining food of a state and its nearest-food distance field.
+    """
+
+    def __init__(self, tables, foodList):
+        self.tables = tables
+        self.foodList = foodList
+        self.count = len(foodList)
+        self.field = None
+
+    def fromGrid(tables, food):
+        return FoodInfo(tables, food.asList())
+    fromGrid = staticmethod(fromGrid)
+
+    def getField(self):
+        if self.field is None:
+            self.field = self.tables.distanceField(self.foodList)
+        return self.field
+
+    def closestDistance(self, pos):
+        """
+        Maze distance from pos to the closest food, or None if no food is
+        reachable.
+        """
+        cellId = self.tables.getCellId(pos)
+        if cellId is None:
+            return None
+        return self.getField()[cellId]
+
+    def without(self, pos):
+        """
+        Returns the FoodInfo after the pellet at pos has been eaten.
+        """
+        return FoodInfo(self.tables, [f for f in self.foodList if f != pos])
+
+
+#####################
+# Declared features #
+#####################
+#
+# Each feature is a function feature(state, tables, food) -> float, where
+# tables is the LayoutTables of the maze and food the FoodInfo of the state.
+
+def scoreFeature(state, tables, food):
+    return state.getScore()
+
+
+def foodCountFeature(state, tables, food):
+    return food.count
+
+
+def closestFoodFeature(state, tables, food):
+    dist = food.closestDistance(state.getPacmanPosition())
+    if dist is None:
+        return 0.0
+    return float(dist)
+
+
+def inverseClosestFoodFeature(state, tables, food):
+    dist = food.closestDistance(state.getPacmanPosition())
+    if not dist:
+        return 0.0
+    return 1.0 / dist
+
+
+def capsuleCountFeature(state, tables, food):
+    return len(state.getCapsules())
+
+
+def inverseClosestCapsuleFeature(state, tables, food):
+    pacman = state.getPacmanPosition()
+    distances = [tables.mazeDistance(pacman, c) for c in state.getCapsules()]
+    distances = [d for d in distances if d]
+    if not distances:
+        return 0.0
+    return 1.0 / min(distances)
+
+
+def activeGhostDistances(state, tables):
+    pacman = state.getPacmanPosition()
+    return [tables.mazeDistance(pacman, g.getPosition())
+            for g in state.getGhostStates() if g.scaredTimer == 0]
+
+
+def closestGhostFeature(state, tables, food):
+    distances = [d for d in activeGhostDistances(state, tables) if d is not None]
+    if not distances:
+        return 0.0
+    return float(min(distances))
+
+
+def ghostsOneStepAwayFeature(state, tables, food):
+    pacman = state.getPacmanPosition()
+    x, y = pacman
+    pacman = (int(x + 0.5), int(y + 0.5))
+    count = 0
+    for g in state.getGhostStates():
+        if g.scaredTimer > 0:
+            continue
+        gx, gy = g.getPosition()
+        if pacman in tables.legalNeighbors.get((int(gx + 0.5), int(gy + 0.5)), ()):
+            count += 1
+    return count
+
+
+def scaredGhostFeature(state, tables, food):
+    """
+    Sum of 1 / distance over scared ghosts Pacman can still reach in time.
+    """
+    pacman = state.getPacmanPosition()
+    total = 0.0
+    for g in state.getGhostStates():
+        if g.scaredTimer == 0:
+            continue
+        dist = tables.mazeDistance(pacman, g.getPosition())
+        if dist is not None and dist < g.scaredTimer:
+            total += 1.0 / (dist + 1)
+    return total
+
+
+FEATURES = {
+    'score': scoreFeature,
+    'food-count': foodCountFeature,
+    'closest-food': closestFoodFeature,
+    'inverse-closest-food': inverseClosestFoodFeature,
+    'capsule-count': capsuleCountFeature,
+    'inverse-closest-capsule': inverseClosestCapsuleFeature,
+    'closest-ghost': closestGhostFeature,
+    '#-of-ghosts-1-step-away': ghostsOneStepAwayFeature,
+    'scared-ghosts': scaredGhostFeature,
+}
+
+
+class FeatureEvaluator:
+    """
+    A weighted sum of declared features, usable as an evaluation function.
+
+    Searches may call beginSearch() before each move, which empties the
+    leaf cache, and trackSuccessor(parent, child) after generating a child,
+    which lets the food tables follow the search path incrementally.  Both
+    are optional; without them the caches are simply bounded in size.
+    """
+
+    def __init__(self, weights, features=FEATURES, maxCacheSize=50000):
+        self.weights = weights
+        self.features = [(name, features[name]) for name in weights]
+        self.maxCacheSize = maxCacheSize
+        self.leafCache = {}
+        self.foodInfos = {}
+        self.cacheHits = 0
+
+    def __call__(self, state):
+        return self.evaluate(state)
+
+    def beginSearch(self):
+        self.leafCache = {}
+        self.foodInfos = {}
+
+    def getFoodInfo(self, state):
+        food = state.getFood()
+        entry = self.foodInfos.get(id(food.data))
+        if entry is not None and entry[0] is food.data:
+            return entry[1]
+        info = FoodInfo.fromGrid(getLayoutTables(state.getWalls()), food)
+        self.rememberFoodInfo(food, info)
+        return info
+
+    def rememberFoodInfo(self, food, info):
+        if len(self.foodInfos) >= self.maxCacheSize:
+            self.foodInfos = {}
+        # Keeping a reference to the grid data pins its id while cached.
+        self.foodInfos[id(food.data)] = (food.data, info)
+
+    def trackSuccessor(self, parent, child):
+        """
+        Derives the child's FoodInfo from the parent's when a pellet was
+        eaten on the way; other children share the parent's food grid.
+        """
+        eaten = child.data._foodEaten
+        if eaten is not None and child.getFood().data is not parent.getFood().data:
+            self.rememberFoodInfo(child.getFood(),
+                                  self.getFoodInfo(parent).without(eaten))
+
+    def getFeatures(self, state):
+        tables = getLayoutTables(state.getWalls())
+        food = self.getFoodInfo(state)
+        features = util.Counter()
+        for name, feature in self.features:
+            features[name] = feature(state, tables, food)
+        return features
+
+    def evaluate(self, state):
+        value = self.leafCache.get(state)
+        if value is not None:
+            self.cacheHits += 1
+            return value
+        tables = getLayoutTables(state.getWalls())
+        food = self.getFoodInfo(state)
+        value = 0.0
+        for name, feature in self.features:
+            value += self.weights[name] * feature(state, tables, food)
+        if len(self.leafCache) >= self.maxCacheSize:
+            self.leafCache = {}
+        self.leafCache[state] = value
+        return value
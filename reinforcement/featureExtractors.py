@@ -16,6 +16,7 @@
 
 from game import Directions, Actions
 import util
+import evaluationFeatures
 
 class FeatureExtractor:
     def getFeatures(self, state, action):
@@ -70,13 +71,53 @@ class SimpleExtractor(FeatureExtractor):
     - how far away the next food is
     - whether a ghost collision is imminent
     - whether a ghost is one step away
+
+    Agents ask for the features of every legal action of a state, so the
+    work that depends only on the state is done once per state object: the
+    distance to the nearest food from every cell Pacman can move to (the
+    distances closestFood finds one BFS at a time, read from a single
+    multi-source BFS out of the food cells) and a count, for every cell, of
+    the ghosts it neighbours, read from the maze's neighbour tables.
     """
 
+    def __init__(self):
+        self.stateCache = {}
+
+    def getStateTables(self, state):
+        """
+        Returns (nearest food distance per reachable next cell, ghost
+        neighbour count per cell) for state, computed on the first request
+        for this state object.
+        """
+        entry = self.stateCache.get(id(state))
+        if entry is not None and entry[0] is state:
+            return entry[1]
+        walls = state.getWalls()
+        tables = evaluationFeatures.getLayoutTables(walls)
+        x, y = state.getPacmanPosition()
+        nextCells = list(tables.legalNeighbors.get((int(x + 0.5), int(y + 0.5)), ()))
+        foodInfo = evaluationFeatures.FoodInfo.fromGrid(tables, state.getFood())
+        foodDistances = dict((cell, foodInfo.closestDistance(cell)) for cell in nextCells)
+        ghostCounts = {}
+        for g in state.getGhostPositions():
+            gx, gy = g
+            neighbors = tables.legalNeighbors.get((int(gx + 0.5), int(gy + 0.5)))
+            if neighbors is None:
+                neighbors = Actions.getLegalNeighbors(g, walls)
+            for cell in neighbors:
+                ghostCounts[cell] = ghostCounts.get(cell, 0) + 1
+        result = (foodDistances, ghostCounts)
+        # Only the states of the current step are asked about again.
+        if len(self.stateCache) >= 8:
+            self.stateCache = {}
+        self.stateCache[id(state)] = (state, result)
+        return result
+
     def getFeatures(self, state, action):
         # extract the grid of food and wall locations and get the ghost locations
         food = state.getFood()
         walls = state.getWalls()
-        ghosts = state.getGhostPositions()
+        foodDistances, ghostCounts = self.getStateTables(state)
 
         features = util.Counter()
 
@@ -88,13 +129,16 @@ class SimpleExtractor(FeatureExtractor):
         next_x, next_y = int(x + dx), int(y + dy)
 
         # count the number of ghosts 1-step away
-        features["#-of-ghosts-1-step-away"] = sum((next_x, next_y) in Actions.getLegalNeighbors(g, walls) for g in ghosts)
+        features["#-of-ghosts-1-step-away"] = ghostCounts.get((next_x, next_y), 0)
 
         # if there is no danger of ghosts then add the food feature
         if not features["#-of-ghosts-1-step-away"] and food[next_x][next_y]:
             features["eats-food"] = 1.0
 
-        dist = closestFood((next_x, next_y), food, walls)
+        if (next_x, next_y) in foodDistances:
+            dist = foodDistances[(next_x, next_y)]
+        else:
+            dist = closestFood((next_x, next_y), food, walls)
         if dist is not None:
             # make the distance a number less than one otherwise the update
             # will diverge wildly
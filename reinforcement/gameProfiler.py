@@ -0,0 +1,200 @@
+# gameProfiler.py
+# ---------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+Instrumentation for the game loop.
+
+A GameProfiler attached to a Game (game.profiler) accumulates wall-clock
+time per agent in registerInitialState, observationFunction, getAction and
+final, time spent by the game itself generating successors, updating the
+display and applying the rules, and the number of states each agent
+generates while choosing its moves.  One profiler can be shared by all games
+of a run; it only calls time.perf_counter around each section, so it is
+cheap enough to leave on in batch runs.
+
+SamplingProfiler is an optional stack sampler that writes collapsed stacks
+("a;b;c count" lines), the input format of flamegraph.pl and speedscope.
+
+From the command line:
+
+> python pacman.py -p ExpectimaxAgent -q -n 10 --profile --profileOutput stats.json
+> python pacman.py -p ExpectimaxAgent -q --flamegraph stacks.txt
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+
+AGENT_SECTIONS = ['registerInitialState', 'observationFunction', 'getAction', 'final']
+GAME_SECTIONS = ['generateSuccessor', 'display', 'rules']
+
+
+class SectionStats:
+    """
+    Call count, total and maximum time of one instrumented section.
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, elapsed):
+        self.calls += 1
+        self.total += elapsed
+        if elapsed > self.max:
+            self.max = elapsed
+
+    def toDict(self):
+        return {'calls': self.calls, 'time': self.total, 'max': self.max,
+                'mean': self.total / self.calls if self.calls else 0.0}
+
+
+class GameProfiler:
+    """
+    Aggregates timings over all games it is attached to.
+
+    stateCounter, if given, is a function returning a running count of
+    generated game states; the profiler charges the difference across each
+    agent call to that agent.
+    """
+
+    def __init__(self, stateCounter=None):
+        self.clock = time.perf_counter
+        self.stateCounter = stateCounter
+        self.agentNames = {}
+        self.agentStats = {}
+        self.statesGenerated = {}
+        self.gameStats = dict((name, SectionStats()) for name in GAME_SECTIONS)
+        self.numGames = 0
+        self.numMoves = 0
+        self.wallTime = 0.0
+        self._gameStart = None
+
+    def startGame(self, agents):
+        self.numGames += 1
+        for i, agent in enumerate(agents):
+            if i not in self.agentStats:
+                self.agentNames[i] = agent.__class__.__name__
+                self.agentStats[i] = dict((name, SectionStats())
+                                          for name in AGENT_SECTIONS)
+                self.statesGenerated[i] = 0
+        self._gameStart = self.clock()
+
+    def endGame(self):
+        if self._gameStart is not None:
+            self.wallTime += self.clock() - self._gameStart
+            self._gameStart = None
+
+    def startAgent(self):
+        """
+        Returns a token to pass to endAgent when the agent call returns.
+        """
+        if self.stateCounter is None:
+            return (self.clock(), 0)
+        return (self.clock(), self.stateCounter())
+
+    def endAgent(self, agentIndex, section, token):
+        start, states = token
+        self.agentStats[agentIndex][section].add(self.clock() - start)
+        if self.stateCounter is not None:
+            self.statesGenerated[agentIndex] += self.stateCounter() - states
+
+    def record(self, section, start):
+        self.gameStats[section].add(self.clock() - start)
+        if section == 'generateSuccessor':
+            self.numMoves += 1
+
+    def toDict(self):
+        agents = []
+        for i in sorted(self.agentStats):
+            entry = {'index': i, 'name': self.agentNames[i],
+                     'statesGenerated': self.statesGenerated[i]}
+            for name in AGENT_SECTIONS:
+                entry[name] = self.agentStats[i][name].toDict()
+            agents.append(entry)
+        return {
+            'games': self.numGames,
+            'moves': self.numMoves,
+            'wallTime': self.wallTime,
+            'agents': agents,
+            'game': dict((name, self.gameStats[name].toDict()) for name in GAME_SECTIONS),
+        }
+
+    def writeJSON(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.toDict(), f, indent=2, sort_keys=True)
+
+    def printSummary(self, out=None):
+        out = out or sys.stdout
+        print('Profile: %d game(s), %d moves, %.3fs wall time' % (
+            self.numGames, self.numMoves, self.wallTime), file=out)
+        for i in sorted(self.agentStats):
+            stats = self.agentStats[i]
+            print('  agent %d (%s): getAction %.3fs / %d calls (max %.4fs), '
+                  'observation %.3fs, startup %.3fs, states generated %d' % (
+                      i, self.agentNames[i], stats['getAction'].total,
+                      stats['getAction'].calls, stats['getAction'].max,
+                      stats['observationFunction'].total,
+                      stats['registerInitialState'].total,
+                      self.statesGenerated[i]), file=out)
+        for name in GAME_SECTIONS:
+            print('  %s: %.3fs / %d calls' % (
+                name, self.gameStats[name].total, self.gameStats[name].calls), file=out)
+
+
+class SamplingProfiler:
+    """
+    Samples the stack of the thread that created it every interval seconds
+    from a background thread and counts identical stacks.
+    """
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.threadId = threading.get_ident()
+        self.stacks = {}
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.threadId)
+            if frame is None:
+                continue
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                names.append('%s:%s' % (os.path.basename(code.co_filename), code.co_name))
+                frame = frame.f_back
+            stack = ';'.join(reversed(names))
+            self.stacks[stack] = self.stacks.get(stack, 0) + 1
+
+    def writeCollapsed(self, path):
+        with open(path, 'w') as f:
+            for stack, count in sorted(self.stacks.items()):
+                f.write('%s %d\n' % (stack, count))
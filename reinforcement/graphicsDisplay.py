@@ -161,7 +161,18 @@ class InfoPane:
 
 
 class PacmanGraphics:
-    def __init__(self, zoom=1.0, frameTime=0.0, capture=False):
+    """
+    Tk display for Pacman games.
+
+    Each update records which cells changed (agents that moved, food and
+    capsules eaten); a frame then redraws only those items, with all canvas
+    changes batched into a single refresh.  With frameSkip=k only every k-th
+    update is drawn, and with fps set frames are drawn at most that often;
+    in both cases the game itself runs at full speed and Pacman is not
+    animated between cells.
+    """
+
+    def __init__(self, zoom=1.0, frameTime=0.0, capture=False, frameSkip=1, fps=None):
         self.have_window = 0
         self.currentGhostImages = {}
         self.pacmanImage = None
@@ -169,6 +180,9 @@ class PacmanGraphics:
         self.gridSize = DEFAULT_GRID_SIZE * zoom
         self.capture = capture
         self.frameTime = frameTime
+        self.frameSkip = max(1, int(frameSkip))
+        self.fps = fps
+        self.animate = self.frameSkip == 1 and not fps
 
     def checkNullDisplay(self):
         return False
@@ -184,6 +198,16 @@ class PacmanGraphics:
 
         # Information
         self.previousState = state
+        self.resetFrame(state)
+
+    def resetFrame(self, state):
+        "Clears the changes waiting for the next frame."
+        self.pendingState = None
+        self.pendingUpdates = 0
+        self.dirtyFood = []
+        self.dirtyCapsules = []
+        self.renderedScore = state.score
+        self.lastFrameTime = time.time()
 
     def startGraphics(self, state):
         self.layout = state.layout
@@ -243,25 +267,53 @@ class PacmanGraphics:
         refresh()
 
     def update(self, newState):
-        agentIndex = newState._agentMoved
-        agentState = newState.agentStates[agentIndex]
-
-        if self.agentImages[agentIndex][0].isPacman != agentState.isPacman:
-            self.swapImages(agentIndex, agentState)
-        prevState, prevImage = self.agentImages[agentIndex]
-        if agentState.isPacman:
-            self.animatePacman(agentState, prevState, prevImage)
-        else:
-            self.moveGhost(agentState, agentIndex, prevState, prevImage)
-        self.agentImages[agentIndex] = (agentState, prevImage)
-
         if newState._foodEaten != None:
-            self.removeFood(newState._foodEaten, self.food)
+            self.dirtyFood.append(newState._foodEaten)
         if newState._capsuleEaten != None:
-            self.removeCapsule(newState._capsuleEaten, self.capsules)
-        self.infoPane.updateScore(newState.score)
+            self.dirtyCapsules.append(newState._capsuleEaten)
+        self.pendingState = newState
+        self.pendingUpdates += 1
+
+        if self.fps:
+            if time.time() - self.lastFrameTime < 1.0 / self.fps:
+                return
+        elif self.pendingUpdates < self.frameSkip:
+            return
+        self.drawFrame()
+
+    def drawFrame(self):
+        """
+        Brings the canvas up to date with the latest state passed to update,
+        touching only the agents, food and text that changed since the last
+        frame.
+        """
+        newState = self.pendingState
+        if newState is None:
+            return
+        begin_batch()
+        for agentIndex, agentState in enumerate(newState.agentStates):
+            prevState, prevImage = self.agentImages[agentIndex]
+            if prevState == agentState and prevState.isPacman == agentState.isPacman:
+                continue
+            if prevState.isPacman != agentState.isPacman:
+                self.swapImages(agentIndex, agentState)
+                prevState, prevImage = self.agentImages[agentIndex]
+            if agentState.isPacman:
+                self.animatePacman(agentState, prevState, prevImage)
+            else:
+                self.moveGhost(agentState, agentIndex, prevState, prevImage)
+            self.agentImages[agentIndex] = (agentState, prevImage)
+
+        for cell in self.dirtyFood:
+            self.removeFood(cell, self.food)
+        for cell in self.dirtyCapsules:
+            self.removeCapsule(cell, self.capsules)
+        if newState.score != self.renderedScore:
+            self.infoPane.updateScore(newState.score)
         if 'ghostDistances' in dir(newState):
             self.infoPane.updateGhostDistances(newState.ghostDistances)
+        end_batch()
+        self.resetFrame(newState)
 
     def make_window(self, width, height):
         grid_width = (width-1) * self.gridSize
@@ -317,6 +369,10 @@ class PacmanGraphics:
         refresh()
 
     def animatePacman(self, pacman, prevPacman, image):
+        if not self.animate:
+            self.movePacman(self.getPosition(pacman),
+                            self.getDirection(pacman), image)
+            return
         if self.frameTime < 0:
             print('Press any key to step forward, "q" to play')
             keys = wait_for_keys()
@@ -415,13 +471,15 @@ class PacmanGraphics:
             move_by(ghostImagePart, delta)
         refresh()
 
-        if ghost.scaredTimer > 0:
-            color = SCARED_COLOR
-        else:
-            color = GHOST_COLORS[ghostIndex]
-        edit(ghostImageParts[0], ('fill', color), ('outline', color))
-        self.moveEyes(self.getPosition(ghost),
-                      self.getDirection(ghost), ghostImageParts[-4:])
+        if (ghost.scaredTimer > 0) != (prevGhost.scaredTimer > 0):
+            if ghost.scaredTimer > 0:
+                color = SCARED_COLOR
+            else:
+                color = GHOST_COLORS[ghostIndex]
+            edit(ghostImageParts[0], ('fill', color), ('outline', color))
+        if self.getDirection(ghost) != self.getDirection(prevGhost):
+            self.moveEyes(self.getPosition(ghost),
+                          self.getDirection(ghost), ghostImageParts[-4:])
         refresh()
 
     def getPosition(self, agentState):
@@ -435,6 +493,7 @@ class PacmanGraphics:
         return agentState.configuration.getDirection()
 
     def finish(self):
+        self.drawFrame()
         end_graphics()
 
     def to_screen(self, point):
@@ -664,8 +723,8 @@ class PacmanGraphics:
 
 
 class FirstPersonPacmanGraphics(PacmanGraphics):
-    def __init__(self, zoom=1.0, showGhosts=True, capture=False, frameTime=0):
-        PacmanGraphics.__init__(self, zoom, frameTime=frameTime)
+    def __init__(self, zoom=1.0, showGhosts=True, capture=False, frameTime=0, frameSkip=1, fps=None):
+        PacmanGraphics.__init__(self, zoom, frameTime=frameTime, frameSkip=frameSkip, fps=fps)
         self.showGhosts = showGhosts
         self.capture = capture
 
@@ -685,6 +744,7 @@ class FirstPersonPacmanGraphics(PacmanGraphics):
 
         # Information
         self.previousState = state
+        self.resetFrame(state)
 
     def lookAhead(self, config, state):
         if config.getDirection() == 'Stop':
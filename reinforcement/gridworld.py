@@ -338,22 +338,31 @@ def getUserAction(state, actionFunction):
 def printString(x): print(x)
 
 def runEpisode(agent, environment, discount, decision, display, message, pause, episode):
+    """
+    Runs one episode and returns its discounted return.  display, message
+    and pause may be None, in which case nothing is drawn or formatted.
+    """
     returns = 0
     totalDiscount = 1.0
     environment.reset()
-    if 'startEpisode' in dir(agent): agent.startEpisode()
-    message("BEGINNING EPISODE: "+str(episode)+"\n")
+    if hasattr(agent, 'startEpisode'): agent.startEpisode()
+    observeTransition = getattr(agent, 'observeTransition', None)
+    if message is not None:
+        message("BEGINNING EPISODE: "+str(episode)+"\n")
     while True:
 
         # DISPLAY CURRENT STATE
         state = environment.getCurrentState()
-        display(state)
-        pause()
+        if display is not None:
+            display(state)
+        if pause is not None:
+            pause()
 
         # END IF IN A TERMINAL STATE
         actions = environment.getPossibleActions(state)
         if len(actions) == 0:
-            message("EPISODE "+str(episode)+" COMPLETE: RETURN WAS "+str(returns)+"\n")
+            if message is not None:
+                message("EPISODE "+str(episode)+" COMPLETE: RETURN WAS "+str(returns)+"\n")
             return returns
 
         # GET ACTION (USUALLY FROM AGENT)
@@ -363,13 +372,14 @@ def runEpisode(agent, environment, discount, decision, display, message, pause,
 
         # EXECUTE ACTION
         nextState, reward = environment.doAction(action)
-        message("Started in state: "+str(state)+
-                "\nTook action: "+str(action)+
-                "\nEnded in state: "+str(nextState)+
-                "\nGot reward: "+str(reward)+"\n")
+        if message is not None:
+            message("Started in state: "+str(state)+
+                    "\nTook action: "+str(action)+
+                    "\nEnded in state: "+str(nextState)+
+                    "\nGot reward: "+str(reward)+"\n")
         # UPDATE LEARNER
-        if 'observeTransition' in dir(agent):
-            agent.observeTransition(state, action, nextState, reward)
+        if observeTransition is not None:
+            observeTransition(state, action, nextState, reward)
 
         returns += reward * totalDiscount
         totalDiscount *= discount
@@ -408,7 +418,7 @@ def parseOptions():
                          help='Request a window width of X pixels *per grid cell* (default %default)')
     optParser.add_option('-a', '--agent',action='store', metavar="A",
                          type='string',dest='agent',default="random",
-                         help='Agent type (options are \'random\', \'value\' and \'q\', default %default)')
+                         help='Agent type (options are \'random\', \'value\', \'policy\', \'modpolicy\' and \'q\', default %default)')
     optParser.add_option('-t', '--text',action='store_true',
                          dest='textDisplay',default=False,
                          help='Use text-only ASCII display')
@@ -426,9 +436,18 @@ def parseOptions():
                          help='Manually control agent')
     optParser.add_option('-v', '--valueSteps',action='store_true' ,default=False,
                          help='Display each step of value iteration')
+    optParser.add_option('-b', '--batch',action='store', metavar="K",
+                         type='int',dest='batch',default=0,
+                         help='Run q-learning episodes K at a time on a vectorized environment, without display (default %default)')
 
     opts, args = optParser.parse_args()
 
+    if opts.batch > 0:
+        if opts.manual:
+            optParser.error('-b/--batch trains without a display; it cannot be used with -m/--manual')
+        if opts.agent != 'q':
+            optParser.error('-b/--batch only trains the q agent; use it with -a q')
+
     if opts.manual and opts.agent != 'q':
         print('## Disabling Agents in Manual Mode (-m) ##')
         opts.agent = None
@@ -442,6 +461,10 @@ def parseOptions():
     if opts.manual:
         opts.pause = True
 
+    if opts.batch > 0:
+        opts.quiet = True
+        opts.pause = False
+
     return opts
 
 
@@ -514,6 +537,10 @@ if __name__ == '__main__':
         a = valueIterationAgents.AsynchronousValueIterationAgent(mdp, opts.discount, opts.iters)
     elif opts.agent == 'priosweepvalue':
         a = valueIterationAgents.PrioritizedSweepingValueIterationAgent(mdp, opts.discount, opts.iters)
+    elif opts.agent == 'policy':
+        a = valueIterationAgents.PolicyIterationAgent(mdp, opts.discount)
+    elif opts.agent == 'modpolicy':
+        a = valueIterationAgents.ModifiedPolicyIterationAgent(mdp, opts.discount)
     else:
         if not opts.manual: raise Exception('Unknown agent type: '+opts.agent)
 
@@ -523,7 +550,7 @@ if __name__ == '__main__':
     ###########################
     # DISPLAY Q/V VALUES BEFORE SIMULATION OF EPISODES
     try:
-        if not opts.manual and opts.agent in ('value', 'asynchvalue', 'priosweepvalue'):
+        if not opts.manual and opts.agent in ('value', 'asynchvalue', 'priosweepvalue', 'policy', 'modpolicy'):
             if opts.valueSteps:
                 for i in range(opts.iters):
                     tempAgent = valueIterationAgents.ValueIterationAgent(mdp, opts.discount, i)
@@ -540,21 +567,21 @@ if __name__ == '__main__':
 
 
     # FIGURE OUT WHAT TO DISPLAY EACH TIME STEP (IF ANYTHING)
-    displayCallback = lambda x: None
+    displayCallback = None
     if not opts.quiet:
         if opts.manual and opts.agent == None:
             displayCallback = lambda state: display.displayNullValues(state)
         else:
-            if opts.agent in ('random', 'value', 'asynchvalue', 'priosweepvalue'):
+            if opts.agent in ('random', 'value', 'asynchvalue', 'priosweepvalue', 'policy', 'modpolicy'):
                 displayCallback = lambda state: display.displayValues(a, state, "CURRENT VALUES")
             if opts.agent == 'q': displayCallback = lambda state: display.displayQValues(a, state, "CURRENT Q-VALUES")
 
     messageCallback = lambda x: printString(x)
     if opts.quiet:
-        messageCallback = lambda x: None
+        messageCallback = None
 
     # FIGURE OUT WHETHER TO WAIT FOR A KEY PRESS AFTER EACH TIME STEP
-    pauseCallback = lambda : None
+    pauseCallback = None
     if opts.pause:
         pauseCallback = lambda : display.pause()
 
@@ -570,8 +597,17 @@ if __name__ == '__main__':
         print("RUNNING", opts.episodes, "EPISODES")
         print()
     returns = 0
-    for episode in range(1, opts.episodes+1):
-        returns += runEpisode(a, env, opts.discount, decisionCallback, displayCallback, messageCallback, pauseCallback, episode)
+    if opts.batch > 0:
+        # K episodes at a time on the vectorized environment; the learned
+        # table is copied into the agent for display afterwards.
+        import batchGridworld
+        episodeReturns, learner = batchGridworld.trainQLearning(
+            mdp, opts.episodes, opts.batch, opts.learningRate, opts.epsilon, opts.discount)
+        learner.copyToAgent(a)
+        returns = episodeReturns.sum()
+    else:
+        for episode in range(1, opts.episodes+1):
+            returns += runEpisode(a, env, opts.discount, decisionCallback, displayCallback, messageCallback, pauseCallback, episode)
     if opts.episodes > 0:
         print()
         print("AVERAGE RETURNS FROM START STATE: "+str((returns+0.0) / opts.episodes))
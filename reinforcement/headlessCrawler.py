@@ -0,0 +1,251 @@
+# headlessCrawler.py
+# ------------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+The crawling robot without a display, stepped by table lookup.
+
+The crawler's state is a pair of (arm bucket, hand bucket) numbers and
+every action moves one joint to a neighbouring bucket, so the distance the
+robot moves depends only on (arm bucket, hand bucket, action).
+CrawlerTable computes that displacement once for every triple, with the
+same CrawlingRobot.displacement geometry the animated robot uses, along
+with the next state of every legal action.
+
+HeadlessCrawlerEnvironment is a drop-in CrawlingRobotEnvironment that
+steps through the table.  Like the animated environment it keeps a running
+x position and rewards newX - oldX, so its rewards match bit for bit.
+
+BatchCrawlerLearners runs many tabular Q-learners on their own crawlers
+at once, each with its own epsilon, alpha and discount, to sweep
+hyperparameters:
+
+> python headlessCrawler.py -s 20000 -e 0.1,0.3,0.5 -a 0.2,0.5,0.8 -d 0.9
+"""
+
+import optparse
+import time
+
+import numpy as np
+
+import crawler
+import environment
+
+ACTIONS = ['arm-down', 'arm-up', 'hand-down', 'hand-up']
+
+
+class CrawlerTable:
+    """
+    Next states and displacements of every (arm bucket, hand bucket,
+    action), as [nArmStates, nHandStates, 4] arrays in ACTIONS order.
+    """
+
+    def __init__(self, robotEnvironment=None):
+        if robotEnvironment is None:
+            robotEnvironment = crawler.CrawlingRobotEnvironment(crawler.CrawlingRobot())
+        robot = robotEnvironment.crawlingRobot
+        self.nArmStates = robotEnvironment.nArmStates
+        self.nHandStates = robotEnvironment.nHandStates
+        self.armBuckets = list(robotEnvironment.armBuckets)
+        self.handBuckets = list(robotEnvironment.handBuckets)
+        self.startState = (self.nArmStates // 2, self.nHandStates // 2)
+
+        shape = (self.nArmStates, self.nHandStates, len(ACTIONS))
+        self.legal = np.zeros(shape, dtype=bool)
+        self.nextArm = np.zeros(shape, dtype=np.int64)
+        self.nextHand = np.zeros(shape, dtype=np.int64)
+        self.displacements = np.zeros(shape)
+        moves = [(-1, 0), (1, 0), (0, -1), (0, 1)]
+        for arm in range(self.nArmStates):
+            for hand in range(self.nHandStates):
+                for a, (dArm, dHand) in enumerate(moves):
+                    newArm, newHand = arm + dArm, hand + dHand
+                    if not (0 <= newArm < self.nArmStates and 0 <= newHand < self.nHandStates):
+                        # Illegal moves stay put, so batched lookups stay in range.
+                        self.nextArm[arm, hand, a], self.nextHand[arm, hand, a] = arm, hand
+                        continue
+                    self.legal[arm, hand, a] = True
+                    self.nextArm[arm, hand, a], self.nextHand[arm, hand, a] = newArm, newHand
+                    self.displacements[arm, hand, a] = robot.displacement(
+                        self.armBuckets[arm], self.handBuckets[hand],
+                        self.armBuckets[newArm], self.handBuckets[newHand])
+
+        # Python-level views for the one-robot environment.
+        self.actionLists = {}
+        self.transitions = {}
+        for arm in range(self.nArmStates):
+            for hand in range(self.nHandStates):
+                actions = [ACTIONS[a] for a in range(len(ACTIONS)) if self.legal[arm, hand, a]]
+                self.actionLists[(arm, hand)] = actions
+                for a in range(len(ACTIONS)):
+                    if self.legal[arm, hand, a]:
+                        nextState = (int(self.nextArm[arm, hand, a]), int(self.nextHand[arm, hand, a]))
+                        self.transitions[(arm, hand), ACTIONS[a]] = (
+                            nextState, float(self.displacements[arm, hand, a]))
+
+
+class HeadlessCrawlerEnvironment(environment.Environment):
+    """
+    A CrawlingRobotEnvironment without a robot to animate.  self.position
+    is the robot's x position, which (as for CrawlingRobot) starts at 20
+    and is not reset.
+    """
+
+    def __init__(self, table=None):
+        if table is None:
+            table = CrawlerTable()
+        self.table = table
+        self.nArmStates = table.nArmStates
+        self.nHandStates = table.nHandStates
+        self.position = 20.0
+        self.reset()
+
+    def getCurrentState(self):
+        return self.state
+
+    def getPossibleActions(self, state):
+        return list(self.table.actionLists[state])
+
+    def doAction(self, action):
+        nextState, displacement = self.table.transitions[self.state, action]
+        oldPosition = self.position
+        self.position = oldPosition + displacement
+        self.state = nextState
+        return nextState, self.position - oldPosition
+
+    def reset(self):
+        self.state = self.table.startState
+
+
+class BatchCrawlerLearners:
+    """
+    K Q-learners, each on its own crawler, stepped together.  epsilons,
+    alphas and discounts give each learner's settings (scalars are shared
+    by all).  Action choice and updates follow QLearningAgent: epsilon-
+    greedy with random tie breaking, and
+    Q(s,a) <- (1 - alpha) Q(s,a) + alpha (r + discount * max_a' Q(s',a')).
+    """
+
+    def __init__(self, epsilons, alphas, discounts, table=None, seed=None):
+        if table is None:
+            table = CrawlerTable()
+        self.table = table
+        self.epsilons, self.alphas, self.discounts = np.broadcast_arrays(
+            np.asarray(epsilons, dtype=float), np.asarray(alphas, dtype=float),
+            np.asarray(discounts, dtype=float))
+        self.epsilons = self.epsilons.ravel()
+        self.alphas = self.alphas.ravel()
+        self.discounts = self.discounts.ravel()
+        self.numLearners = len(self.epsilons)
+        self.random = np.random.default_rng(seed)
+        self.qValues = np.zeros((self.numLearners, table.nArmStates, table.nHandStates, len(ACTIONS)))
+        self.learners = np.arange(self.numLearners)
+        self.reset()
+
+    def reset(self):
+        """
+        Puts every crawler back at the start state and position 0; the
+        Q-values are kept.
+        """
+        self.arms = np.full(self.numLearners, self.table.startState[0], dtype=np.int64)
+        self.hands = np.full(self.numLearners, self.table.startState[1], dtype=np.int64)
+        self.positions = np.zeros(self.numLearners)
+
+    def getActions(self, explore=True):
+        legal = self.table.legal[self.arms, self.hands]
+        q = np.where(legal, self.qValues[self.learners, self.arms, self.hands], -np.inf)
+        best = q == q.max(axis=1, keepdims=True)
+        # A random key per candidate picks uniformly among ties (or, for
+        # exploring learners, among all legal actions).
+        candidates = best
+        if explore:
+            exploring = self.random.random(self.numLearners) < self.epsilons
+            candidates = np.where(exploring[:, None], legal, best)
+        keys = np.where(candidates, self.random.random(candidates.shape), -1.0)
+        return keys.argmax(axis=1)
+
+    def step(self, learn=True, explore=True):
+        """
+        One action for every learner.  Returns the rewards.
+        """
+        arms, hands = self.arms, self.hands
+        actions = self.getActions(explore)
+        nextArms = self.table.nextArm[arms, hands, actions]
+        nextHands = self.table.nextHand[arms, hands, actions]
+        rewards = self.table.displacements[arms, hands, actions]
+        if learn:
+            nextLegal = self.table.legal[nextArms, nextHands]
+            nextQ = np.where(nextLegal, self.qValues[self.learners, nextArms, nextHands], -np.inf)
+            samples = rewards + self.discounts * nextQ.max(axis=1)
+            old = self.qValues[self.learners, arms, hands, actions]
+            self.qValues[self.learners, arms, hands, actions] = \
+                (1 - self.alphas) * old + self.alphas * samples
+        self.arms, self.hands = nextArms, nextHands
+        self.positions += rewards
+        return rewards
+
+    def run(self, steps, learn=True, explore=True):
+        """
+        Takes steps actions with every learner.  Returns the average
+        velocity (distance per step) of each learner over them.
+        """
+        start = self.positions.copy()
+        for _ in range(steps):
+            self.step(learn, explore)
+        return (self.positions - start) / max(steps, 1)
+
+
+def sweep(epsilons, alphas, discounts, steps, evalSteps=1000, seed=None):
+    """
+    Trains a learner for every combination of settings for steps steps,
+    then measures the velocity of its greedy policy over evalSteps steps.
+    Returns a list of (epsilon, alpha, discount, training velocity,
+    greedy velocity).
+    """
+    grid = np.array(np.meshgrid(epsilons, alphas, discounts, indexing='ij')).reshape(3, -1)
+    learners = BatchCrawlerLearners(grid[0], grid[1], grid[2], seed=seed)
+    training = learners.run(steps)
+    greedy = learners.run(evalSteps, learn=False, explore=False)
+    return list(zip(grid[0].tolist(), grid[1].tolist(), grid[2].tolist(),
+                    training.tolist(), greedy.tolist()))
+
+
+def parseList(text):
+    return [float(value) for value in text.split(',')]
+
+
+if __name__ == '__main__':
+    parser = optparse.OptionParser('python headlessCrawler.py <options>')
+    parser.add_option('-s', '--steps', type='int', dest='steps', default=20000,
+                      help='Training steps per learner (default %default)')
+    parser.add_option('-v', '--evalSteps', type='int', dest='evalSteps', default=1000,
+                      help='Greedy steps used to measure each policy (default %default)')
+    parser.add_option('-e', '--epsilons', dest='epsilons', default='0.1,0.3,0.5',
+                      help='Comma separated exploration rates (default %default)')
+    parser.add_option('-a', '--alphas', dest='alphas', default='0.2,0.5,0.8',
+                      help='Comma separated learning rates (default %default)')
+    parser.add_option('-d', '--discounts', dest='discounts', default='0.9',
+                      help='Comma separated discounts (default %default)')
+    parser.add_option('--seed', type='int', dest='seed', default=None,
+                      help='Random seed')
+    options, _ = parser.parse_args()
+
+    start = time.time()
+    results = sweep(parseList(options.epsilons), parseList(options.alphas),
+                    parseList(options.discounts), options.steps, options.evalSteps, options.seed)
+    elapsed = time.time() - start
+    print('%8s %8s %8s %14s %14s' % ('epsilon', 'alpha', 'discount', 'train velocity', 'greedy velocity'))
+    for epsilon, alpha, discount, training, greedy in results:
+        print('%8.3f %8.3f %8.3f %14.3f %14.3f' % (epsilon, alpha, discount, training, greedy))
+    print('%d learners x %d steps in %.2f seconds' % (
+        len(results), options.steps + options.evalSteps, elapsed))
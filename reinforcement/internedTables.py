@@ -0,0 +1,235 @@
+# internedTables.py
+# -----------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+Q-tables and weight vectors stored in NumPy arrays under interned keys.
+
+KeyIndex numbers hashable keys (states, actions, feature names) 0, 1, 2, ...
+Hashing a Pacman GameState walks its agents, food grid and capsules, and a
+learning agent asks about the same state object once per legal action and
+again in update; KeyIndex remembers the last objects it saw by identity so
+each is hashed only once.
+
+InternedQTable and InternedWeights index growable arrays with those ids.
+Both support the util.Counter operations the agents use (table[key],
+table[key] = value, keys, items, len), so they can replace a Counter.
+"""
+
+import numpy as np
+
+import util
+
+
+class KeyIndex:
+    """
+    Interns hashable keys as dense integer ids.
+    """
+
+    def __init__(self, recentSize=64):
+        self.ids = {}
+        self.keys = []
+        self.recent = {}
+        self.recentSize = recentSize
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __contains__(self, key):
+        return self.lookup(key) is not None
+
+    def lookup(self, key):
+        """
+        Returns the id of key, or None if it was never interned.
+        """
+        entry = self.recent.get(id(key))
+        if entry is not None and entry[0] is key:
+            return entry[1]
+        keyId = self.ids.get(key)
+        if keyId is not None:
+            self.remember(key, keyId)
+        return keyId
+
+    def getId(self, key):
+        """
+        Returns the id of key, interning it first if needed.
+        """
+        keyId = self.lookup(key)
+        if keyId is None:
+            keyId = len(self.keys)
+            self.keys.append(key)
+            self.ids[key] = keyId
+            self.remember(key, keyId)
+        return keyId
+
+    def remember(self, key, keyId):
+        if len(self.recent) >= self.recentSize:
+            self.recent = {}
+        # The entry holds the key itself, which keeps its id() from being reused.
+        self.recent[id(key)] = (key, keyId)
+
+
+def grow(array, rows, columns=None):
+    """
+    Returns array, or a zero-padded copy with at least the given number of
+    rows (and columns, for 2-D arrays), doubling capacity as it grows.
+    """
+    shape = list(array.shape)
+    if rows > shape[0]:
+        shape[0] = max(rows, 2 * shape[0])
+    if columns is not None and columns > shape[1]:
+        shape[1] = max(columns, 2 * shape[1])
+    if tuple(shape) == array.shape:
+        return array
+    grown = np.zeros(shape, dtype=array.dtype)
+    grown[tuple(slice(0, n) for n in array.shape)] = array
+    return grown
+
+
+class InternedQTable:
+    """
+    Q-values keyed by (state, action), held in a [state id, action id]
+    array.  Pairs never set read as 0.0.
+    """
+
+    def __init__(self):
+        self.states = KeyIndex()
+        self.actions = KeyIndex()
+        self.values = np.zeros((64, 4))
+        self.known = np.zeros((64, 4), dtype=bool)
+
+    def getQValue(self, state, action):
+        s = self.states.lookup(state)
+        if s is None:
+            return 0.0
+        a = self.actions.lookup(action)
+        if a is None:
+            return 0.0
+        return float(self.values[s, a])
+
+    def getQValues(self, state, actions):
+        """
+        Q-values of several actions of one state, as a list.
+        """
+        s = self.states.lookup(state)
+        if s is None:
+            return [0.0] * len(actions)
+        row = self.values[s].tolist()
+        lookup = self.actions.lookup
+        result = []
+        for action in actions:
+            a = lookup(action)
+            result.append(0.0 if a is None else row[a])
+        return result
+
+    def setQValue(self, state, action, value):
+        s = self.states.getId(state)
+        a = self.actions.getId(action)
+        if s >= self.values.shape[0] or a >= self.values.shape[1]:
+            self.values = grow(self.values, s + 1, a + 1)
+            self.known = grow(self.known, s + 1, a + 1)
+        self.values[s, a] = value
+        self.known[s, a] = True
+
+    def __getitem__(self, key):
+        return self.getQValue(key[0], key[1])
+
+    def __setitem__(self, key, value):
+        self.setQValue(key[0], key[1], value)
+
+    def __len__(self):
+        return int(self.known.sum())
+
+    def items(self):
+        states, actions = self.states.keys, self.actions.keys
+        return [((states[s], actions[a]), float(self.values[s, a]))
+                for s, a in zip(*np.nonzero(self.known))]
+
+    def keys(self):
+        return [key for key, _ in self.items()]
+
+    def toCounter(self):
+        return util.Counter(dict(self.items()))
+
+
+class InternedWeights:
+    """
+    A weight per feature key, held in a 1-D array.  Feature vectors are
+    dicts (usually util.Counters) from feature keys to values; dot and
+    addScaled turn them into (id array, value array) pairs and work on
+    those.
+    """
+
+    def __init__(self):
+        self.features = KeyIndex()
+        self.values = np.zeros(64)
+
+    def encode(self, features, add=False):
+        """
+        Returns (ids, values) arrays for a feature dict.  Unless add is
+        true, features without a weight yet are left out.
+        """
+        getId = self.features.getId if add else self.features.lookup
+        ids, values = [], []
+        for key, value in features.items():
+            keyId = getId(key)
+            if keyId is not None:
+                ids.append(keyId)
+                values.append(value)
+        if add and len(self.features) > len(self.values):
+            self.values = grow(self.values, len(self.features))
+        return np.array(ids, dtype=np.int64), np.array(values, dtype=float)
+
+    def dot(self, features):
+        ids, values = self.encode(features)
+        return float(np.dot(self.values[ids], values))
+
+    def addScaled(self, features, scale):
+        """
+        w <- w + scale * f.
+        """
+        ids, values = self.encode(features, add=True)
+        self.values[ids] += scale * values
+
+    def __getitem__(self, key):
+        keyId = self.features.lookup(key)
+        return 0.0 if keyId is None else float(self.values[keyId])
+
+    def __setitem__(self, key, value):
+        keyId = self.features.getId(key)
+        if keyId >= len(self.values):
+            self.values = grow(self.values, keyId + 1)
+        self.values[keyId] = value
+
+    def __len__(self):
+        return len(self.features)
+
+    def __iter__(self):
+        return iter(self.features.keys)
+
+    def __contains__(self, key):
+        return key in self.features
+
+    def keys(self):
+        return list(self.features.keys)
+
+    def items(self):
+        return list(zip(self.features.keys, self.values[:len(self.features)].tolist()))
+
+    def toCounter(self):
+        return util.Counter(dict(self.items()))
+
+    def __str__(self):
+        return str(self.toCounter())
+
+    __repr__ = __str__
@@ -0,0 +1,373 @@
+# mdpCompiler.py
+# --------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+Compiles a MarkovDecisionProcess (see mdp.py) into NumPy arrays.
+
+compileMDP walks the MDP once, numbering its states and actions, and keeps
+the transition model as one entry per (state, action, nextState) triple,
+sorted by row s * numActions + a:
+
+  indptr      entries of row r are indptr[r]:indptr[r+1]  (CSR layout)
+  rowIds      row of every entry
+  indices     next state id of every entry
+  probs       T(s, a, s') of every entry
+  rewards     R(s, a, s') of every entry
+  actionMask  [state, action] True where the action is legal
+  terminal    True for states where mdp.isTerminal holds
+
+Bellman backups are then sparse matrix-vector products done with
+numpy.bincount, which adds each row's terms in the order the MDP listed
+them, so values match the dictionary-based loop to the last bit.
+
+From the command line, time value iteration sweeps on an open gridworld:
+
+> python mdpCompiler.py -w 100 -H 100 -i 100
+"""
+
+import numpy as np
+
+try:
+    from scipy import sparse
+    from scipy.sparse import linalg as sparseLinalg
+except ImportError:
+    sparse = None
+
+# Without SciPy, exact policy evaluation builds a dense system; above this
+# many states it falls back to iterative sweeps.
+DENSE_SOLVE_LIMIT = 3000
+
+
+def compileMDP(mdp):
+    return CompiledMDP(mdp)
+
+
+def maxChange(newValues, values):
+    if len(values) == 0:
+        return 0.0
+    return float(np.abs(newValues - values).max())
+
+
+class CompiledMDP:
+    """
+    Array form of an MDP.  States reachable from mdp.getStates() but not
+    listed by it are added as they are found.
+    """
+
+    def __init__(self, mdp):
+        self.mdp = mdp
+        self.states = list(mdp.getStates())
+        self.stateIndex = dict((state, i) for i, state in enumerate(self.states))
+        self.actions = []
+        self.actionIndex = {}
+        self.stateActions = []
+
+        entryStates, entryActions, indices, probs, rewards = [], [], [], [], []
+        terminal = []
+        s = 0
+        while s < len(self.states):
+            state = self.states[s]
+            terminal.append(bool(mdp.isTerminal(state)))
+            actionIds = []
+            for action in mdp.getPossibleActions(state):
+                a = self.actionIndex.get(action)
+                if a is None:
+                    a = len(self.actions)
+                    self.actions.append(action)
+                    self.actionIndex[action] = a
+                actionIds.append(a)
+                for nextState, prob in mdp.getTransitionStatesAndProbs(state, action):
+                    j = self.stateIndex.get(nextState)
+                    if j is None:
+                        j = len(self.states)
+                        self.states.append(nextState)
+                        self.stateIndex[nextState] = j
+                    entryStates.append(s)
+                    entryActions.append(a)
+                    indices.append(j)
+                    probs.append(prob)
+                    rewards.append(mdp.getReward(state, action, nextState))
+            self.stateActions.append(tuple(actionIds))
+            s += 1
+
+        self.numStates = len(self.states)
+        self.numActions = len(self.actions)
+        self.numRows = self.numStates * self.numActions
+        self.terminal = np.array(terminal, dtype=bool)
+        self.actionMask = np.zeros((self.numStates, self.numActions), dtype=bool)
+        for s, actionIds in enumerate(self.stateActions):
+            self.actionMask[s, list(actionIds)] = True
+
+        rowIds = (np.array(entryStates, dtype=np.int64) * self.numActions
+                  + np.array(entryActions, dtype=np.int64))
+        # A stable sort keeps each row's entries in the order the MDP gave them.
+        order = np.argsort(rowIds, kind='stable')
+        self.rowIds = rowIds[order]
+        self.indices = np.array(indices, dtype=np.int64)[order]
+        self.probs = np.array(probs, dtype=float)[order]
+        self.rewards = np.array(rewards, dtype=float)[order]
+        self.indptr = np.zeros(self.numRows + 1, dtype=np.int64)
+        np.cumsum(np.bincount(self.rowIds, minlength=self.numRows), out=self.indptr[1:])
+
+        # States whose value is pinned at zero: terminals and dead ends.
+        self.fixed = self.terminal | ~self.actionMask.any(axis=1)
+        self.entryLists = None
+        self.predecessors = None
+
+    def getStateId(self, state):
+        return self.stateIndex[state]
+
+    def valuesToArray(self, values):
+        """
+        Converts a state -> value mapping (a util.Counter, say) to an array.
+        """
+        return np.array([values[state] for state in self.states], dtype=float)
+
+    def arrayToValues(self, array):
+        return dict(zip(self.states, array.tolist()))
+
+    def rowQValues(self, values, discount):
+        """
+        Q-values of every (state, action) row as a flat array; rows of
+        illegal actions are 0.
+        """
+        terms = self.probs * (self.rewards + discount * values[self.indices])
+        return np.bincount(self.rowIds, weights=terms, minlength=self.numRows)
+
+    def qValues(self, values, discount):
+        """
+        Q-values as a [state, action] array with -inf for illegal actions.
+        """
+        q = self.rowQValues(values, discount).reshape(self.numStates, self.numActions)
+        return np.where(self.actionMask, q, -np.inf)
+
+    def getEntryLists(self):
+        """
+        indptr, indices, probs and rewards as Python lists, which are much
+        faster than arrays for the scalar loops of single-state backups.
+        """
+        if self.entryLists is None:
+            self.entryLists = (self.indptr.tolist(), self.indices.tolist(),
+                               self.probs.tolist(), self.rewards.tolist())
+        return self.entryLists
+
+    def getPredecessors(self):
+        """
+        For every state id, the sorted tuple of state ids that can reach it
+        with positive probability in one step.  Built once per MDP.
+        """
+        if self.predecessors is None:
+            n = self.numStates
+            positive = self.probs > 0
+            sources = self.rowIds[positive] // max(self.numActions, 1)
+            targets = self.indices[positive]
+            pairs = np.unique(targets * n + sources)
+            targets, sources = pairs // n, pairs % n
+            bounds = np.searchsorted(targets, np.arange(n + 1))
+            sources = sources.tolist()
+            self.predecessors = [tuple(sources[bounds[j]:bounds[j + 1]])
+                                 for j in range(n)]
+        return self.predecessors
+
+    def qValue(self, values, discount, state, action):
+        """
+        Q-value of a single pair.  values is a mapping from states to values.
+        """
+        row = self.stateIndex[state] * self.numActions + self.actionIndex[action]
+        indptr, indices, probs, rewards = self.getEntryLists()
+        states = self.states
+        total = 0.0
+        for k in range(indptr[row], indptr[row + 1]):
+            total += probs[k] * (rewards[k] + discount * values[states[indices[k]]])
+        return total
+
+    def stateBackup(self, values, discount, s):
+        """
+        Bellman backup of the single state id s; values is indexed by state
+        id (a list is fastest).
+        """
+        if self.fixed[s]:
+            return 0.0
+        indptr, indices, probs, rewards = self.getEntryLists()
+        best = None
+        base = s * self.numActions
+        for a in self.stateActions[s]:
+            row = base + a
+            total = 0.0
+            for k in range(indptr[row], indptr[row + 1]):
+                total += probs[k] * (rewards[k] + discount * values[indices[k]])
+            if best is None or total > best:
+                best = total
+        return best
+
+    def bellmanBackup(self, values, discount):
+        """
+        One synchronous sweep: max over legal actions, 0 for fixed states.
+        """
+        newValues = self.qValues(values, discount).max(axis=1, initial=-np.inf)
+        newValues[self.fixed] = 0.0
+        return newValues
+
+    def greedyBackup(self, values, discount):
+        """
+        A Bellman backup that also returns the greedy policy it used.
+        """
+        q = self.qValues(values, discount)
+        newValues = q.max(axis=1, initial=-np.inf)
+        newValues[self.fixed] = 0.0
+        policy = q.argmax(axis=1) if self.numActions else np.zeros(self.numStates, dtype=np.int64)
+        policy[~self.actionMask.any(axis=1)] = -1
+        return newValues, policy
+
+    def valueIteration(self, discount, iterations, values=None, tolerance=0.0):
+        """
+        Runs up to iterations sweeps starting from values (zeros by
+        default).  With tolerance > 0, stops once no value moves by more
+        than tolerance.  Returns (values, sweeps done).
+        """
+        if values is None:
+            values = np.zeros(self.numStates)
+        sweeps = 0
+        while sweeps < iterations:
+            newValues = self.bellmanBackup(values, discount)
+            sweeps += 1
+            converged = tolerance > 0 and maxChange(newValues, values) <= tolerance
+            values = newValues
+            if converged:
+                break
+        return values, sweeps
+
+    def greedyPolicy(self, values, discount):
+        """
+        Greedy action id per state (-1 where no action is legal).  Ties go
+        to the action compiled first.
+        """
+        q = self.qValues(values, discount)
+        policy = q.argmax(axis=1) if self.numActions else np.zeros(self.numStates, dtype=np.int64)
+        policy[~self.actionMask.any(axis=1)] = -1
+        return policy
+
+    def policyRows(self, policy):
+        """
+        Transition entries of the rows selected by policy: returns
+        (entry state ids, next state ids, probs, rewards).
+        """
+        states = np.flatnonzero((policy >= 0) & ~self.terminal)
+        rows = states * self.numActions + policy[states]
+        starts = self.indptr[rows]
+        lengths = self.indptr[rows + 1] - starts
+        owner = np.repeat(np.arange(len(rows)), lengths)
+        offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        entries = starts[owner] + offsets
+        return states[owner], self.indices[entries], self.probs[entries], self.rewards[entries]
+
+    def policyEvaluation(self, policy, discount, iterations, values=None, tolerance=0.0):
+        """
+        Iterative evaluation of a fixed policy (an array of action ids):
+        up to iterations sweeps of V <- R_pi + discount * P_pi V.  Returns
+        (values, sweeps done).
+        """
+        if values is None:
+            values = np.zeros(self.numStates)
+        owners, indices, probs, rewards = self.policyRows(policy)
+        sweeps = 0
+        while sweeps < iterations:
+            terms = probs * (rewards + discount * values[indices])
+            newValues = np.bincount(owners, weights=terms, minlength=self.numStates)
+            sweeps += 1
+            converged = tolerance > 0 and maxChange(newValues, values) <= tolerance
+            values = newValues
+            if converged:
+                break
+        return values, sweeps
+
+    def solvePolicy(self, policy, discount):
+        """
+        Exact evaluation of a fixed policy by solving
+        (I - discount * P_pi) V = R_pi, sparse when SciPy is installed.
+        Returns None when the system is too large for a dense solve or
+        singular (an undiscounted policy that never terminates).
+        """
+        n = self.numStates
+        owners, indices, probs, rewards = self.policyRows(policy)
+        expectedRewards = np.bincount(owners, weights=probs * rewards, minlength=n)
+        if sparse is not None:
+            transitions = sparse.csr_matrix((probs, (owners, indices)), shape=(n, n))
+            system = (sparse.identity(n, format='csr') - discount * transitions).tocsc()
+            try:
+                values = sparseLinalg.spsolve(system, expectedRewards)
+            except RuntimeError:
+                return None
+        elif n <= DENSE_SOLVE_LIMIT:
+            system = np.eye(n)
+            np.add.at(system, (owners, indices), -discount * probs)
+            try:
+                values = np.linalg.solve(system, expectedRewards)
+            except np.linalg.LinAlgError:
+                return None
+        else:
+            return None
+        values = np.atleast_1d(values)
+        if not np.all(np.isfinite(values)):
+            return None
+        return values
+
+    def improvePolicy(self, policy, values, discount, tolerance=0.0):
+        """
+        Greedy improvement that keeps the current action unless another is
+        better by more than tolerance, so ties cannot make the policy cycle.
+        Returns (new policy, number of states whose action changed).
+        """
+        if self.numActions == 0:
+            return policy, 0
+        q = self.qValues(values, discount)
+        greedy = self.greedyPolicy(values, discount)
+        states = np.arange(self.numStates)
+        currentQ = q[states, np.maximum(policy, 0)]
+        bestQ = q[states, np.maximum(greedy, 0)]
+        keep = (policy >= 0) & (currentQ >= bestQ - tolerance)
+        newPolicy = np.where(keep, policy, greedy)
+        return newPolicy, int((newPolicy != policy).sum())
+
+
+def makeOpenGrid(width, height, exitReward=1.0):
+    """
+    An obstacle-free gridworld with the start in one corner and an exit in
+    the opposite one, for timing.
+    """
+    import gridworld
+    rows = [[' '] * width for _ in range(height)]
+    rows[-1][0] = 'S'
+    rows[0][-1] = exitReward
+    return gridworld.Gridworld(rows)
+
+
+if __name__ == '__main__':
+    import optparse
+    import time
+    parser = optparse.OptionParser()
+    parser.add_option('-w', '--width', type='int', dest='width', default=100)
+    parser.add_option('-H', '--height', type='int', dest='height', default=100)
+    parser.add_option('-i', '--iterations', type='int', dest='iterations', default=100)
+    parser.add_option('-d', '--discount', type='float', dest='discount', default=0.9)
+    options, _ = parser.parse_args()
+
+    start = time.perf_counter()
+    compiled = compileMDP(makeOpenGrid(options.width, options.height))
+    compileTime = time.perf_counter() - start
+    start = time.perf_counter()
+    values, sweeps = compiled.valueIteration(options.discount, options.iterations)
+    sweepTime = (time.perf_counter() - start) / max(sweeps, 1)
+    print('%d states, %d transition entries: compiled in %.3fs, %.2fms per sweep' % (
+        compiled.numStates, len(compiled.probs), compileTime, 1000 * sweepTime))
@@ -58,6 +58,54 @@ import os
 ###################################################
 
 
+class StateTracker:
+    """
+    Records the states generated by GameState.generateSuccessor while it is
+    active.  With retain=True the parent and child of every transition are
+    kept in a set (the autograder compares the number of distinct states an
+    agent explores); with retain=False only the number of generated
+    successors is counted.
+
+    Trackers are only consulted while active, so normal play pays nothing:
+
+        with GameState.trackStates() as tracker:
+            agent.getAction(state)
+        numExplored = len(tracker.getStates())
+    """
+
+    def __init__(self, retain=True):
+        self.retain = retain
+        self.states = set()
+        self.count = 0
+
+    def record(self, parent, child):
+        self.count += 1
+        if self.retain:
+            self.states.add(parent)
+            self.states.add(child)
+
+    def getCount(self):
+        return self.count
+
+    def getStates(self):
+        return self.states
+
+    def start(self):
+        GameState.trackers.append(self)
+        return self
+
+    def stop(self):
+        if self in GameState.trackers:
+            GameState.trackers.remove(self)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
+
+
 class GameState:
     """
     A GameState specifies the full game state, including the food, capsules,
@@ -77,20 +125,21 @@ class GameState:
     # Accessor methods: use these to access state data #
     ####################################################
 
-    # static variable keeps track of which states have had getLegalActions called
-    explored = set()
+    # static variable holds the active StateTrackers (see trackStates)
+    trackers = []
 
-    def getAndResetExplored():
-        tmp = GameState.explored.copy()
-        GameState.explored = set()
-        return tmp
-    getAndResetExplored = staticmethod(getAndResetExplored)
+    def trackStates(retain=True):
+        """
+        Returns a StateTracker to use as a context manager around the code
+        whose generated states should be recorded.
+        """
+        return StateTracker(retain)
+    trackStates = staticmethod(trackStates)
 
     def getLegalActions(self, agentIndex=0):
         """
         Returns the legal actions for the agent specified.
         """
-#        GameState.explored.add(self)
         if self.isWin() or self.isLose():
             return []
 
@@ -129,8 +178,8 @@ class GameState:
         # Book keeping
         state.data._agentMoved = agentIndex
         state.data.score += state.data.scoreChange
-        GameState.explored.add(self)
-        GameState.explored.add(state)
+        for tracker in GameState.trackers:
+            tracker.record(self, state)
         return state
 
     def getLegalPacmanActions(self):
@@ -548,12 +597,34 @@ def readCommand(argv):
                       help='Comma separated values sent to agent. e.g. "opt1=val1,opt2,opt3=val3"')
     parser.add_option('-x', '--numTraining', dest='numTraining', type='int',
                       help=default('How many episodes are training (suppresses output)'), default=0)
+    parser.add_option('--actors', dest='numActors', type='int',
+                      help=default('Number of processes to run training episodes on'), default=1)
+    parser.add_option('--syncEvery', dest='syncEvery', type='int',
+                      help=default('Training episodes per actor between weight synchronizations'), default=10)
+    parser.add_option('--checkpoint', dest='checkpoint',
+                      help='Save the learning agent to FILE during and after the games', metavar='FILE', default=None)
+    parser.add_option('--checkpointEvery', dest='checkpointEvery', type='int',
+                      help=default('Episodes between checkpoints'), metavar='N', default=100)
+    parser.add_option('--resume', dest='resume',
+                      help='Load the learning agent from a checkpoint FILE, skipping the training games it has played '
+                           '(only load checkpoints from sources you trust)',
+                      metavar='FILE', default=None)
     parser.add_option('--frameTime', dest='frameTime', type='float',
                       help=default('Time to delay between frames; <0 means keyboard'), default=0.1)
+    parser.add_option('--frameSkip', dest='frameSkip', type='int',
+                      help=default('Only draw every K-th move; the game runs at full speed'), metavar='K', default=1)
+    parser.add_option('--fps', dest='fps', type='float',
+                      help='Draw at most this many frames per second; the game runs at full speed', default=None)
     parser.add_option('-c', '--catchExceptions', action='store_true', dest='catchExceptions',
                       help='Turns on exception handling and timeouts during games', default=False)
     parser.add_option('--timeout', dest='timeout', type='int',
                       help=default('Maximum length of time an agent can spend computing in a single game'), default=30)
+    parser.add_option('--profile', action='store_true', dest='profile',
+                      help='Time agents and the game loop and print a summary', default=False)
+    parser.add_option('--profileOutput', dest='profileOutput',
+                      help='Write the --profile statistics to this JSON file', metavar='FILE', default=None)
+    parser.add_option('--flamegraph', dest='flamegraph',
+                      help='Sample the call stack and write collapsed stacks to FILE', metavar='FILE', default=None)
 
     options, otherjunk = parser.parse_args(argv)
     if len(otherjunk) != 0:
@@ -578,9 +649,24 @@ def readCommand(argv):
         args['numTraining'] = options.numTraining
         if 'numTraining' not in agentOpts:
             agentOpts['numTraining'] = options.numTraining
+        args['numActors'] = options.numActors
+        args['syncEvery'] = options.syncEvery
     pacman = pacmanType(**agentOpts)  # Instantiate Pacman with agentArgs
     args['pacman'] = pacman
 
+    # Pick up a saved agent where it left off
+    if options.resume:
+        import agentCheckpoint
+        agentCheckpoint.loadAgent(pacman, options.resume)
+        played = min(pacman.episodesSoFar, options.numTraining)
+        if played > 0:
+            print('Resuming after %d training episodes' % played)
+            args['numTraining'] = options.numTraining - played
+            options.numGames -= played
+    if options.checkpoint:
+        args['checkpoint'] = options.checkpoint
+        args['checkpointEvery'] = options.checkpointEvery
+
     # Don't display training games
     if 'numTrain' in agentOpts:
         options.numQuiet = int(agentOpts['numTrain'])
@@ -601,11 +687,16 @@ def readCommand(argv):
     else:
         import graphicsDisplay
         args['display'] = graphicsDisplay.PacmanGraphics(
-            options.zoom, frameTime=options.frameTime)
+            options.zoom, frameTime=options.frameTime, frameSkip=options.frameSkip, fps=options.fps)
     args['numGames'] = options.numGames
     args['record'] = options.record
     args['catchExceptions'] = options.catchExceptions
     args['timeout'] = options.timeout
+    if options.profile or options.profileOutput:
+        import gameProfiler
+        args['profiler'] = gameProfiler.GameProfiler()
+        args['profileOutput'] = options.profileOutput
+    args['flamegraph'] = options.flamegraph
 
     # Special case: recorded games don't use the runGames method or args structure
     if options.gameToReplay != None:
@@ -672,14 +763,38 @@ def replayGame(layout, actions, display):
     display.finish()
 
 
-def runGames(layout, pacman, ghosts, display, numGames, record, numTraining=0, catchExceptions=False, timeout=30):
+def runGames(layout, pacman, ghosts, display, numGames, record, numTraining=0, catchExceptions=False, timeout=30,
+             profiler=None, profileOutput=None, flamegraph=None, numActors=1, syncEvery=10,
+             checkpoint=None, checkpointEvery=100):
     import __main__
     __main__.__dict__['_display'] = display
 
     rules = ClassicGameRules(timeout)
     games = []
-
-    for i in range(numGames):
+    if checkpoint:
+        import agentCheckpoint
+
+    tracker = None
+    if profiler is not None:
+        tracker = GameState.trackStates(retain=False).start()
+        profiler.stateCounter = tracker.getCount
+
+    sampler = None
+    if flamegraph:
+        import gameProfiler
+        sampler = gameProfiler.SamplingProfiler()
+        sampler.start()
+
+    firstGame = 0
+    if numActors > 1 and numTraining > 0:
+        import parallelTraining
+        parallelTraining.trainParallel(pacman, rules, layout, ghosts, min(numTraining, numGames),
+                                       numActors, syncEvery, catchExceptions)
+        firstGame = min(numTraining, numGames)
+        if checkpoint:
+            agentCheckpoint.saveAgent(pacman, checkpoint)
+
+    for i in range(firstGame, numGames):
         beQuiet = i < numTraining
         if beQuiet:
                 # Suppress output and graphics
@@ -691,9 +806,12 @@ def runGames(layout, pacman, ghosts, display, numGames, record, numTraining=0, c
             rules.quiet = False
         game = rules.newGame(layout, pacman, ghosts,
                              gameDisplay, beQuiet, catchExceptions)
+        game.profiler = profiler
         game.run()
         if not beQuiet:
             games.append(game)
+        if checkpoint and (pacman.episodesSoFar % checkpointEvery == 0 or i == numGames - 1):
+            agentCheckpoint.saveAgent(pacman, checkpoint)
 
         if record:
             import time
@@ -716,6 +834,15 @@ def runGames(layout, pacman, ghosts, display, numGames, record, numTraining=0, c
         print('Record:       ', ', '.join(
             [['Loss', 'Win'][int(w)] for w in wins]))
 
+    if sampler is not None:
+        sampler.stop()
+        sampler.writeCollapsed(flamegraph)
+    if profiler is not None:
+        tracker.stop()
+        profiler.printSummary()
+        if profileOutput:
+            profiler.writeJSON(profileOutput)
+
     return games
 
 
@@ -0,0 +1,171 @@
+# parallelTraining.py
+# -------------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+Training episodes for weight-based Pacman Q-agents run in parallel.
+
+trainParallel forks one actor process per worker.  The calling process is
+the learner: it holds the agent's weights and, each round, sends every
+actor a snapshot of them over a pipe together with a number of episodes
+to play.  An actor loads the snapshot into its own copy of the agent,
+plays its episodes quietly, learning as usual, and sends back the change
+in its weights and the rewards of its episodes.  The learner adds the
+mean of those changes to its weights, which makes its new weights the
+average of the actors' weights, and starts the next round.
+
+Averaging rather than summing keeps the step size of one actor: actors
+start a round from the same weights and tend to make similar early
+changes, and adding K of them up overshoots.  Smaller syncEvery makes
+rounds shorter at the cost of more messages.
+
+Any agent with getWeights() returning a dict-like weight vector
+(ApproximateQAgent) can be trained this way.  From the command line:
+
+> python pacman.py -p ApproximateQAgent -a extractor=SimpleExtractor -x 2000 -n 2010 -l mediumClassic --actors 4
+"""
+
+import contextlib
+import multiprocessing
+import os
+import random
+
+import textDisplay
+
+
+def getWeightDict(agent):
+    return dict(agent.getWeights().items())
+
+
+def setWeightDict(agent, weights):
+    current = agent.getWeights()
+    for key in list(current.keys()):
+        if key not in weights:
+            current[key] = 0.0
+    for key, value in weights.items():
+        current[key] = value
+
+
+def playEpisodes(agent, rules, layout, ghosts, episodes, catchExceptions=False):
+    """
+    Plays quiet training games with the agent, returning the reward of
+    each episode.
+    """
+    rules.quiet = True
+    display = textDisplay.NullGraphics()
+    rewards = []
+    for _ in range(episodes):
+        game = rules.newGame(layout, agent, ghosts, display, True, catchExceptions)
+        game.run()
+        rewards.append(agent.episodeRewards)
+    return rewards
+
+
+def actorLoop(connection, agent, rules, layout, ghosts, seed, catchExceptions):
+    """
+    Body of an actor process: answers (weights, episodes) requests with
+    (weight changes, episode rewards) until it receives None.
+    """
+    random.seed(seed)
+    epsilon, alpha = agent.epsilon, agent.alpha
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        while True:
+            request = connection.recv()
+            if request is None:
+                break
+            weights, episodes = request
+            setWeightDict(agent, weights)
+            # Each round is a fresh run of training episodes for the copy;
+            # stopEpisode turns learning off when it reaches numTraining.
+            agent.epsilon, agent.alpha = epsilon, alpha
+            agent.numTraining = agent.episodesSoFar + episodes
+            rewards = playEpisodes(agent, rules, layout, ghosts, episodes, catchExceptions)
+            learned = getWeightDict(agent)
+            changes = dict((key, value - weights.get(key, 0.0))
+                           for key, value in learned.items()
+                           if value != weights.get(key, 0.0))
+            connection.send((changes, rewards))
+    connection.close()
+
+
+def trainParallel(agent, rules, layout, ghosts, numTraining, numActors, syncEvery=10,
+                  catchExceptions=False):
+    """
+    Runs numTraining training episodes of agent (games of the given
+    ClassicGameRules) on numActors actor processes, synchronizing weights
+    every syncEvery episodes per actor.
+    Afterwards the agent is in the state sequential training leaves it in:
+    episodesSoFar advanced by numTraining (a resumed agent keeps the
+    episodes it had already played), training rewards accumulated, and
+    exploration and learning turned off once episodesSoFar reaches the
+    agent's numTraining.
+    """
+    if not hasattr(agent, 'getWeights'):
+        raise Exception('Parallel training needs an agent with getWeights(), such as ApproximateQAgent')
+    if 'fork' not in multiprocessing.get_all_start_methods():
+        raise Exception('Parallel training needs the fork start method')
+    context = multiprocessing.get_context('fork')
+
+    print('Beginning %d episodes of Training on %d actors' % (numTraining, numActors))
+    actors = []
+    for i in range(numActors):
+        mine, theirs = context.Pipe()
+        process = context.Process(target=actorLoop,
+                                  args=(theirs, agent, rules, layout, ghosts, random.random(),
+                                        catchExceptions))
+        process.daemon = True
+        process.start()
+        theirs.close()
+        actors.append((process, mine))
+
+    weights = agent.getWeights()
+    done = 0
+    lastReport = 0
+    totalRewards = 0.0
+    try:
+        while done < numTraining:
+            snapshot = getWeightDict(agent)
+            pending = []
+            for process, connection in actors:
+                episodes = min(syncEvery, numTraining - done - sum(pending))
+                if episodes <= 0:
+                    break
+                connection.send((snapshot, episodes))
+                pending.append(episodes)
+            for (process, connection), episodes in zip(actors, pending):
+                changes, rewards = connection.recv()
+                for key, change in changes.items():
+                    weights[key] = weights[key] + change / len(pending)
+                totalRewards += sum(rewards)
+            done += sum(pending)
+            if done // 100 > lastReport // 100:
+                print('\tCompleted %d out of %d training episodes' % (done, numTraining))
+                print('\tAverage Rewards over all training: %.2f' % (totalRewards / done))
+            lastReport = done
+    finally:
+        for process, connection in actors:
+            try:
+                connection.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+            connection.close()
+        for process, connection in actors:
+            process.join()
+
+    agent.episodesSoFar += numTraining
+    agent.accumTrainRewards += totalRewards
+    if agent.episodesSoFar >= agent.numTraining:
+        agent.epsilon = 0.0
+        agent.alpha = 0.0
+        msg = 'Training Done (turning off epsilon and alpha)'
+        print('%s\n%s' % (msg, '-' * len(msg)))
@@ -17,6 +17,8 @@ from learningAgents import ReinforcementAgent
 from featureExtractors import *
 
 import random,util,math
+import internedTables
+import replayBuffer
 
 class QLearningAgent(ReinforcementAgent):
     """
@@ -43,6 +45,9 @@ class QLearningAgent(ReinforcementAgent):
         ReinforcementAgent.__init__(self, **args)
 
         "*** YOUR CODE HERE ***"
+        # Same interface as a util.Counter keyed by (state, action), but
+        # backed by an array under interned state and action ids.
+        self.qValues = internedTables.InternedQTable()
 
     def getQValue(self, state, action):
         """
@@ -51,7 +56,7 @@ class QLearningAgent(ReinforcementAgent):
           or the Q node value otherwise
         """
         "*** YOUR CODE HERE ***"
-        util.raiseNotDefined()
+        return self.qValues[(state, action)]
 
 
     def computeValueFromQValues(self, state):
@@ -62,7 +67,10 @@ class QLearningAgent(ReinforcementAgent):
           terminal state, you should return a value of 0.0.
         """
         "*** YOUR CODE HERE ***"
-        util.raiseNotDefined()
+        actions = self.getLegalActions(state)
+        if not actions:
+            return 0.0
+        return max([self.getQValue(state, action) for action in actions])
 
     def computeActionFromQValues(self, state):
         """
@@ -71,7 +79,12 @@ class QLearningAgent(ReinforcementAgent):
           you should return None.
         """
         "*** YOUR CODE HERE ***"
-        util.raiseNotDefined()
+        actions = self.getLegalActions(state)
+        if not actions:
+            return None
+        values = [self.getQValue(state, action) for action in actions]
+        bestValue = max(values)
+        return random.choice([a for a, v in zip(actions, values) if v == bestValue])
 
     def getAction(self, state):
         """
@@ -88,7 +101,12 @@ class QLearningAgent(ReinforcementAgent):
         legalActions = self.getLegalActions(state)
         action = None
         "*** YOUR CODE HERE ***"
-        util.raiseNotDefined()
+        if not legalActions:
+            return action
+        if util.flipCoin(self.epsilon):
+            action = random.choice(legalActions)
+        else:
+            action = self.computeActionFromQValues(state)
 
         return action
 
@@ -102,7 +120,9 @@ class QLearningAgent(ReinforcementAgent):
           it will be called on your behalf
         """
         "*** YOUR CODE HERE ***"
-        util.raiseNotDefined()
+        sample = reward + self.discount * self.computeValueFromQValues(nextState)
+        key = (state, action)
+        self.qValues[key] = (1 - self.alpha) * self.qValues[key] + self.alpha * sample
 
     def getPolicy(self, state):
         return self.computeActionFromQValues(state)
@@ -150,11 +170,20 @@ class ApproximateQAgent(PacmanQAgent):
        You should only have to overwrite getQValue
        and update.  All other QLearningAgent functions
        should work as is.
+
+       With replay=N (N > 0) transitions are kept in an N-transition
+       replay buffer and each update is a mini-batch step over batchSize
+       of them; prioritized=1 samples them by TD error.
     """
-    def __init__(self, extractor='IdentityExtractor', **args):
+    def __init__(self, extractor='IdentityExtractor', replay=0, batchSize=32,
+                 prioritized=0, **args):
         self.featExtractor = util.lookup(extractor, globals())()
         PacmanQAgent.__init__(self, **args)
-        self.weights = util.Counter()
+        self.weights = internedTables.InternedWeights()
+        self.batchSize = int(batchSize)
+        self.replay = None
+        if int(replay) > 0:
+            self.replay = replayBuffer.ReplayBuffer(int(replay), bool(int(prioritized)))
 
     def getWeights(self):
         return self.weights
@@ -165,14 +194,35 @@ class ApproximateQAgent(PacmanQAgent):
           where * is the dotProduct operator
         """
         "*** YOUR CODE HERE ***"
-        util.raiseNotDefined()
+        return self.weights.dot(self.featExtractor.getFeatures(state, action))
 
     def update(self, state, action, nextState, reward):
         """
            Should update your weights based on transition
         """
         "*** YOUR CODE HERE ***"
-        util.raiseNotDefined()
+        features = self.featExtractor.getFeatures(state, action)
+        if self.replay is not None:
+            self.replayUpdate(features, nextState, reward)
+            return
+        target = reward + self.discount * self.computeValueFromQValues(nextState)
+        difference = target - self.weights.dot(features)
+        self.weights.addScaled(features, self.alpha * difference)
+
+    def replayUpdate(self, features, nextState, reward):
+        """
+        Stores the transition and, once the buffer holds a full batch,
+        takes one mini-batch step on the weights.  Outside training, or
+        with alpha 0, there is nothing to learn, so nothing is stored.
+        """
+        if self.alpha == 0 or not self.isInTraining():
+            return
+        encode = self.weights.encode
+        nextFeatures = [encode(self.featExtractor.getFeatures(nextState, nextAction), add=True)
+                        for nextAction in self.getLegalActions(nextState)]
+        self.replay.add(encode(features, add=True), reward, nextFeatures)
+        if len(self.replay) >= self.batchSize:
+            self.replay.learn(self.weights.values, self.batchSize, self.alpha, self.discount)
 
     def final(self, state):
         "Called at the end of each game."
@@ -17,6 +17,7 @@ import random, math, traceback, sys, os
 import layout, textDisplay, pacman, gridworld
 import time
 from util import Counter, TimeoutFunction, FixedRandom, Experiences
+from util import PriorityQueue, IndexedPriorityQueue
 from collections import defaultdict
 from pprint import PrettyPrinter
 from hashlib import sha1
@@ -776,6 +777,323 @@ class EvalAgentTest(testClasses.TestCase):
 
 
 
+### checkpoint
+### ==========
+## Saving, loading and resuming learning agents (agentCheckpoint.py)
+
+class CheckpointResumeTest(testClasses.TestCase):
+    """
+    Trains with firstParams, saving a checkpoint, then resumes from it with
+    resumeParams; the final checkpoint must count expectedEpisodes episodes.
+    """
+
+    def __init__(self, question, testDict):
+        super(CheckpointResumeTest, self).__init__(question, testDict)
+        self.firstParams = testDict['firstParams']
+        self.resumeParams = testDict['resumeParams']
+        self.expectedEpisodes = int(testDict['expectedEpisodes'])
+
+    def execute(self, grades, moduleDict, solutionDict):
+        import agentCheckpoint
+        import tempfile
+        directory = tempfile.mkdtemp()
+        path = os.path.join(directory, 'agent.qck')
+        try:
+            pacman.runGames(** pacman.readCommand(self.firstParams.split(' ') + ['--checkpoint', path]))
+            pacman.runGames(** pacman.readCommand(self.resumeParams.split(' ') + ['--resume', path, '--checkpoint', path]))
+            agent = pacman.readCommand(self.resumeParams.split(' '))['pacman']
+            agentCheckpoint.loadAgent(agent, path, restoreRandom=False)
+        finally:
+            if os.path.exists(path):
+                os.remove(path)
+            os.rmdir(directory)
+        if agent.episodesSoFar != self.expectedEpisodes:
+            self.addMessage('Resumed checkpoint counts %d episodes, expected %d' % (agent.episodesSoFar, self.expectedEpisodes))
+            return self.testFail(grades)
+        self.addMessage('Resumed checkpoint counts %d episodes' % agent.episodesSoFar)
+        return self.testPass(grades)
+
+    def writeSolution(self, moduleDict, filePath):
+        with open(filePath, 'w') as handle:
+            handle.write('# This is the solution file for %s.\n' % self.path)
+            handle.write('# File intentionally blank.\n')
+        return True
+
+
+class CheckpointKey:
+    " A checkpoint key whose unpickling would run a shell command "
+
+    def __reduce__(self):
+        return (os.system, ('true',))
+
+
+class CheckpointRoundTripTest(testClasses.TestCase):
+    """
+    Trains an agent with pacmanParams, saves it and loads the bytes into a
+    fresh agent: the learned table and the episode counters must come
+    back equal, a corrupted checkpoint must be rejected by its checksum
+    and keys naming a class outside KEY_CLASSES must not be unpickled.
+    """
+
+    def __init__(self, question, testDict):
+        super(CheckpointRoundTripTest, self).__init__(question, testDict)
+        self.pacmanParams = testDict['pacmanParams']
+
+    def execute(self, grades, moduleDict, solutionDict):
+        import agentCheckpoint
+        import pickle
+        import zlib
+        args = pacman.readCommand(self.pacmanParams.split(' '))
+        pacman.runGames(**args)
+        agent = args['pacman']
+        data = agentCheckpoint.dumps(agent)
+
+        loaded = pacman.readCommand(self.pacmanParams.split(' '))['pacman']
+        agentCheckpoint.loads(loaded, data, restoreRandom=False)
+        table = dict(agentCheckpoint.getTable(agent)[1].items())
+        loadedTable = dict(agentCheckpoint.getTable(loaded)[1].items())
+        if len(table) == 0 or table != loadedTable:
+            self.addMessage('Loaded table differs from the saved one (%d and %d entries)' % (len(table), len(loadedTable)))
+            return self.testFail(grades)
+        for name in ['episodesSoFar', 'accumTrainRewards', 'accumTestRewards']:
+            if getattr(agent, name) != getattr(loaded, name):
+                self.addMessage('Loaded %s is %s, saved %s' % (name, getattr(loaded, name), getattr(agent, name)))
+                return self.testFail(grades)
+
+        corrupted = bytearray(data)
+        corrupted[len(data) // 2] ^= 0xff
+        try:
+            agentCheckpoint.loads(loaded, bytes(corrupted), restoreRandom=False)
+            self.addMessage('A corrupted checkpoint was loaded')
+            return self.testFail(grades)
+        except Exception as e:
+            if 'corrupt' not in str(e):
+                self.addMessage('A corrupted checkpoint failed with an unexpected error: %s' % e)
+                return self.testFail(grades)
+
+        try:
+            agentCheckpoint.decodeKeys(zlib.compress(pickle.dumps([CheckpointKey()])))
+            self.addMessage('Checkpoint keys naming os.system were unpickled')
+            return self.testFail(grades)
+        except pickle.UnpicklingError:
+            pass
+
+        self.addMessage('Round trip of %d entries and the episode counters passed' % len(table))
+        return self.testPass(grades)
+
+    def writeSolution(self, moduleDict, filePath):
+        with open(filePath, 'w') as handle:
+            handle.write('# This is the solution file for %s.\n' % self.path)
+            handle.write('# File intentionally blank.\n')
+        return True
+
+
+### mdp
+### ===
+## The compiled MDP (mdpCompiler.py) against the dictionary-based algorithms
+
+def getGridworld(name, noise, livingReward):
+    grid = getattr(gridworld, 'get' + name)()
+    grid.setNoise(noise)
+    grid.setLivingReward(livingReward)
+    return grid
+
+
+def dictQValue(mdp, values, discount, state, action):
+    total = 0.0
+    for nextState, prob in mdp.getTransitionStatesAndProbs(state, action):
+        total += prob * (mdp.getReward(state, action, nextState) + discount * values[nextState])
+    return total
+
+
+def dictValueIteration(mdp, discount, iterations):
+    """
+    Value iteration written directly against the MDP interface with
+    util.Counter values; the reference for the compiled agents.
+    """
+    values = Counter()
+    for i in range(iterations):
+        newValues = Counter()
+        for state in mdp.getStates():
+            actions = mdp.getPossibleActions(state)
+            if mdp.isTerminal(state) or not actions:
+                continue
+            newValues[state] = max(dictQValue(mdp, values, discount, state, action) for action in actions)
+        values = newValues
+    return values
+
+
+class CompiledValueIterationTest(testClasses.TestCase):
+    """
+    ValueIterationAgent runs on the compiled MDP; on every bundled
+    gridworld in grids its values and Q-values must equal those of the
+    dictionary loop exactly, and its policy must pick a greedy action.
+    """
+
+    def __init__(self, question, testDict):
+        super(CompiledValueIterationTest, self).__init__(question, testDict)
+        self.grids = testDict['grids'].split()
+        self.discount = float(testDict['discount'])
+        self.noise = float(testDict['noise'])
+        self.livingReward = float(testDict['livingReward'])
+        self.iterations = int(testDict['valueIterations'])
+
+    def execute(self, grades, moduleDict, solutionDict):
+        for name in self.grids:
+            grid = getGridworld(name, self.noise, self.livingReward)
+            agent = moduleDict['valueIterationAgents'].ValueIterationAgent(grid, discount=self.discount, iterations=self.iterations)
+            expected = dictValueIteration(grid, self.discount, self.iterations)
+            for state in grid.getStates():
+                if agent.getValue(state) != expected[state]:
+                    self.addMessage('%s: value of %s is %r, the dictionary loop gives %r' % (name, state, agent.getValue(state), expected[state]))
+                    return self.testFail(grades)
+                actions = grid.getPossibleActions(state)
+                if grid.isTerminal(state) or not actions:
+                    continue
+                qValues = dict((a, dictQValue(grid, expected, self.discount, state, a)) for a in actions)
+                for action in actions:
+                    if agent.getQValue(state, action) != qValues[action]:
+                        self.addMessage('%s: Q-value of %s, %s is %r, the dictionary loop gives %r' % (name, state, action, agent.getQValue(state, action), qValues[action]))
+                        return self.testFail(grades)
+                if qValues[agent.getPolicy(state)] != max(qValues.values()):
+                    self.addMessage('%s: %s is not a greedy action in %s' % (name, agent.getPolicy(state), state))
+                    return self.testFail(grades)
+            self.addMessage('%s: %d states match the dictionary loop' % (name, len(grid.getStates())))
+        return self.testPass(grades)
+
+    def writeSolution(self, moduleDict, filePath):
+        with open(filePath, 'w') as handle:
+            handle.write('# This is the solution file for %s.\n' % self.path)
+            handle.write('# File intentionally blank.\n')
+        return True
+
+
+class PolicyIterationTest(testClasses.TestCase):
+    """
+    Runs the agent class named by agent (PolicyIterationAgent or
+    ModifiedPolicyIterationAgent) on every gridworld in grids.  Its values
+    must be within valueTolerance of dictValueIteration run for
+    valueIterations sweeps, and each action of its policy must be greedy
+    for those values (ties within 1e-9 are allowed).
+    """
+
+    def __init__(self, question, testDict):
+        super(PolicyIterationTest, self).__init__(question, testDict)
+        self.agentName = testDict['agent']
+        self.grids = testDict['grids'].split()
+        self.discount = float(testDict['discount'])
+        self.noise = float(testDict['noise'])
+        self.livingReward = float(testDict['livingReward'])
+        self.iterations = int(testDict['valueIterations'])
+        self.valueTolerance = float(testDict['valueTolerance'])
+        self.opts = {}
+        if 'evaluationSweeps' in testDict:
+            self.opts['evaluationSweeps'] = int(testDict['evaluationSweeps'])
+
+    def execute(self, grades, moduleDict, solutionDict):
+        agentClass = getattr(moduleDict['valueIterationAgents'], self.agentName)
+        for name in self.grids:
+            grid = getGridworld(name, self.noise, self.livingReward)
+            agent = agentClass(grid, discount=self.discount, **self.opts)
+            expected = dictValueIteration(grid, self.discount, self.iterations)
+            for state in grid.getStates():
+                if abs(agent.getValue(state) - expected[state]) > self.valueTolerance:
+                    self.addMessage('%s: value of %s is %r, value iteration gives %r' % (name, state, agent.getValue(state), expected[state]))
+                    return self.testFail(grades)
+                actions = grid.getPossibleActions(state)
+                if grid.isTerminal(state) or not actions:
+                    continue
+                qValues = dict((a, dictQValue(grid, expected, self.discount, state, a)) for a in actions)
+                action = agent.getPolicy(state)
+                if action not in qValues or qValues[action] < max(qValues.values()) - 1e-9:
+                    self.addMessage('%s: the policy takes %s in %s, value iteration prefers %s' % (name, action, state, max(qValues, key=qValues.get)))
+                    return self.testFail(grades)
+            self.addMessage('%s: policy matches value iteration after %d backups' % (name, agent.backups))
+        return self.testPass(grades)
+
+    def writeSolution(self, moduleDict, filePath):
+        with open(filePath, 'w') as handle:
+            handle.write('# This is the solution file for %s.\n' % self.path)
+            handle.write('# File intentionally blank.\n')
+        return True
+
+
+class IndexedPriorityQueueTest(testClasses.TestCase):
+    """
+    Drives util.IndexedPriorityQueue with numOperations random pushes,
+    updates and pops over numItems items, so most pushes name an item
+    already queued.  Every pop must return what a plain model of the queue
+    (item -> (priority, insertion count)) gives; with pushes of new items
+    and updates only, the pops must also match util.PriorityQueue.
+    """
+
+    def __init__(self, question, testDict):
+        super(IndexedPriorityQueueTest, self).__init__(question, testDict)
+        self.seed = int(testDict['seed'])
+        self.numOperations = int(testDict['numOperations'])
+        self.numItems = int(testDict['numItems'])
+
+    def execute(self, grades, moduleDict, solutionDict):
+        rng = random.Random(self.seed)
+        queue = IndexedPriorityQueue()
+        model = {}
+        count = 0
+        for i in range(self.numOperations):
+            operation = rng.choice(['push', 'update', 'pop'])
+            item = rng.randrange(self.numItems)
+            # Few distinct priorities, so ties are common.
+            priority = rng.randrange(10)
+            if operation == 'push':
+                queue.push(item, priority)
+                if item in model:
+                    model[item] = (priority, model[item][1])
+                else:
+                    model[item] = (priority, count)
+                    count += 1
+            elif operation == 'update':
+                queue.update(item, priority)
+                if item not in model:
+                    model[item] = (priority, count)
+                    count += 1
+                elif priority < model[item][0]:
+                    model[item] = (priority, model[item][1])
+            elif model:
+                expected = min(model, key=model.get)
+                popped = queue.pop()
+                if popped != expected:
+                    self.addMessage('Operation %d popped %r, expected %r' % (i, popped, expected))
+                    return self.testFail(grades)
+                del model[expected]
+            if len(queue) != len(model) or queue.isEmpty() != (not model) or \
+                    any(item not in queue for item in model):
+                self.addMessage('After operation %d the queue holds %d items, expected %d' % (i, len(queue), len(model)))
+                return self.testFail(grades)
+
+        queue, reference = IndexedPriorityQueue(), PriorityQueue()
+        for i in range(self.numOperations):
+            item = rng.randrange(self.numItems)
+            priority = rng.randrange(10)
+            queue.update(item, priority)
+            reference.update(item, priority)
+        popped = []
+        while not queue.isEmpty():
+            popped.append(queue.pop())
+        expected = []
+        while not reference.isEmpty():
+            expected.append(reference.pop())
+        if popped != expected:
+            self.addMessage('After updates, pops were %s; PriorityQueue gives %s' % (popped, expected))
+            return self.testFail(grades)
+        self.addMessage('%d operations matched the model and PriorityQueue' % self.numOperations)
+        return self.testPass(grades)
+
+    def writeSolution(self, moduleDict, filePath):
+        with open(filePath, 'w') as handle:
+            handle.write('# This is the solution file for %s.\n' % self.path)
+            handle.write('# File intentionally blank.\n')
+        return True
+
+
 ### q2/q3
 ### =====
 ## For each parameter setting, compute the optimal policy, see if it satisfies some properties
@@ -0,0 +1,149 @@
+# replayBuffer.py
+# ---------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+Experience replay for linear (approximate) Q-learning.
+
+A ReplayBuffer is a fixed-capacity ring of transitions kept in
+preallocated arrays.  Feature vectors are sparse: a transition stores the
+weight ids and values of f(s, a), the reward, and the feature vectors of
+every legal action in s' (none when s' is terminal), each padded to the
+widest vector seen so far with id 0 and value 0.
+
+learn() draws a mini-batch, uniformly or in proportion to |TD error|^alpha
+(prioritized replay, with importance-sampling corrections), and applies
+the gradient step w <- w + rate * mean(delta * f) to a weight array in one
+vectorized update.
+
+ApproximateQAgent uses it when given a capacity:
+
+> python pacman.py -p ApproximateQAgent -a extractor=SimpleExtractor,replay=20000,batchSize=32 -x 1000 -n 1010 -l mediumClassic
+"""
+
+import numpy as np
+
+
+class ReplayBuffer:
+
+    def __init__(self, capacity, prioritized=False, alpha=0.6, beta=0.4,
+                 epsilon=1e-3, seed=None):
+        self.capacity = int(capacity)
+        self.prioritized = prioritized
+        self.alpha = alpha
+        self.beta = beta
+        self.epsilon = epsilon
+        self.random = np.random.default_rng(seed)
+        self.size = 0
+        self.next = 0
+        self.maxPriority = 1.0
+        self.rewards = np.zeros(self.capacity)
+        self.priorities = np.zeros(self.capacity)
+        self.allocate(1, 1)
+
+    def allocate(self, width, numActions):
+        """
+        (Re)allocates the feature arrays for vectors of up to width
+        nonzeros and up to numActions next actions, keeping stored data.
+        """
+        old = getattr(self, 'ids', None)
+        ids = np.zeros((self.capacity, width), dtype=np.int64)
+        values = np.zeros((self.capacity, width))
+        nextIds = np.zeros((self.capacity, numActions, width), dtype=np.int64)
+        nextValues = np.zeros((self.capacity, numActions, width))
+        nextMask = np.zeros((self.capacity, numActions), dtype=bool)
+        if old is not None:
+            w, a = self.width, self.numActions
+            ids[:, :w] = self.ids
+            values[:, :w] = self.values
+            nextIds[:, :a, :w] = self.nextIds
+            nextValues[:, :a, :w] = self.nextValues
+            nextMask[:, :a] = self.nextMask
+        self.ids, self.values = ids, values
+        self.nextIds, self.nextValues, self.nextMask = nextIds, nextValues, nextMask
+        self.width, self.numActions = width, numActions
+
+    def __len__(self):
+        return self.size
+
+    def add(self, features, reward, nextFeatures):
+        """
+        Stores one transition.  features is an (ids, values) pair of
+        arrays; nextFeatures a list of such pairs, one per legal action of
+        the next state.
+        """
+        width = max([len(features[0])] + [len(ids) for ids, _ in nextFeatures])
+        if width > self.width or len(nextFeatures) > self.numActions:
+            self.allocate(max(width, self.width), max(len(nextFeatures), self.numActions))
+        i = self.next
+        self.ids[i] = 0
+        self.values[i] = 0.0
+        self.ids[i, :len(features[0])] = features[0]
+        self.values[i, :len(features[1])] = features[1]
+        self.rewards[i] = reward
+        self.nextIds[i] = 0
+        self.nextValues[i] = 0.0
+        self.nextMask[i] = False
+        for a, (ids, values) in enumerate(nextFeatures):
+            self.nextIds[i, a, :len(ids)] = ids
+            self.nextValues[i, a, :len(values)] = values
+            self.nextMask[i, a] = True
+        # New transitions get the highest priority so far, so they are
+        # replayed at least once soon.
+        self.priorities[i] = self.maxPriority
+        self.next = (i + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    def sample(self, batchSize):
+        """
+        Returns (indices, importance weights) of a mini-batch.
+        """
+        if not self.prioritized:
+            indices = self.random.integers(0, self.size, batchSize)
+            return indices, np.ones(batchSize)
+        scaled = self.priorities[:self.size] ** self.alpha
+        probabilities = scaled / scaled.sum()
+        cumulative = np.cumsum(probabilities)
+        draws = self.random.random(batchSize) * cumulative[-1]
+        indices = np.minimum(np.searchsorted(cumulative, draws, side='right'), self.size - 1)
+        weights = (self.size * probabilities[indices]) ** -self.beta
+        return indices, weights / weights.max()
+
+    def tdErrors(self, weights, indices, discount):
+        """
+        delta = r + discount * max_a' w . f(s', a') - w . f(s, a) for the
+        given transitions; terminal next states contribute 0.
+        """
+        q = (weights[self.ids[indices]] * self.values[indices]).sum(axis=1)
+        nextQ = (weights[self.nextIds[indices]] * self.nextValues[indices]).sum(axis=2)
+        mask = self.nextMask[indices]
+        nextValue = np.where(mask, nextQ, -np.inf).max(axis=1)
+        nextValue[~mask.any(axis=1)] = 0.0
+        return self.rewards[indices] + discount * nextValue - q
+
+    def learn(self, weights, batchSize, rate, discount):
+        """
+        One mini-batch gradient step on the weight array (modified in
+        place).  Returns the mean absolute TD error of the batch.
+        """
+        if self.size == 0:
+            return 0.0
+        indices, importance = self.sample(batchSize)
+        deltas = self.tdErrors(weights, indices, discount)
+        steps = (rate / len(indices)) * importance * deltas
+        np.add.at(weights, self.ids[indices], steps[:, None] * self.values[indices])
+        if self.prioritized:
+            priorities = np.abs(deltas) + self.epsilon
+            self.priorities[indices] = priorities
+            self.maxPriority = max(self.maxPriority, float(priorities.max()))
+        return float(np.abs(deltas).mean())
@@ -242,6 +242,106 @@ class PriorityQueue:
             self.push(item, priority)
 
 
+class IndexedPriorityQueue:
+    """
+    A priority queue of distinct items that remembers where each item sits
+    in the heap, so update (decrease-key) costs O(log n) instead of the
+    linear scan and re-heapify of PriorityQueue.update.  push, pop, isEmpty
+    and update behave like PriorityQueue's, including breaking ties between
+    equal priorities by insertion order.
+    """
+
+    def __init__(self):
+        self.heap = []
+        self.positions = {}
+        self.count = 0
+
+    def push(self, item, priority):
+        "Adds item; an item already in the queue just gets the new priority."
+        if item in self.positions:
+            index = self.positions[item]
+            oldPriority = self.heap[index][0]
+            self.heap[index][0] = priority
+            if priority < oldPriority:
+                self._siftUp(index)
+            else:
+                self._siftDown(index)
+            return
+        self.heap.append([priority, self.count, item])
+        self.positions[item] = len(self.heap) - 1
+        self.count += 1
+        self._siftUp(len(self.heap) - 1)
+
+    def pop(self):
+        heap = self.heap
+        last = heap.pop()
+        if not heap:
+            del self.positions[last[2]]
+            return last[2]
+        entry = heap[0]
+        heap[0] = last
+        self.positions[last[2]] = 0
+        del self.positions[entry[2]]
+        self._siftDown(0)
+        return entry[2]
+
+    def isEmpty(self):
+        return len(self.heap) == 0
+
+    def update(self, item, priority):
+        # Same contract as PriorityQueue.update: only ever lowers a priority.
+        index = self.positions.get(item)
+        if index is None:
+            self.push(item, priority)
+        elif priority < self.heap[index][0]:
+            self.heap[index][0] = priority
+            self._siftUp(index)
+
+    def __contains__(self, item):
+        return item in self.positions
+
+    def __len__(self):
+        return len(self.heap)
+
+    def _siftUp(self, index):
+        heap, positions = self.heap, self.positions
+        entry = heap[index]
+        key = (entry[0], entry[1])
+        while index > 0:
+            parentIndex = (index - 1) >> 1
+            parent = heap[parentIndex]
+            if key >= (parent[0], parent[1]):
+                break
+            heap[index] = parent
+            positions[parent[2]] = index
+            index = parentIndex
+        heap[index] = entry
+        positions[entry[2]] = index
+
+    def _siftDown(self, index):
+        heap, positions = self.heap, self.positions
+        size = len(heap)
+        entry = heap[index]
+        key = (entry[0], entry[1])
+        while True:
+            childIndex = 2 * index + 1
+            if childIndex >= size:
+                break
+            child = heap[childIndex]
+            rightIndex = childIndex + 1
+            if rightIndex < size:
+                right = heap[rightIndex]
+                if (right[0], right[1]) < (child[0], child[1]):
+                    childIndex, child = rightIndex, right
+            if key <= (child[0], child[1]):
+                break
+            heap[index] = child
+            positions[child[2]] = index
+            index = childIndex
+        heap[index] = entry
+        positions[entry[2]] = index
+
+
 class PriorityQueueWithFunction(PriorityQueue):
     """
     Implements a priority queue with the same push/pop signature of the
@@ -30,6 +30,8 @@ import mdp, util
 
 from learningAgents import ValueEstimationAgent
 import collections
+import mdpCompiler
+import numpy as np
 
 class ValueIterationAgent(ValueEstimationAgent):
     """
@@ -62,7 +64,33 @@ class ValueIterationAgent(ValueEstimationAgent):
     def runValueIteration(self):
         # Write value iteration code here
         "*** YOUR CODE HERE ***"
+        # The MDP is compiled once into arrays (see mdpCompiler.py) and each
+        # iteration is one batch Bellman backup over all states.
+        compiled = self.getCompiledMDP()
+        values, _ = compiled.valueIteration(self.discount, self.iterations)
+        self.setValueArray(values)
 
+    def getCompiledMDP(self):
+        """
+          The array form of self.mdp, compiled on first use.
+        """
+        if getattr(self, 'compiled', None) is None:
+            self.compiled = mdpCompiler.compileMDP(self.mdp)
+        return self.compiled
+
+    def setValueArray(self, values):
+        """
+          Stores an array of values indexed like self.compiled.states.
+        """
+        self.values = util.Counter(self.getCompiledMDP().arrayToValues(values))
+
+    def getQValues(self):
+        """
+          All Q-values at once as a [state, action] array laid out like
+          self.compiled (-inf for illegal actions).
+        """
+        compiled = self.getCompiledMDP()
+        return compiled.qValues(compiled.valuesToArray(self.values), self.discount)
 
     def getValue(self, state):
         """
@@ -77,7 +105,7 @@ class ValueIterationAgent(ValueEstimationAgent):
           value function stored in self.values.
         """
         "*** YOUR CODE HERE ***"
-        util.raiseNotDefined()
+        return self.getCompiledMDP().qValue(self.values, self.discount, state, action)
 
     def computeActionFromValues(self, state):
         """
@@ -89,7 +117,12 @@ class ValueIterationAgent(ValueEstimationAgent):
           terminal state, you should return None.
         """
         "*** YOUR CODE HERE ***"
-        util.raiseNotDefined()
+        bestAction, bestValue = None, None
+        for action in self.mdp.getPossibleActions(state):
+            value = self.computeQValueFromValues(state, action)
+            if bestValue is None or value > bestValue:
+                bestAction, bestValue = action, value
+        return bestAction
 
     def getPolicy(self, state):
         return self.computeActionFromValues(state)
@@ -121,4 +154,101 @@ class PrioritizedSweepingValueIterationAgent(ValueIterationAgent):
 
     def runValueIteration(self):
         "*** YOUR CODE HERE ***"
+        # Predecessors come from the compiled MDP's index and the queue
+        # supports decrease-key, so each update costs O(log n) rather than a
+        # scan over all states or queue entries.
+        compiled = self.getCompiledMDP()
+        predecessors = compiled.getPredecessors()
+        fixed = compiled.fixed.tolist()
+        zeros = np.zeros(compiled.numStates)
+        diffs = np.abs(compiled.bellmanBackup(zeros, self.discount)).tolist()
+        queue = util.IndexedPriorityQueue()
+        for s in range(compiled.numStates):
+            if not compiled.terminal[s]:
+                queue.push(s, -diffs[s])
+
+        values = zeros.tolist()
+        for iteration in range(self.iterations):
+            if queue.isEmpty():
+                break
+            s = queue.pop()
+            if not fixed[s]:
+                values[s] = compiled.stateBackup(values, self.discount, s)
+            for p in predecessors[s]:
+                diff = abs(values[p] - compiled.stateBackup(values, self.discount, p))
+                if diff > self.theta:
+                    queue.update(p, -diff)
+        self.setValueArray(np.array(values))
+
+
+class PolicyIterationAgent(ValueIterationAgent):
+    """
+        A PolicyIterationAgent alternates policy evaluation with greedy
+        policy improvement until the policy stops changing.
 
+        Evaluation is an exact linear solve when the compiled MDP allows it
+        (see CompiledMDP.solvePolicy) and iterative sweeps otherwise.  An
+        action is only replaced by one whose Q-value is better by more than
+        tolerance; iterations caps the number of improvement steps.
+
+        After construction, self.backups counts the full Bellman backups
+        (one per improvement step) and self.sweeps the iterative policy
+        evaluation sweeps, for comparison with value iteration.
+    """
+    def __init__(self, mdp, discount = 0.9, tolerance = 1e-6, iterations = 1000):
+        self.tolerance = tolerance
+        ValueIterationAgent.__init__(self, mdp, discount, iterations)
+
+    def runValueIteration(self):
+        compiled = self.getCompiledMDP()
+        values = np.zeros(compiled.numStates)
+        _, policy = compiled.greedyBackup(values, self.discount)
+        self.backups = 0
+        self.sweeps = 0
+        while self.backups < self.iterations:
+            values = self.evaluatePolicy(policy, values)
+            self.backups += 1
+            policy, changed = compiled.improvePolicy(policy, values, self.discount, self.tolerance)
+            if changed == 0:
+                break
+        self.setValueArray(values)
+
+    def evaluatePolicy(self, policy, values):
+        compiled = self.getCompiledMDP()
+        exact = compiled.solvePolicy(policy, self.discount)
+        if exact is not None:
+            return exact
+        values, sweeps = compiled.policyEvaluation(policy, self.discount, 100000,
+                                                   values, self.tolerance)
+        self.sweeps += sweeps
+        return values
+
+
+class ModifiedPolicyIterationAgent(PolicyIterationAgent):
+    """
+        Modified policy iteration: each round takes one Bellman backup,
+        which also yields the greedy policy, followed by evaluationSweeps - 1
+        sweeps evaluating that policy.  Stops once the backup changes no
+        value by more than tolerance, or after iterations rounds.
+    """
+    def __init__(self, mdp, discount = 0.9, tolerance = 1e-6, iterations = 1000, evaluationSweeps = 5):
+        self.evaluationSweeps = int(evaluationSweeps)
+        PolicyIterationAgent.__init__(self, mdp, discount, tolerance, iterations)
+
+    def runValueIteration(self):
+        compiled = self.getCompiledMDP()
+        values = np.zeros(compiled.numStates)
+        self.backups = 0
+        self.sweeps = 0
+        while self.backups < self.iterations:
+            newValues, policy = compiled.greedyBackup(values, self.discount)
+            self.backups += 1
+            self.sweeps += 1
+            residual = mdpCompiler.maxChange(newValues, values)
+            values = newValues
+            if residual <= self.tolerance:
+                break
+            values, sweeps = compiled.policyEvaluation(policy, self.discount,
+                                                       self.evaluationSweeps - 1, values)
+            self.sweeps += sweeps
+        self.setValueArray(values)
@@ -30,6 +30,7 @@ from game import Agent
 from game import Actions
 from game import Directions
 import re
+import itertools
 
 class GraphEqualityTest(testClasses.TestCase):
 
@@ -371,6 +372,125 @@ class VPITest(testClasses.TestCase):
     def createPublicVersion(self):
         pass
 
+class EinsumInferenceTest(testClasses.TestCase):
+    """
+    Builds numNets random Bayes nets of numVariables variables, with
+    domains of ints, bools and strings, and queries each one with and
+    without evidence.  einsumInference.inferenceByEinsum with the min-fill
+    and min-weight orders, and inferenceByVariableElimination following
+    the same orders, must all match enumeration of the full joint
+    (products of CPT entries) to within 1e-9, and the query domains of
+    their results must keep the value types the net was built with.
+    """
+
+    def __init__(self, question, testDict):
+        super(EinsumInferenceTest, self).__init__(question, testDict)
+        self.seed = int(self.testDict['seed'])
+        self.numNets = int(self.testDict['numNets'])
+        self.numVariables = int(self.testDict['numVariables'])
+        self.maxParents = int(self.testDict['maxParents'])
+        self.numEvidence = int(self.testDict['numEvidence'])
+
+    def makeBayesNet(self, rng):
+        variables = ['V%d' % i for i in range(self.numVariables)]
+        edges = []
+        domains = {}
+        for i, variable in enumerate(variables):
+            for parent in rng.sample(variables[:i], min(i, rng.randint(0, self.maxParents))):
+                edges.append((parent, variable))
+            kind = rng.choice(['int', 'bool', 'str'])
+            if kind == 'bool':
+                domains[variable] = [False, True]
+            elif kind == 'int':
+                domains[variable] = list(range(rng.randint(2, 3)))
+            else:
+                domains[variable] = ['a', 'b', 'c'][:rng.randint(2, 3)]
+        # fillTablesRandomly draws from the global random module
+        random.seed(rng.random())
+        return bayesNet.constructRandomlyFilledBayesNet(variables, edges, domains), variables, domains
+
+    def sampleAssignment(self, net, variables, rng):
+        " Ancestral sample, so evidence taken from it has positive probability "
+        assignment = {}
+        for variable in variables:
+            cpt = net.getCPT(variable)
+            weights = []
+            for value in net.variableDomainsDict()[variable]:
+                assignment[variable] = value
+                weights.append(cpt.getProbability(assignment))
+            assignment[variable] = rng.choices(net.variableDomainsDict()[variable], weights)[0]
+        return assignment
+
+    def enumerateJoint(self, net, variables, queryVariables, evidenceDict):
+        " P(queryVariables | evidenceDict) by summing the full joint "
+        domains = net.variableDomainsDict()
+        cpts = [net.getCPT(variable) for variable in variables]
+        totals = {}
+        for values in itertools.product(*[domains[variable] for variable in variables]):
+            assignment = dict(zip(variables, values))
+            if any(assignment[variable] != value for variable, value in evidenceDict.items()):
+                continue
+            probability = 1.0
+            for cpt in cpts:
+                probability *= cpt.getProbability(assignment)
+            key = tuple(assignment[variable] for variable in queryVariables)
+            totals[key] = totals.get(key, 0.0) + probability
+        total = sum(totals.values())
+        return dict((key, p / total) for key, p in totals.items())
+
+    def compare(self, name, factor, domains, queryVariables, evidenceDict, expected):
+        for variable in queryVariables:
+            domain = factor.variableDomainsDict()[variable]
+            if [type(v) for v in domain] != [type(v) for v in domains[variable]]:
+                self.addMessage('%s: domain of %s is %r, the net was built with %r' % (name, variable, domain, domains[variable]))
+                return False
+        for key, p in expected.items():
+            assignment = dict(evidenceDict)
+            assignment.update(zip(queryVariables, key))
+            q = factor.getProbability(assignment)
+            if abs(p - q) > 1e-9:
+                self.addMessage('%s: P(%s = %s) is %r, enumeration gives %r' % (name, queryVariables, key, q, p))
+                return False
+        return True
+
+    def execute(self, grades, moduleDict, solutionDict):
+        import einsumInference
+        inference = moduleDict['inference']
+        rng = random.Random(self.seed)
+        queries = 0
+        for n in range(self.numNets):
+            net, variables, domains = self.makeBayesNet(rng)
+            domainSizes = dict((v, len(d)) for v, d in net.variableDomainsDict().items())
+            scopes = [set([v]) | set(net.inEdges()[v]) for v in variables]
+            sample = self.sampleAssignment(net, variables, rng)
+            for numEvidence in [0, self.numEvidence]:
+                shuffled = rng.sample(variables, len(variables))
+                queryVariables = shuffled[:rng.randint(1, 2)]
+                evidenceDict = dict((v, sample[v]) for v in shuffled[len(queryVariables):len(queryVariables) + numEvidence])
+                expected = self.enumerateJoint(net, variables, queryVariables, evidenceDict)
+                eliminationVariables = set(variables) - set(queryVariables) - set(evidenceDict)
+                for heuristic in [einsumInference.MIN_FILL, einsumInference.MIN_WEIGHT]:
+                    name = 'net %d, query %s, evidence %s, %s' % (n, queryVariables, evidenceDict, heuristic)
+                    factor = einsumInference.inferenceByEinsum(net, queryVariables, evidenceDict, heuristic=heuristic)
+                    if not self.compare('einsum ' + name, factor, domains, queryVariables, evidenceDict, expected):
+                        return self.testFail(grades)
+                    order = einsumInference.getEliminationOrder(scopes, eliminationVariables, domainSizes, heuristic)
+                    factor = inference.inferenceByVariableElimination(net, queryVariables, evidenceDict, order)
+                    if not self.compare('variable elimination ' + name, factor, domains, queryVariables, evidenceDict, expected):
+                        return self.testFail(grades)
+                    queries += 1
+        self.addMessage('%d queries matched enumeration of the joint' % queries)
+        return self.testPass(grades)
+
+    def writeSolution(self, moduleDict, filePath):
+        handle = open(filePath, 'w')
+        handle.write('# This test checks einsum inference and variable elimination against enumeration of random Bayes nets\n')
+        handle.close()
+
+    def createPublicVersion(self):
+        self.testDict['seed'] = '188'
+        self.seed = 188
+
 def closeNums(x, y):
     return abs(x - y) < 1e-4
 
@@ -664,6 +784,41 @@ class ZeroWeightTest(testClasses.TestCase):
         self.testDict['seed'] = '188'
         self.seed = 188
 
+class CapturedGhostTest(testClasses.TestCase):
+
+    def __init__(self, question, testDict):
+        super(CapturedGhostTest, self).__init__(question, testDict)
+        self.maxMoves = int(self.testDict['maxMoves'])
+        self.inference = self.testDict['inference']
+        self.layout_str = self.testDict['layout'].split('\n')
+        self.numGhosts = int(self.testDict['numGhosts'])
+        self.minCaptures = int(self.testDict['minCaptures'])
+        self.seed = int(self.testDict['seed'])
+
+    def execute(self, grades, moduleDict, solutionDict):
+        random.seed(self.seed)
+        ghosts = [SeededRandomGhostAgent(i) for i in range(1, self.numGhosts+1)]
+        disp = self.question.getDisplay()
+        pac = CapturedGhostAgent(0, inference = self.inference, ghostAgents = ghosts)
+        run(self.layout_str, pac, ghosts, disp, maxMoves = self.maxMoves)
+        if pac.errors:
+            grades.addMessage('%s) beliefs about captured ghosts left their jail on %d moves' % (grades.currentQuestion, pac.errors))
+            return self.testFail(grades)
+        if pac.captures < self.minCaptures:
+            grades.addMessage('%s) only %d ghosts were captured, need %d' % (grades.currentQuestion, pac.captures, self.minCaptures))
+            return self.testFail(grades)
+        grades.addMessage('%s) captured ghosts stayed in jail after %d captures' % (grades.currentQuestion, pac.captures))
+        return self.testPass(grades)
+
+    def writeSolution(self, moduleDict, filePath):
+        handle = open(filePath, 'w')
+        handle.write('# This test checks that captured ghosts are believed to be in jail while the other ghosts are tracked\n')
+        handle.close()
+
+    def createPublicVersion(self):
+        self.testDict['seed'] = '188'
+        self.seed = 188
+
 class DoubleInferenceAgentTest(testClasses.TestCase):
 
     def __init__(self, question, testDict):
@@ -910,6 +1065,27 @@ class ZeroWeightAgent(bustersAgents.BustersAgent):
         return self.reset
 
 
+class CapturedGhostAgent(bustersAgents.GreedyBustersAgent):
+    "Charges the ghosts, checking that every captured ghost is believed to be in its jail"
+
+    def registerInitialState(self, gameState):
+        bustersAgents.GreedyBustersAgent.registerInitialState(self, gameState)
+        self.errors = 0
+        self.captures = 0
+
+    def getAction(self, gameState):
+        action = bustersAgents.GreedyBustersAgent.getAction(self, gameState)
+        livingGhosts = gameState.getLivingGhosts()
+        captured = [i for i in range(len(self.inferenceModules)) if not livingGhosts[i+1]]
+        self.captures = len(captured)
+        for i in captured:
+            jail = self.inferenceModules[i].getJailPosition()
+            if abs(self.ghostBeliefs[i][jail] - 1.0) > 1e-9:
+                self.errors += 1
+                break
+        return action
+
+
 class DoubleInferenceAgent(bustersAgents.BustersAgent):
     "Tracks ghosts and compares to reference inference modules, while moving randomly"
 
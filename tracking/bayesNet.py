@@ -14,9 +14,151 @@
 
 import itertools
 from collections import defaultdict
+from collections.abc import MutableMapping
 import random
 from copy import deepcopy, copy
 
+import numpy as np
+
+
+class Domain(tuple):
+    """
+    An immutable variable domain.  Domains are interned by internDomain, so
+    every factor of a bayes net shares one object per domain and two
+    domains can usually be compared by identity.  Compares equal to any
+    list or tuple with the same values, in the same order.
+    """
+
+    __hash__ = tuple.__hash__
+
+    @property
+    def valueIndices(self):
+        " Dict from each value to its position in the domain (computed once) "
+        try:
+            return self.__dict__['valueIndices']
+        except KeyError:
+            valueIndices = dict([(value, i) for i, value in enumerate(self)])
+            self.__dict__['valueIndices'] = valueIndices
+            return valueIndices
+
+    def __eq__(self, other):
+        if other is self:
+            return True
+        if isinstance(other, (tuple, list)):
+            return tuple.__eq__(self, tuple(other))
+        return NotImplemented
+
+    def __ne__(self, other):
+        equal = self.__eq__(other)
+        return equal if equal is NotImplemented else not equal
+
+    def __repr__(self):
+        return repr(list(self))
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __reduce__(self):
+        return (internDomain, (tuple(self),))
+
+
+# Interned domains, keyed on the values together with their types so that
+# equal values of different types ((0, 1) and (False, True)) are kept
+# apart.  Interning only saves work, so the table is simply emptied when
+# it reaches MAX_INTERNED_DOMAINS.
+DOMAINS = {}
+MAX_INTERNED_DOMAINS = 1024
+
+def internDomain(values):
+    """
+    The shared Domain with the given values (a Domain is returned as is).
+    """
+    if type(values) is Domain:
+        return values
+    values = tuple(values)
+    key = tuple([(type(value), value) for value in values])
+    domain = DOMAINS.get(key)
+    if domain is None:
+        if len(DOMAINS) >= MAX_INTERNED_DOMAINS:
+            DOMAINS.clear()
+        domain = Domain(values)
+        DOMAINS[key] = domain
+    return domain
+
+
+class VariableDomains(MutableMapping):
+    """
+    A variableDomainsDict mapping variables to interned Domains.
+
+    It is an overlay: a base dict, shared between copies and never
+    modified, under a small dict of changes.  Copying one costs only the
+    changes, so bayes nets and factors hand out copies freely, and
+    assigning a variable (for instance to the single value of its
+    evidence) leaves the base and every other copy untouched.  Assigned
+    domains may be any list like; they are interned.
+    """
+
+    def __init__(self, variableDomainsDict=None):
+        if isinstance(variableDomainsDict, VariableDomains):
+            self.__base = variableDomainsDict.__base
+            self.__changes = dict(variableDomainsDict.__changes)
+            self.__removed = set(variableDomainsDict.__removed)
+        else:
+            self.__base = {}
+            if variableDomainsDict is not None:
+                for variable, domain in variableDomainsDict.items():
+                    self.__base[variable] = internDomain(domain)
+            self.__changes = {}
+            self.__removed = set()
+
+    def __getitem__(self, variable):
+        try:
+            return self.__changes[variable]
+        except KeyError:
+            if variable in self.__removed:
+                raise
+            return self.__base[variable]
+
+    def __setitem__(self, variable, domain):
+        self.__changes[variable] = internDomain(domain)
+        self.__removed.discard(variable)
+
+    def __delitem__(self, variable):
+        if variable not in self:
+            raise KeyError(variable)
+        self.__changes.pop(variable, None)
+        if variable in self.__base:
+            self.__removed.add(variable)
+
+    def __contains__(self, variable):
+        return variable in self.__changes or (variable in self.__base and variable not in self.__removed)
+
+    def __iter__(self):
+        for variable in self.__base:
+            if variable not in self.__removed:
+                yield variable
+        for variable in self.__changes:
+            if variable not in self.__base or variable in self.__removed:
+                yield variable
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return repr(dict(self.items()))
+
+    def copy(self):
+        return VariableDomains(self)
+
+    __copy__ = copy
+
+    def __deepcopy__(self, memo):
+        return self.copy()
+
+
 class BayesNet(object):
 
     def __init__(self, variables, inputInEdges, inputOutEdges, inputVariableDomains):
@@ -52,7 +194,7 @@ class BayesNet(object):
             if variable not in self.__outEdges:
                 self.__outEdges[variable] = set()
 
-        self.__variableDomainsDict = inputVariableDomains
+        self.__variableDomainsDict = VariableDomains(inputVariableDomains)
         self.__CPTDict = {}
 
     def variablesSet(self):
@@ -61,7 +203,7 @@ class BayesNet(object):
 
     def variableDomainsDict(self):
         " Returns a copy of the variable domains in the bayes net "
-        return deepcopy(self.__variableDomainsDict)
+        return self.__variableDomainsDict.copy()
 
     def inEdges(self):
         " Returns a copy of the incoming edges in the bayes net "
@@ -137,7 +279,7 @@ class BayesNet(object):
         if variable not in self.__variablesSet:
             raise ValueError("Variable not in bayes net: " + str(variable))
         else:
-            return deepcopy(self.__CPTDict[variable])
+            return self.__CPTDict[variable].copy()
 
     def setCPT(self, variable, CPT):
         """
@@ -175,7 +317,7 @@ class BayesNet(object):
                                        "conditionedVariables: " + str(conditionedVariables) + \
                                        "\nparent: " + str(var))
 
-            self.__CPTDict[variable] = deepcopy(CPT)
+            self.__CPTDict[variable] = CPT.copy()
 
     def getReducedVariableDomains(self, evidenceDict):
         """
@@ -184,7 +326,8 @@ class BayesNet(object):
 
         Returns a new variableDomainsDict where each evidence
         variable's domain is the single value that it is being
-        assigned to (and is otherwise unchanged).
+        assigned to (and is otherwise unchanged).  It is an overlay
+        over the bayes net's domains, so only the evidence is copied.
         """
         reducedVariableDomainsDict = self.variableDomainsDict()
         for (evidenceVariable, value) in evidenceDict.items():
@@ -205,9 +348,12 @@ class BayesNet(object):
         if evidenceDict is None or len(evidenceDict.items()) == 0:
             return self.getCPT(variable)
         else:
-            reducedVariableDomains = self.getReducedVariableDomains(evidenceDict)
-            variableCPT = self.getCPT(variable)
-            return variableCPT.specializeVariableDomains(reducedVariableDomains)
+            return self.__getCPTWithReducedDomains(variable, self.getReducedVariableDomains(evidenceDict))
+
+    def __getCPTWithReducedDomains(self, variable, reducedVariableDomains):
+        if variable not in self.__variablesSet:
+            raise ValueError("Variable not in bayes net: " + str(variable))
+        return self.__CPTDict[variable].specializeVariableDomains(reducedVariableDomains)
 
     def getAllCPTsWithEvidence(self, evidenceDict=None):
         """
@@ -218,7 +364,10 @@ class BayesNet(object):
         If it is not provided, the CPTs for all variables without 
         specializing the domains is provided.
         """
-        return [self.getCPTWithEvidence(var, evidenceDict) for var in self.__variablesSet]
+        if evidenceDict is None or len(evidenceDict.items()) == 0:
+            return [self.getCPT(var) for var in self.__variablesSet]
+        reducedVariableDomains = self.getReducedVariableDomains(evidenceDict)
+        return [self.__getCPTWithReducedDomains(var, reducedVariableDomains) for var in self.__variablesSet]
 
     def easierToParseString(self, printVariableDomainsDict=False):
         " Used internally for computer-readable printing "
@@ -272,18 +421,28 @@ class Factor(object):
 
         self.__unconditionedVariables = set(inputUnconditionedVariables)
         self.__conditionedVariables = set(inputConditionedVariables)
-        self.__variableDomainsDict = deepcopy(inputVariableDomainsDict) # dict that maps {variable : variableDomain}
+        # dict that maps {variable : variableDomain}; the domains are
+        # interned and shared with the input, only the mapping is copied
+        self.__variableDomainsDict = VariableDomains(inputVariableDomainsDict)
 
         self.__variableOrders = dict([(variable, i) for i, variable in enumerate(self.__variables)]) # internal order of the variables
-        self.__probDict = {} # probability values are stored in an {assignmentValuesTuple : probability} dict,
-                            # since we can't index using assignmentDicts. this is why we have to sort
-        products = list(itertools.product(*[inputVariableDomainsDict[variable] for variable in self.__variables]))
-        for assignmentsInOrder in products:
-            self.__probDict[tuple(assignmentsInOrder)] = 0.0
+        # probability values are stored in a dense array with one axis per
+        # variable (in self.__variables order); the entry for a value of a
+        # variable is at that value's position in the variable's domain
+        self.__domains = tuple([self.__variableDomainsDict[variable] for variable in self.__variables])
+        self.__valueIndices = dict([(variable, domain.valueIndices)
+                                    for variable, domain in zip(self.__variables, self.__domains)])
+        self.__table = np.zeros([len(domain) for domain in self.__domains])
 
     def variableDomainsDict(self):
         " Retuns a copy of the variable domains in the factor "
-        return deepcopy(self.__variableDomainsDict)
+        return self.__variableDomainsDict.copy()
+
+    def copy(self):
+        " Returns a copy of the factor, sharing its (immutable) domains "
+        newFactor = Factor(self.__unconditionedVariables, self.__conditionedVariables, self.__variableDomainsDict)
+        newFactor.setArray(self.__table, self.__variables)
+        return newFactor
 
     def variables(self):
         " Retuns a copy of the tuple of variables in the factor "
@@ -318,6 +477,18 @@ class Factor(object):
         if not variablesEqual:
             return False
 
+        if isinstance(other, Factor):
+            # Same values in every domain: compare the tables directly.
+            otherDomains = {}
+            for variable, domain in zip(self.__variables, self.__domains):
+                otherDomain = other.__domains[other.__variableOrders[variable]]
+                if otherDomain is not domain and \
+                        (len(otherDomain) != len(domain) or set(otherDomain) != set(domain)):
+                    return False
+                otherDomains[variable] = domain
+            otherTable = other.__getArrayOver(self.__variables, otherDomains)
+            return not np.any(np.abs(self.__table - otherTable) > 10e-13)
+
         for assignmentDict in self.getAllPossibleAssignmentDicts():
             selfProb = self.getProbability(assignmentDict)
             try:
@@ -356,12 +527,12 @@ class Factor(object):
         Returns the probability entry stored in the factor for that 
         combination of variable assignments.
         """
-        assignmentsInOrder = self.__getAssignmentsInOrder(assignmentDict)
-        if assignmentsInOrder not in self.__probDict:
+        index = self.__getIndex(assignmentDict)
+        if index is None:
             raise ValueError("The input assignmentDict is not contained in this factor: \n" \
                                 +  str(self) + str(assignmentDict))
         else:
-            return self.__probDict[assignmentsInOrder]
+            return float(self.__table[index])
 
     def setProbability(self, assignmentDict, probability):
         """ 
@@ -383,41 +554,187 @@ class Factor(object):
             raise ValueError("Probabilty entries can't be set to negative values: " + \
                                str(probability))
         else:
-
-            assignmentsInOrder = self.__getAssignmentsInOrder(assignmentDict)
-            if assignmentsInOrder not in self.__probDict:
+            index = self.__getIndex(assignmentDict)
+            if index is None:
                 raise ValueError("The input assignmentDict is not contained in this factor: \n" \
                                   +  str(self) + str(assignmentDict))
             else:
-                self.__probDict[assignmentsInOrder] = probability
+                self.__table[index] = probability
 
-    def __getAssignmentsInOrder(self, assignmentDict):
+    def __getIndex(self, assignmentDict):
         """
         Internal utility function for interacting with the stored
-        probability dictionary.
-
-        We would like to store a probability value for each
-        assignmentDict, but dicts aren't hashable since they're
-        mutable, so we can't have a dict with dicts as keys.  
-        So we store the probability table in a dict where the keys are
-        tuples of variable values, without the variable name
-        associated with the value.
+        probability array.
 
-        This function takes an assignmentDict and processes it into an
-        ordered tuple of values where the values are the assignments
-        in assignmentDict.
-        We can then use this tuple to directly index into the
-        probability table dict.
+        Turns an assignmentDict into the tuple of domain positions of the
+        assigned values, one per variable of the factor in axis order,
+        which indexes the array directly.  Returns None if a variable of
+        the factor is unassigned or assigned a value outside its domain.
 
         Use factor.getProbability and factor.setProbability instead,
         for a better interface.
         """
-        reducedAssignmentDict = dict([(var, val) for (var, val) \
-                                      in assignmentDict.items() if var in self.__variablesSet])
-        variablesAndAssignments = reducedAssignmentDict.items()
-        variablesAndAssignments = sorted(variablesAndAssignments, \
-                                         key=lambda var_val_tuple : self.__variableOrders[var_val_tuple[0]])
-        return tuple([val for (var, val) in variablesAndAssignments])
+        try:
+            return tuple([self.__valueIndices[variable][assignmentDict[variable]]
+                          for variable in self.__variables])
+        except (KeyError, TypeError):
+            return None
+
+    def getArray(self, variables=None):
+        """
+        Returns the probability table as a read-only ndarray with one axis
+        per variable, in the order of variables (default: the order of
+        factor.variables()).  Along each axis, entries follow the order
+        of the variable's domain in factor.variableDomainsDict().
+        """
+        table = self.__table
+        if variables is not None:
+            table = table.transpose([self.__variableOrders[variable] for variable in variables])
+        view = table.view()
+        view.flags.writeable = False
+        return view
+
+    def setArray(self, array, variables=None):
+        """
+        Replaces the whole probability table with array, laid out as
+        getArray(variables) returns it.
+        """
+        if variables is None:
+            variables = self.__variables
+        if set(variables) != self.__variablesSet or len(variables) != len(self.__variables):
+            raise ValueError("setArray needs exactly one axis per variable in the factor: " + \
+                               str(variables))
+        array = np.asarray(array, dtype=float)
+        if variables != self.__variables:
+            array = array.transpose([list(variables).index(variable) for variable in self.__variables])
+        if array.shape != self.__table.shape:
+            raise ValueError("Array shape " + str(array.shape) + " doesn't match the factor's domains " + \
+                               str(self.__table.shape))
+        if array.size and array.min() < 0:
+            raise ValueError("Probabilty entries can't be set to negative values")
+        self.__table = np.array(array, dtype=float)
+
+    @classmethod
+    def fromArray(cls, unconditionedVariables, conditionedVariables, variableDomainsDict,
+                  array, variables=None):
+        """
+        Builds a factor and fills its table from array, whose axes follow
+        variables (default: unconditioned then conditioned variables, in
+        the order given).
+        """
+        factor = cls(unconditionedVariables, conditionedVariables, variableDomainsDict)
+        factor.setArray(array, variables)
+        return factor
+
+    def __getIndexer(self, variable, domain):
+        """
+        Positions in this factor's domain of variable of the values in
+        domain, or None if domain is the factor's own domain.  Raises
+        ValueError if a value is not in the factor's domain.
+        """
+        ownDomain = self.__domains[self.__variableOrders[variable]]
+        if domain is ownDomain:
+            return None
+        domain = tuple(domain)
+        if domain == ownDomain:
+            return None
+        valueIndices = self.__valueIndices[variable]
+        try:
+            return np.array([valueIndices[value] for value in domain], dtype=np.int64)
+        except KeyError:
+            raise ValueError("Domain of " + str(variable) + " is not a subset of the factor's domain: " + \
+                               str(domain))
+
+    def __getArrayOver(self, variables, domainsDict):
+        """
+        The table reindexed to the given variables (a superset of the
+        factor's, in any order) and their domains in domainsDict: missing
+        variables become axes of length 1, for broadcasting.
+        """
+        table = self.__table
+        for variable in self.__variables:
+            indexer = self.__getIndexer(variable, domainsDict[variable])
+            if indexer is not None:
+                table = np.take(table, indexer, axis=self.__variableOrders[variable])
+        ownOrder = [variable for variable in variables if variable in self.__variablesSet]
+        table = table.transpose([self.__variableOrders[variable] for variable in ownOrder])
+        shape = [len(domainsDict[variable]) if variable in self.__variablesSet else 1
+                 for variable in variables]
+        return table.reshape(shape)
+
+    @staticmethod
+    def join(factors):
+        """
+        Returns the product of factors, computed by broadcasting their
+        tables against each other.  The result's unconditioned variables
+        are those unconditioned in any input and its conditioned variables
+        the remaining ones; its domains are those of the first factor,
+        which every factor must contain.
+        """
+        factors = list(factors)
+        variableDomainsDict = factors[0].variableDomainsDict()
+        unconditioned, conditioned, variables = [], [], []
+        for factor in factors:
+            for variable in factor.__variables:
+                if variable not in variableDomainsDict:
+                    variableDomainsDict[variable] = factor.__domains[factor.__variableOrders[variable]]
+                if variable not in variables:
+                    variables.append(variable)
+        for variable in variables:
+            if any([variable in factor.__unconditionedVariables for factor in factors]):
+                unconditioned.append(variable)
+            else:
+                conditioned.append(variable)
+
+        table = np.ones([len(variableDomainsDict[variable]) for variable in variables])
+        for factor in factors:
+            table = table * factor.__getArrayOver(variables, variableDomainsDict)
+        newFactor = Factor(unconditioned, conditioned, variableDomainsDict)
+        newFactor.setArray(table, tuple(variables))
+        return newFactor
+
+    def eliminate(self, variable):
+        """
+        Returns the factor with the unconditioned variable summed out of
+        its table.
+        """
+        if variable not in self.__unconditionedVariables:
+            raise ValueError("Elimination variable is not an unconditioned variable " \
+                            + "in this factor\n" + 
+                            "eliminationVariable: " + str(variable) + \
+                            "\nunconditionedVariables:" + str(self.__unconditionedVariables))
+        axis = self.__variableOrders[variable]
+        remaining = self.__variables[:axis] + self.__variables[axis + 1:]
+        newFactor = Factor(self.__unconditionedVariables - set([variable]), self.__conditionedVariables,
+                           self.__variableDomainsDict)
+        newFactor.setArray(self.__table.sum(axis=axis), remaining)
+        return newFactor
+
+    def normalize(self):
+        """
+        Returns the factor scaled to sum to 1, with unconditioned
+        variables that have a single value moved to the conditioned
+        side, or None if the table sums to 0.  Every conditioned
+        variable must have a single value.
+        """
+        for conditionedVariable in self.__conditionedVariables:
+            if len(self.__variableDomainsDict[conditionedVariable]) > 1:
+                print("Factor failed normalize typecheck: ", self)
+                raise ValueError("The factor to be normalized must have only one " + \
+                                "assignment of the \n" + "conditional variables, " + \
+                                "so that total probability will sum to 1\n" + 
+                                str(self))
+        newUCVars, newCVars = self.unconditionedVariables(), self.conditionedVariables()
+        for var in self.__variableDomainsDict:
+            if len(self.__variableDomainsDict[var]) == 1 and var in newUCVars:
+                newUCVars.remove(var)
+                newCVars.add(var)
+        probSum = self.__table.sum()
+        if not probSum:
+            return None
+        newFactor = Factor(newUCVars, newCVars, self.__variableDomainsDict)
+        newFactor.setArray(self.__table / probSum, self.__variables)
+        return newFactor
 
     def getAllPossibleAssignmentDicts(self):
         """
@@ -547,12 +864,15 @@ class Factor(object):
         # Make sure that newVariableDomainsDict has smaller or equal
         # domain to factor.variableDomainsDict for all variables that
         # this factor contains.    
-        oldVariableDomains = self.variableDomainsDict()
-        for (variable, domain) in newVariableDomainsDict.items():
-            if variable in self.variablesSet():
-                oldVariableDomain = oldVariableDomains[variable]
+        for variable in self.__variables:
+            if variable in newVariableDomainsDict:
+                domain = newVariableDomainsDict[variable]
+                oldVariableDomain = self.__domains[self.__variableOrders[variable]]
+                if domain is oldVariableDomain:
+                    continue
+                valueIndices = oldVariableDomain.valueIndices
                 for value in domain:
-                    if value not in oldVariableDomain:
+                    if value not in valueIndices:
                         raise ValueError("newVariableDomainsDict is not a subset of factor.variableDomainsDict ",
                                             "for variables contained in factor. " + "factor: " +  str(self) + 
                                             " newVariableDomainsDict: " + str(newVariableDomainsDict) +
@@ -561,10 +881,7 @@ class Factor(object):
                                             " value: " + str(value))
 
         newFactor = Factor(self.unconditionedVariables(), self.conditionedVariables(), newVariableDomainsDict)
-
-        for assignmentDict in newFactor.getAllPossibleAssignmentDicts():
-            newFactor.setProbability(assignmentDict, self.getProbability(assignmentDict))
-
+        newFactor.setArray(self.__getArrayOver(self.__variables, newVariableDomainsDict), self.__variables)
         return newFactor
 
 
@@ -858,28 +1175,7 @@ def normalize(factor):
     """
     Normalizes, assumes the operation is mathematically valid on the passed in factor.
     """
-    variableDomainsDict = factor.variableDomainsDict()
-    for conditionedVariable in factor.conditionedVariables():
-        if len(variableDomainsDict[conditionedVariable]) > 1:
-            print("Factor failed normalize typecheck: ", factor)
-            raise ValueError("The factor to be normalized must have only one " + \
-                            "assignment of the \n" + "conditional variables, " + \
-                            "so that total probability will sum to 1\n" + 
-                            str(factor))
-    newUCVars, newCVars = factor.unconditionedVariables(), factor.conditionedVariables()
-    for var in variableDomainsDict:
-        if len(variableDomainsDict[var]) == 1 and var in newUCVars:
-            newUCVars.remove(var)
-            newCVars.add(var)
-    newFactor = Factor(newUCVars, newCVars, variableDomainsDict)
-    probSum = sum([factor.getProbability(a) for a in factor.getAllPossibleAssignmentDicts()])
-    if not probSum:
-        return None
-    for a in factor.getAllPossibleAssignmentDicts():
-        normalizedProb = factor.getProbability(a) / probSum
-        newFactor.setProbability(a, normalizedProb)
-
-    return newFactor
+    return factor.normalize()
 
 
 if __name__ == "__main__":
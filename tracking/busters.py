@@ -29,6 +29,8 @@ from util import nearestPoint
 from util import manhattanDistance
 import sys, util, types, time, random, layout, os
 
+import numpy as np
+
 ########################################
 # Parameters for noisy sensor readings #
 ########################################
@@ -44,18 +46,49 @@ def getNoisyDistance(pos1, pos2):
     distance = util.manhattanDistance(pos1, pos2)
     return max(0, distance + util.sample(SONAR_NOISE_PROBS, SONAR_NOISE_VALUES))
 
-observationDistributions = {}
+observationTable = np.zeros((0, 0))
+def getObservationTable(maxNoisyDistance):
+    """
+    Returns the dense table of P( noisyDistance | trueDistance ), indexed
+    [noisyDistance, trueDistance], with a row for every noisy distance from
+    0 to at least maxNoisyDistance.  The table grows (doubling) when a larger
+    noisy distance comes up; its last column is always 0, so true distances
+    too large for the table can be clipped to it.
+    """
+    global observationTable
+    rows = observationTable.shape[0]
+    if maxNoisyDistance >= rows:
+        rows = max(2 * rows, int(maxNoisyDistance) + 1, 64)
+        table = np.zeros((rows, rows + int(SONAR_MAX) + 1))
+        noisyDistances = np.arange(rows)
+        for error , prob in zip(SONAR_NOISE_VALUES, SONAR_NOISE_PROBS):
+            table[noisyDistances, np.maximum(1, noisyDistances - int(error))] += prob
+        observationTable = table
+    return observationTable
+
 def getObservationProbability(noisyDistance, trueDistance):
     """
     Returns the probability P( noisyDistance | trueDistance ).
     """
-    global observationDistributions
-    if noisyDistance not in observationDistributions:
-        distribution = util.Counter()
-        for error , prob in zip(SONAR_NOISE_VALUES, SONAR_NOISE_PROBS):
-            distribution[max(1, noisyDistance - error)] += prob
-        observationDistributions[noisyDistance] = distribution
-    return observationDistributions[noisyDistance][trueDistance]
+    if noisyDistance < 0 or trueDistance < 0 or noisyDistance != int(noisyDistance) \
+            or trueDistance != int(trueDistance):
+        # Not in the table: add up the noise model directly
+        return sum([prob for error, prob in zip(SONAR_NOISE_VALUES, SONAR_NOISE_PROBS)
+                    if max(1, noisyDistance - error) == trueDistance])
+    table = getObservationTable(noisyDistance)
+    return float(table[int(noisyDistance), min(int(trueDistance), table.shape[1] - 1)])
+
+def getObservationProbabilities(noisyDistance, trueDistances):
+    """
+    Returns P( noisyDistance | trueDistance ) for every entry of the integer
+    array trueDistances, as an array of the same shape.
+    """
+    trueDistances = np.asarray(trueDistances)
+    if noisyDistance < 0 or noisyDistance != int(noisyDistance) or \
+            (trueDistances.size and trueDistances.min() < 0):
+        return np.vectorize(getObservationProbability, otypes=[float])(noisyDistance, trueDistances)
+    table = getObservationTable(noisyDistance)
+    return table[int(noisyDistance)][np.minimum(trueDistances, table.shape[1] - 1)]
 
 ###################################################
 # YOUR INTERFACE TO THE PACMAN WORLD: A GameState #
@@ -32,6 +32,8 @@ class NullGraphics:
         pass
     def updateDistributions(self, dist):
         pass
+    def updateBeliefArrays(self, beliefArrays, cellPositions):
+        pass
     def finish(self):
         pass
 
@@ -100,7 +102,8 @@ class BustersAgent:
             if self.observeEnable:
                 inf.observe(gameState)
             self.ghostBeliefs[index] = inf.getBeliefDistribution()
-        self.display.updateDistributions(self.ghostBeliefs)
+        self.display.updateBeliefArrays([inf.getBeliefArray() for inf in self.inferenceModules],
+                                        [inf.cellPositions for inf in self.inferenceModules])
         return self.chooseAction(gameState)
 
     def chooseAction(self, gameState):
@@ -149,5 +152,9 @@ class GreedyBustersAgent(BustersAgent):
             [beliefs for i, beliefs in enumerate(self.ghostBeliefs)
              if livingGhosts[i+1]]
         "*** YOUR CODE HERE ***"
-        raiseNotDefined()
+        ghostPositions = [beliefs.argMax() for beliefs in livingGhostPositionDistributions]
+        closestGhost = min(ghostPositions,
+                           key=lambda position: self.distancer.getDistance(pacmanPosition, position))
+        return min(legal, key=lambda action: self.distancer.getDistance(
+            Actions.getSuccessor(pacmanPosition, action), closestGhost))
         "*** END YOUR CODE HERE ***"
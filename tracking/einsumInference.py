@@ -0,0 +1,262 @@
+# einsumInference.py
+# ------------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+Variable elimination compiled to numpy.einsum calls.
+
+A query P(queryVariables | evidence) is compiled into a ContractionPlan
+that depends only on the structure of the Bayes net (variables, parents
+and domain sizes), the query variables and which variables are evidence.
+Compiling:
+
+  - drops barren variables, those that are neither query or evidence
+    variables nor ancestors of one (their CPTs sum out to 1);
+  - picks an elimination order for the rest, by the min-fill or min-weight
+    heuristic unless one is given;
+  - records, for each eliminated variable, which factors to multiply and
+    the einsum subscripts that multiply them and sum the variable out.
+
+Running a plan slices the evidence values out of the CPT arrays, performs
+its einsum calls and normalizes.  Plans are cached, so repeated queries
+with different evidence values only do the numeric work.
+
+> factor = einsumInference.inferenceByEinsum(bayesNet, ['Ghost0'], {'Observation0': 3})
+"""
+
+import numpy as np
+
+from bayesNet import Factor
+
+MIN_FILL = 'minfill'
+MIN_WEIGHT = 'minweight'
+
+PLAN_CACHE = {}
+PLAN_CACHE_SIZE = 256
+
+
+def getStructureKey(bayesNet):
+    """
+    A hashable summary of everything a plan depends on: each variable
+    with its sorted parents and domain size.
+    """
+    inEdges = bayesNet.inEdges()
+    domains = bayesNet.variableDomainsDict()
+    return tuple(sorted((variable, tuple(sorted(inEdges[variable])), len(domains[variable]))
+                        for variable in bayesNet.variablesSet()))
+
+
+def getRelevantVariables(inEdges, variables):
+    """
+    The given variables and all their ancestors.
+    """
+    relevant = set(variables)
+    stack = list(variables)
+    while stack:
+        for parent in inEdges[stack.pop()]:
+            if parent not in relevant:
+                relevant.add(parent)
+                stack.append(parent)
+    return relevant
+
+
+def getEliminationOrder(scopes, eliminationVariables, domainSizes, heuristic=MIN_FILL):
+    """
+    Greedy elimination order over the interaction graph of the factor
+    scopes.  min-fill picks the variable whose elimination adds the
+    fewest new edges (ties broken by weight), min-weight the one whose
+    neighbourhood has the smallest table; remaining ties go to the
+    variable that sorts first.
+    """
+    if heuristic not in (MIN_FILL, MIN_WEIGHT):
+        raise ValueError("Unknown elimination heuristic: " + str(heuristic))
+    neighbours = dict((variable, set()) for scope in scopes for variable in scope)
+    for scope in scopes:
+        for variable in scope:
+            neighbours[variable].update(scope)
+    for variable in neighbours:
+        neighbours[variable].discard(variable)
+
+    def weight(variable):
+        size = domainSizes[variable]
+        for neighbour in neighbours[variable]:
+            size *= domainSizes[neighbour]
+        return size
+
+    def fill(variable):
+        adjacent = sorted(neighbours[variable])
+        return sum(1 for i, u in enumerate(adjacent) for v in adjacent[i + 1:]
+                   if v not in neighbours[u])
+
+    remaining = set(eliminationVariables)
+    order = []
+    while remaining:
+        if heuristic == MIN_FILL:
+            best = min(remaining, key=lambda variable: (fill(variable), weight(variable), variable))
+        else:
+            best = min(remaining, key=lambda variable: (weight(variable), variable))
+        adjacent = neighbours.pop(best)
+        for u in adjacent:
+            neighbours[u].discard(best)
+            neighbours[u].update(adjacent - set([u]))
+        remaining.remove(best)
+        order.append(best)
+    return order
+
+
+def einsumArguments(scopes, outputScope):
+    """
+    Interleaved (operand index, sublist) arguments for numpy.einsum, with
+    variables numbered locally so any number of variables in the net can
+    be used.
+    """
+    labels = {}
+    for scope in list(scopes) + [outputScope]:
+        for variable in scope:
+            if variable not in labels:
+                labels[variable] = len(labels)
+    return [[labels[variable] for variable in scope] for scope in scopes], \
+           [labels[variable] for variable in outputScope]
+
+
+class ContractionPlan:
+    """
+    The compiled form of one kind of query.  self.factorScopes lists the
+    CPTs used, as (variable, axis order of its CPT array, scope after
+    evidence is sliced out); self.steps the einsum calls, as (indices of
+    the factors consumed, their sublists, output sublist, output scope).
+    """
+
+    def __init__(self, bayesNet, queryVariables, evidenceVariables, eliminationOrder=None,
+                 heuristic=MIN_FILL):
+        self.queryVariables = tuple(queryVariables)
+        self.evidenceVariables = tuple(sorted(evidenceVariables))
+        evidenceSet = set(evidenceVariables)
+        overlap = evidenceSet & set(queryVariables)
+        if overlap:
+            raise ValueError("Query variables can't also be evidence variables: " + str(overlap))
+
+        inEdges = bayesNet.inEdges()
+        domains = bayesNet.variableDomainsDict()
+        domainSizes = dict((variable, len(domain)) for variable, domain in domains.items())
+        relevant = getRelevantVariables(inEdges, list(queryVariables) + list(evidenceVariables))
+
+        self.factorScopes = []
+        for variable in sorted(relevant):
+            axes = (variable,) + tuple(sorted(inEdges[variable]))
+            scope = tuple(v for v in axes if v not in evidenceSet)
+            self.factorScopes.append((variable, axes, scope))
+
+        toEliminate = relevant - evidenceSet - set(queryVariables)
+        scopes = [scope for _, _, scope in self.factorScopes]
+        if eliminationOrder is None:
+            eliminationOrder = []
+        order = [variable for variable in eliminationOrder if variable in toEliminate]
+        rest = toEliminate - set(order)
+        if rest:
+            # Eliminate the given variables first, then order the rest.
+            order += getEliminationOrder(scopes, rest, domainSizes, heuristic)
+        self.eliminationOrder = tuple(order)
+
+        self.steps = []
+        self.largestTable = 0
+        for variable in self.eliminationOrder:
+            used = [i for i, scope in enumerate(scopes) if variable in scope]
+            if not used:
+                continue
+            joinedScope = []
+            for i in used:
+                for v in scopes[i]:
+                    if v not in joinedScope:
+                        joinedScope.append(v)
+            self.largestTable = max(self.largestTable, int(np.prod([domainSizes[v] for v in joinedScope])))
+            outputScope = tuple(v for v in joinedScope if v != variable)
+            self.addStep(scopes, used, outputScope)
+
+        self.addStep(scopes, list(range(len(scopes))), self.queryVariables)
+
+    def addStep(self, scopes, used, outputScope):
+        sublists, output = einsumArguments([scopes[i] for i in used], outputScope)
+        self.steps.append((tuple(used), sublists, output, outputScope))
+        for i in reversed(used):
+            del scopes[i]
+        scopes.append(outputScope)
+
+    def getFactorArrays(self, bayesNet, evidenceDict):
+        arrays = []
+        for variable, axes, scope in self.factorScopes:
+            CPT = bayesNet.getCPT(variable)
+            array = CPT.getArray(axes)
+            cptDomains = CPT.variableDomainsDict()
+            # Slice evidence axes from the last so earlier axis numbers hold.
+            for axis in reversed(range(len(axes))):
+                if axes[axis] in evidenceDict:
+                    domain = list(cptDomains[axes[axis]])
+                    array = np.take(array, domain.index(evidenceDict[axes[axis]]), axis=axis)
+            arrays.append(array)
+        return arrays
+
+    def run(self, bayesNet, evidenceDict):
+        """
+        P(queryVariables | evidenceDict) as a Factor, or None if the
+        evidence has probability 0.
+        """
+        if set(evidenceDict) != set(self.evidenceVariables):
+            raise ValueError("The plan was compiled for evidence on " + str(self.evidenceVariables))
+        arrays = self.getFactorArrays(bayesNet, evidenceDict)
+        for used, sublists, output, _ in self.steps:
+            arguments = []
+            for i, sublist in zip(used, sublists):
+                arguments += [arrays[i], sublist]
+            arguments.append(output)
+            result = np.einsum(*arguments, optimize=len(used) > 2)
+            for i in reversed(used):
+                del arrays[i]
+            arrays.append(result)
+        joint = arrays[-1]
+
+        reducedDomains = bayesNet.getReducedVariableDomains(evidenceDict)
+        variables = self.queryVariables + self.evidenceVariables
+        joint = joint.reshape(joint.shape + (1,) * len(self.evidenceVariables))
+        jointFactor = Factor.fromArray(self.queryVariables, self.evidenceVariables, reducedDomains,
+                                       joint, variables)
+        return jointFactor.normalize()
+
+
+def compilePlan(bayesNet, queryVariables, evidenceVariables, eliminationOrder=None,
+                heuristic=MIN_FILL):
+    """
+    Returns the (cached) ContractionPlan of a query.
+    """
+    key = (getStructureKey(bayesNet), tuple(queryVariables), frozenset(evidenceVariables),
+           None if eliminationOrder is None else tuple(eliminationOrder), heuristic)
+    plan = PLAN_CACHE.get(key)
+    if plan is None:
+        if len(PLAN_CACHE) >= PLAN_CACHE_SIZE:
+            PLAN_CACHE.clear()
+        plan = ContractionPlan(bayesNet, queryVariables, evidenceVariables, eliminationOrder, heuristic)
+        PLAN_CACHE[key] = plan
+    return plan
+
+
+def inferenceByEinsum(bayesNet, queryVariables, evidenceDict, eliminationOrder=None,
+                      heuristic=MIN_FILL):
+    """
+    P(queryVariables | evidenceDict), the same factor
+    inference.inferenceByVariableElimination returns.  Without an
+    eliminationOrder the heuristic ('minfill' or 'minweight') picks one.
+    """
+    if evidenceDict is None:
+        evidenceDict = {}
+    plan = compilePlan(bayesNet, queryVariables, evidenceDict.keys(), eliminationOrder, heuristic)
+    return plan.run(bayesNet, evidenceDict)
@@ -102,7 +102,7 @@ def joinFactors(factors: List[Factor]):
 
 
     "*** YOUR CODE HERE ***"
-    raiseNotDefined()
+    return Factor.join(factors)
     "*** END YOUR CODE HERE ***"
 
 ########### ########### ###########
@@ -153,7 +153,7 @@ def eliminateWithCallTracking(callTrackingList=None):
                     "unconditionedVariables: " + str(factor.unconditionedVariables()))
 
         "*** YOUR CODE HERE ***"
-        raiseNotDefined()
+        return factor.eliminate(eliminationVariable)
         "*** END YOUR CODE HERE ***"
 
     return eliminate
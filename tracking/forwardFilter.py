@@ -0,0 +1,152 @@
+# forwardFilter.py
+# ----------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+The forward algorithm over a fixed list of ghost positions, with numpy.
+
+A ForwardFilter numbers the positions an InferenceModule tracks
+(allPositions, jail last) and keeps beliefs as a vector over them.
+
+  - The observation update multiplies the beliefs by the likelihood of
+    the noisy distance at every position, looked up in
+    busters.getObservationTable.  Distances from each Pacman position to
+    every ghost position are computed once and kept.
+  - The time update multiplies the beliefs by the transition matrix,
+    stored sparsely as (new position, old position, probability)
+    arrays.  A matrix depends on the game only through Pacman's position
+    and the kind of ghost, so it is built once, from
+    getPositionDistribution, for each (Pacman position, ghost agent type)
+    and reused.
+
+Probability that the transition model sends to positions outside the
+list (which no ghost can reach in the layouts used here) is dropped.
+"""
+
+import numpy as np
+
+import busters
+
+
+class ForwardFilter:
+
+    def __init__(self, positions, jailPosition=None):
+        self.positions = list(positions)
+        self.positionIndices = dict((position, i) for i, position in enumerate(self.positions))
+        # Needed only for observations
+        self.jailIndex = None if jailPosition is None else self.positionIndices[jailPosition]
+        coordinates = np.array(self.positions, dtype=np.int64).reshape(-1, 2)
+        self.xs, self.ys = coordinates[:, 0], coordinates[:, 1]
+        self.distances = {}
+        self.transitions = {}
+
+    def uniform(self, positions):
+        """
+        The uniform belief vector over the given positions.
+        """
+        beliefs = np.zeros(len(self.positions))
+        beliefs[[self.positionIndices[position] for position in positions]] = 1.0
+        return beliefs / beliefs.sum()
+
+    def getDistribution(self, beliefs, distribution):
+        """
+        Fills the dict-like distribution with the beliefs, by position.
+        """
+        distribution.update(zip(self.positions, beliefs.tolist()))
+        return distribution
+
+    ##################
+    # Observations   #
+    ##################
+
+    def getDistances(self, pacmanPosition):
+        """
+        Manhattan distances from pacmanPosition to every position.
+        """
+        distances = self.distances.get(pacmanPosition)
+        if distances is None:
+            x, y = pacmanPosition
+            distances = np.abs(self.xs - x) + np.abs(self.ys - y)
+            self.distances[pacmanPosition] = distances
+        return distances
+
+    def getObservationLikelihoods(self, noisyDistance, pacmanPosition):
+        """
+        P(noisyDistance | pacmanPosition, ghost position) for every
+        position.  A ghost in jail is observed as None, and only it is.
+        """
+        likelihoods = np.zeros(len(self.positions))
+        if noisyDistance is None:
+            likelihoods[self.jailIndex] = 1.0
+            return likelihoods
+        likelihoods = busters.getObservationProbabilities(noisyDistance, self.getDistances(pacmanPosition))
+        likelihoods[self.jailIndex] = 0.0
+        return likelihoods
+
+    def observe(self, beliefs, noisyDistance, pacmanPosition):
+        """
+        Normalized beliefs after the observation; all zero if the
+        observation is impossible under the beliefs.
+        """
+        updated = beliefs * self.getObservationLikelihoods(noisyDistance, pacmanPosition)
+        total = updated.sum()
+        return updated / total if total > 0 else updated
+
+    ##################
+    # Transitions    #
+    ##################
+
+    def getTransitions(self, inferenceModule, gameState):
+        """
+        The transition matrix of the module's ghost with Pacman where he is
+        in gameState, as arrays (new position indices, old position
+        indices, probabilities).
+        """
+        pacmanPosition = gameState.getPacmanPosition()
+        key = (pacmanPosition, type(inferenceModule.ghostAgent))
+        transitions = self.transitions.get(key)
+        if transitions is None:
+            # Like getPositionDistribution, this moves the ghost around in
+            # gameState, which is the module's own copy of the game.
+            transitions = self.buildTransitions(
+                lambda position: inferenceModule.getPositionDistribution(gameState, position))
+            self.transitions[key] = transitions
+        return transitions
+
+    def buildTransitions(self, getDistribution, indices=None):
+        """
+        Transition arrays from getDistribution(old position), a dict from
+        new positions to probabilities, for the positions at indices (all
+        by default); the others get no transitions.
+        """
+        if indices is None:
+            indices = range(len(self.positions))
+        newIndices, oldIndices, probabilities = [], [], []
+        for oldIndex in indices:
+            distribution = getDistribution(self.positions[oldIndex])
+            for newPosition, probability in distribution.items():
+                newIndex = self.positionIndices.get(newPosition)
+                if newIndex is not None and probability > 0:
+                    newIndices.append(newIndex)
+                    oldIndices.append(oldIndex)
+                    probabilities.append(probability)
+        return (np.array(newIndices, dtype=np.int64), np.array(oldIndices, dtype=np.int64),
+                np.array(probabilities))
+
+    def elapse(self, beliefs, inferenceModule, gameState):
+        """
+        Beliefs one time step later: one sparse matrix-vector product.
+        """
+        newIndices, oldIndices, probabilities = self.getTransitions(inferenceModule, gameState)
+        return np.bincount(newIndices, weights=probabilities * beliefs[oldIndices],
+                           minlength=len(self.positions))
@@ -14,6 +14,7 @@
 
 from graphicsUtils import *
 import math, time
+import numpy as np
 from game import Directions
 
 ###########################
@@ -60,6 +61,11 @@ SCARED_COLOR = formatColor(1,1,1)
 
 GHOST_VEC_COLORS = list(map(colorToVector, GHOST_COLORS))
 
+# Beliefs are drawn in colour buckets: one per value of formatColor's
+# 8-bit channels, numbered 0xRRGGBB.  A cell is redrawn only when its
+# bucket changes.
+BELIEF_COLOR_LEVELS = 255
+
 PACMAN_COLOR = formatColor(255.0/255.0,255.0/255.0,61.0/255)
 PACMAN_SCALE = 0.5
 #pacman_speed = 0.25
@@ -200,6 +206,9 @@ class PacmanGraphics:
                                 filled = 1, behind=2)
                 distx.append(block)
         self.distributionImages = dist
+        # Cell (x, y) is number x * height + y in the flat arrays below
+        self.distributionImageList = [image for distx in dist for image in distx]
+        self.distributionBuckets = np.zeros(len(self.distributionImageList), dtype=np.int64)
 
     def drawStaticObjects(self, state):
         layout = self.layout
@@ -588,24 +597,44 @@ class PacmanGraphics:
 
     def updateDistributions(self, distributions):
         "Draws an agent's belief distributions"
-        # copy all distributions so we don't change their state
-        distributions = list(map(lambda x: x.copy(), distributions))
+        positions = [list(dist.keys()) for dist in distributions]
+        beliefArrays = [np.array([dist[position] for position in cells], dtype=float)
+                        for dist, cells in zip(distributions, positions)]
+        self.updateBeliefArrays(beliefArrays, positions)
+
+    def updateBeliefArrays(self, beliefArrays, cellPositions):
+        """
+        Draws the agents' beliefs given as numpy vectors indexed by cell id:
+        beliefArrays[i][c] is the belief that ghost i is at cellPositions[i][c].
+        """
         if self.distributionImages == None:
             self.drawDistributions(self.previousState)
-        for x in range(len(self.distributionImages)):
-            for y in range(len(self.distributionImages[0])):
-                image = self.distributionImages[x][y]
-                weights = [dist[ (x,y) ] for dist in distributions]
-
-                if sum(weights) != 0:
-                    pass
-                # Fog of war
-                color = [0.0,0.0,0.0]
-                colors = GHOST_VEC_COLORS[1:] # With Pacman
-                if self.capture: colors = GHOST_VEC_COLORS
-                for weight, gcolor in zip(weights, colors):
-                    color = [min(1.0, c + 0.95 * g * weight ** .3) for c,g in zip(color, gcolor)]
-                changeColor(image, formatColor(*color))
+        width, height = len(self.distributionImages), len(self.distributionImages[0])
+        weights = np.zeros((len(beliefArrays), width * height))
+        for ghostWeights, beliefs, positions in zip(weights, beliefArrays, cellPositions):
+            positions = np.asarray(positions, dtype=np.int64).reshape(-1, 2)
+            xs, ys = positions[:, 0], positions[:, 1]
+            onGrid = (xs >= 0) & (xs < width) & (ys >= 0) & (ys < height)
+            np.add.at(ghostWeights, xs[onGrid] * height + ys[onGrid], np.asarray(beliefs)[onGrid])
+        self.drawBeliefWeights(weights)
+
+    def drawBeliefWeights(self, weights):
+        """
+        Colours the cells from an array of beliefs with a row per ghost and
+        a column per cell (numbered x * height + y), redrawing only the cells
+        whose colour bucket changed.
+        """
+        # Fog of war
+        colors = GHOST_VEC_COLORS[1:] # With Pacman
+        if self.capture: colors = GHOST_VEC_COLORS
+        numGhosts = min(len(weights), len(colors))
+        palette = 0.95 * np.array(colors[:numGhosts]).reshape(-1, 3)
+        color = np.minimum(1.0, np.power(np.maximum(weights[:numGhosts], 0.0), .3).T @ palette)
+        channels = (color * BELIEF_COLOR_LEVELS).astype(np.int64)
+        buckets = (channels[:, 0] << 16) | (channels[:, 1] << 8) | channels[:, 2]
+        for cell in np.flatnonzero(buckets != self.distributionBuckets).tolist():
+            changeColor(self.distributionImageList[cell], '#%06x' % buckets[cell])
+        self.distributionBuckets = buckets
         refresh()
 
 class FirstPersonPacmanGraphics(PacmanGraphics):
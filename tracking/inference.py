@@ -20,9 +20,13 @@ import game
 import bayesNet as bn
 from bayesNet import normalize
 import hunters
+import util
+import numpy as np
 from util import manhattanDistance, raiseNotDefined
 from factorOperations import joinFactorsByVariableWithCallTracking, joinFactors
 from factorOperations import eliminateWithCallTracking
+from forwardFilter import ForwardFilter
+import particleSampling
 
 ########### ########### ###########
 ########### QUESTION 1  ###########
@@ -182,7 +186,14 @@ def inferenceByVariableEliminationWithCallTracking(callTrackingList=None):
             eliminationOrder = sorted(list(eliminationVariables))
 
         "*** YOUR CODE HERE ***"
-        raiseNotDefined()
+        currentFactorsList = bayesNet.getAllCPTsWithEvidence(evidenceDict)
+        for eliminationVariable in eliminationOrder:
+            currentFactorsList, joinedFactor = joinFactorsByVariable(currentFactorsList, eliminationVariable)
+            # eliminating the only unconditioned variable would leave a
+            # factor of all ones, so just drop it
+            if len(joinedFactor.unconditionedVariables()) > 1:
+                currentFactorsList.append(eliminate(joinedFactor, eliminationVariable))
+        return normalize(joinFactors(currentFactorsList))
         "*** END YOUR CODE HERE ***"
 
 
@@ -268,11 +279,85 @@ class DiscreteDistribution(dict):
     """
     A DiscreteDistribution models belief distributions and weight distributions
     over a finite set of discrete keys.
+
+    It caches what sampling needs (the keys and the cumulative sums of their
+    values), the total and the arg max, and drops them when the
+    distribution changes, so repeated sample, total and argMax calls on an
+    unchanged distribution cost O(log n), O(1) and O(1).  The arg max is
+    kept up to date as values are only increased, as when counting.  It
+    also has the methods of util.Counter, so it can stand in for one.
     """
+    def __init__(self, *args, **kwargs):
+        dict.__init__(self, *args, **kwargs)
+        self.__argMax = None
+        self.__changed()
+
+    def __changed(self):
+        " Drops the sampling table and total "
+        self.__keys = None
+        self.__cumulative = None
+        self.__total = None
+
     def __getitem__(self, key):
         self.setdefault(key, 0)
         return dict.__getitem__(self, key)
 
+    def __setitem__(self, key, value):
+        old = dict.get(self, key)
+        dict.__setitem__(self, key, value)
+        self.__changed()
+        if self.__argMax is not None:
+            maxKey, maxValue = self.__argMax
+            if key == maxKey:
+                if old is not None and value < old:
+                    self.__argMax = None
+                else:
+                    self.__argMax = (key, value)
+            elif value > maxValue:
+                self.__argMax = (key, value)
+            elif value == maxValue and old is not None:
+                # A tie goes to the key that came first; rather than work
+                # out which one that is, recompute when next asked.
+                self.__argMax = None
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return dict.__getitem__(self, key)
+
+    def __delitem__(self, key):
+        dict.__delitem__(self, key)
+        self.__mutated()
+
+    def __mutated(self):
+        self.__changed()
+        self.__argMax = None
+
+    def update(self, *args, **kwargs):
+        dict.update(self, *args, **kwargs)
+        self.__mutated()
+
+    def pop(self, *args):
+        value = dict.pop(self, *args)
+        self.__mutated()
+        return value
+
+    def popitem(self):
+        item = dict.popitem(self)
+        self.__mutated()
+        return item
+
+    def clear(self):
+        dict.clear(self)
+        self.__mutated()
+
+    def __ior__(self, other):
+        self.update(other)
+        return self
+
+    def __reduce__(self):
+        return (DiscreteDistribution, (dict(self),))
+
     def copy(self):
         """
         Return a copy of the distribution.
@@ -285,16 +370,20 @@ class DiscreteDistribution(dict):
         """
         if len(self.keys()) == 0:
             return None
-        all = list(self.items())
-        values = [x[1] for x in all]
-        maxIndex = values.index(max(values))
-        return all[maxIndex][0]
+        if self.__argMax is None:
+            all = list(self.items())
+            values = [x[1] for x in all]
+            maxIndex = values.index(max(values))
+            self.__argMax = all[maxIndex]
+        return self.__argMax[0]
 
     def total(self):
         """
         Return the sum of values for all keys.
         """
-        return float(sum(self.values()))
+        if self.__total is None:
+            self.__total = float(sum(self.values()))
+        return self.__total
     
     ########### ########### ###########
     ########### QUESTION 5a ###########
@@ -323,13 +412,23 @@ class DiscreteDistribution(dict):
         {}
         """
         "*** YOUR CODE HERE ***"
-        raiseNotDefined()
+        total = self.total()
+        if total == 0:
+            return
+        for key, value in list(self.items()):
+            dict.__setitem__(self, key, value / total)
+        # Scaling by a positive total keeps the arg max where it is
+        argMax = self.__argMax
+        self.__changed()
+        if argMax is not None:
+            self.__argMax = (argMax[0], dict.__getitem__(self, argMax[0]))
         "*** END YOUR CODE HERE ***"
 
-    def sample(self):
+    def sample(self, n=None):
         """
         Draw a random sample from the distribution and return the key, weighted
-        by the values associated with each key.
+        by the values associated with each key.  With n, return a list of n
+        independent samples, drawn together.
 
         >>> dist = DiscreteDistribution()
         >>> dist['a'] = 1
@@ -346,11 +445,40 @@ class DiscreteDistribution(dict):
         0.4
         >>> round(samples.count('d') * 1.0/N, 1)
         0.0
+        >>> samples = dist.sample(int(N))
+        >>> round(samples.count('b') * 1.0/N, 1)
+        0.4
         """
         "*** YOUR CODE HERE ***"
-        raiseNotDefined()
+        if self.__cumulative is None:
+            self.__keys = list(self.keys())
+            self.__cumulative = np.cumsum(np.array(list(self.values()), dtype=float))
+        cumulative = self.__cumulative
+        # side='right' never lands on a key with value 0
+        if n is None:
+            index = int(np.searchsorted(cumulative, random.random() * cumulative[-1], side='right'))
+            return self.__keys[min(index, len(cumulative) - 1)]
+        draws = np.array([random.random() for _ in range(n)]) * cumulative[-1]
+        indices = np.minimum(np.searchsorted(cumulative, draws, side='right'), len(cumulative) - 1)
+        keys = self.__keys
+        return [keys[index] for index in indices.tolist()]
         "*** END YOUR CODE HERE ***"
 
+    ###########################
+    # util.Counter interface  #
+    ###########################
+
+    # util.Counter's own methods: they read and write through __getitem__
+    # and __setitem__, so the caches stay right, and + and - build a
+    # DiscreteDistribution.
+    incrementAll = util.Counter.incrementAll
+    sortedKeys = util.Counter.sortedKeys
+    totalCount = util.Counter.totalCount
+    divideAll = util.Counter.divideAll
+    __mul__ = util.Counter.__mul__
+    __add__ = util.Counter.__add__
+    __sub__ = util.Counter.__sub__
+
 
 class InferenceModule:
     """
@@ -423,9 +551,35 @@ class InferenceModule:
         Return the probability P(noisyDistance | pacmanPosition, ghostPosition).
         """
         "*** YOUR CODE HERE ***"
-        raiseNotDefined()
+        # A ghost in jail always reads None, and only a ghost in jail does
+        if ghostPosition == jailPosition:
+            return 1.0 if noisyDistance is None else 0.0
+        if noisyDistance is None:
+            return 0.0
+        return busters.getObservationProbability(noisyDistance, manhattanDistance(pacmanPosition, ghostPosition))
         "*** END YOUR CODE HERE ***"
 
+    def getObservationProbs(self, noisyDistance, pacmanPosition, ghostPositions, jailPosition=None):
+        """
+        getObservationProb for many ghost positions at once.  ghostPositions
+        is either an (n, 2) array of positions or an integer array of cell
+        ids, indices into self.allPositions.  jailPosition defaults to this
+        module's jail.  Returns an array of the n probabilities.
+        """
+        if jailPosition is None:
+            jailPosition = self.getJailPosition()
+        ghostPositions = np.asarray(ghostPositions)
+        if ghostPositions.ndim == 1:
+            ghostPositions = self.cellPositions[ghostPositions]
+        xs, ys = ghostPositions[..., 0], ghostPositions[..., 1]
+        inJail = (xs == jailPosition[0]) & (ys == jailPosition[1])
+        if noisyDistance is None:
+            return inJail.astype(float)
+        distances = np.abs(xs - pacmanPosition[0]) + np.abs(ys - pacmanPosition[1])
+        probabilities = busters.getObservationProbabilities(noisyDistance, distances)
+        probabilities[inJail] = 0.0
+        return probabilities
+
     def setGhostPosition(self, gameState, ghostPosition, index):
         """
         Set the position of the ghost for this inference module to the specified
@@ -469,6 +623,8 @@ class InferenceModule:
         """
         self.legalPositions = [p for p in gameState.getWalls().asList(False) if p[1] > 1]
         self.allPositions = self.legalPositions + [self.getJailPosition()]
+        # cell id i is self.allPositions[i]
+        self.cellPositions = np.array(self.allPositions, dtype=np.int64)
         self.initializeUniformly(gameState)
 
     #########################
@@ -501,6 +657,14 @@ class InferenceModule:
         """
         raise NotImplementedError
 
+    def getBeliefArray(self):
+        """
+        The current beliefs as a numpy vector indexed by cell id, i.e. over
+        self.cellPositions, for displays that draw beliefs from arrays.
+        """
+        beliefs = self.getBeliefDistribution()
+        return np.array([beliefs[position] for position in self.allPositions], dtype=float)
+
 
 class ExactInference(InferenceModule):
     """
@@ -511,11 +675,17 @@ class ExactInference(InferenceModule):
         """
         Begin with a uniform distribution over legal ghost positions (i.e., not
         including the jail position).
+
+        The beliefs are kept as self.beliefVector, a numpy vector over
+        self.allPositions; self.beliefs is the DiscreteDistribution view of
+        it, rebuilt by getBeliefDistribution.
         """
-        self.beliefs = DiscreteDistribution()
-        for p in self.legalPositions:
-            self.beliefs[p] = 1.0
-        self.beliefs.normalize()
+        self.filter = ForwardFilter(self.allPositions, self.getJailPosition())
+        self.setBeliefVector(self.filter.uniform(self.legalPositions))
+
+    def setBeliefVector(self, beliefVector):
+        self.beliefVector = beliefVector
+        self.beliefs = None
     
     ########### ########### ###########
     ########### QUESTION 6  ###########
@@ -537,9 +707,9 @@ class ExactInference(InferenceModule):
         position is known.
         """
         "*** YOUR CODE HERE ***"
-        raiseNotDefined()
+        self.setBeliefVector(self.filter.observe(self.beliefVector, observation,
+                                                 gameState.getPacmanPosition()))
         "*** END YOUR CODE HERE ***"
-        self.beliefs.normalize()
     
     ########### ########### ###########
     ########### QUESTION 7  ###########
@@ -555,20 +725,31 @@ class ExactInference(InferenceModule):
         current position is known.
         """
         "*** YOUR CODE HERE ***"
-        raiseNotDefined()
+        self.setBeliefVector(self.filter.elapse(self.beliefVector, self, gameState))
         "*** END YOUR CODE HERE ***"
 
     def getBeliefDistribution(self):
+        if self.beliefs is None:
+            self.beliefs = self.filter.getDistribution(self.beliefVector, DiscreteDistribution())
         return self.beliefs
 
+    def getBeliefArray(self):
+        return self.beliefVector
+
 
 class ParticleFilter(InferenceModule):
     """
     A particle filter for approximately tracking a single ghost.
+
+    self.particles is an int32 numpy array of cell ids (indices into
+    self.allPositions), so filters with hundreds of thousands of particles
+    stay interactive.  resampling is particleSampling.SYSTEMATIC or
+    STRATIFIED.
     """
-    def __init__(self, ghostAgent, numParticles=300):
+    def __init__(self, ghostAgent, numParticles=300, resampling=particleSampling.SYSTEMATIC):
         InferenceModule.__init__(self, ghostAgent)
         self.setNumParticles(numParticles)
+        self.resampling = resampling
 
     def setNumParticles(self, numParticles):
         self.numParticles = numParticles
@@ -587,9 +768,39 @@ class ParticleFilter(InferenceModule):
         """
         self.particles = []
         "*** YOUR CODE HERE ***"
-        raiseNotDefined()
+        # Legal positions are cells 0 .. len(self.legalPositions) - 1
+        self.particles = (np.arange(self.numParticles) % len(self.legalPositions)).astype(np.int32)
         "*** END YOUR CODE HERE ***"
 
+    def initialize(self, gameState):
+        """
+        Set up the transition caches and random source for the layout, then
+        initialize the particles uniformly.  The random source is seeded
+        from the random module, so seeded games replay.
+        """
+        InferenceModule.initialize(self, gameState)
+        self.filter = ForwardFilter(self.allPositions, self.getJailPosition())
+        self.transitionSamplers = {}
+        self.randomSource = np.random.default_rng(random.getrandbits(64))
+
+    def getCellCounts(self):
+        " The number of particles on each cell "
+        return np.bincount(self.particles, minlength=len(self.allPositions))
+
+    def getTransitionSampler(self, gameState):
+        """
+        The cached particleSampling.TransitionSampler of this module's ghost
+        with Pacman where he is in gameState.
+        """
+        key = (gameState.getPacmanPosition(), type(self.ghostAgent))
+        sampler = self.transitionSamplers.get(key)
+        if sampler is None:
+            newIndices, oldIndices, probabilities = self.filter.getTransitions(self, gameState)
+            sampler = particleSampling.TransitionSampler(newIndices, oldIndices, probabilities,
+                                                         len(self.allPositions))
+            self.transitionSamplers[key] = sampler
+        return sampler
+
     def getBeliefDistribution(self):
         """
         Return the agent's current belief state, a distribution over ghost
@@ -599,8 +810,14 @@ class ParticleFilter(InferenceModule):
         This function should return a normalized distribution.
         """
         "*** YOUR CODE HERE ***"
-        raiseNotDefined()
+        counts = self.getCellCounts()
+        cells = np.flatnonzero(counts)
+        return DiscreteDistribution(zip([self.allPositions[cell] for cell in cells.tolist()],
+                                        (counts[cells] / float(len(self.particles))).tolist()))
         "*** END YOUR CODE HERE ***"
+
+    def getBeliefArray(self):
+        return self.getCellCounts() / float(len(self.particles))
     
     ########### ########### ###########
     ########### QUESTION 10 ###########
@@ -619,7 +836,13 @@ class ParticleFilter(InferenceModule):
         the DiscreteDistribution may be useful.
         """
         "*** YOUR CODE HERE ***"
-        raiseNotDefined()
+        cells = np.arange(len(self.allPositions))
+        weights = self.getCellCounts() * self.getObservationProbs(observation, gameState.getPacmanPosition(), cells)
+        if weights.sum() == 0:
+            self.initializeUniformly(gameState)
+            return
+        counts = particleSampling.resampleCounts(weights, self.numParticles, self.randomSource, self.resampling)
+        self.particles = particleSampling.particlesFromCounts(counts)
         "*** END YOUR CODE HERE ***"
     
     ########### ########### ###########
@@ -632,5 +855,199 @@ class ParticleFilter(InferenceModule):
         gameState.
         """
         "*** YOUR CODE HERE ***"
-        raiseNotDefined()
+        self.particles = self.getTransitionSampler(gameState).sample(self.particles, self.randomSource)
         "*** END YOUR CODE HERE ***"
+
+
+class JointParticleFilter(ParticleFilter):
+    """
+    JointParticleFilter tracks a joint distribution over tuples of all ghost
+    positions.
+
+    self.particles is an int32 numpy array with a row per particle and a
+    column per ghost, holding cell ids: indices into self.allPositions,
+    which is the legal positions followed by each ghost's jail.  Ghosts
+    move independently given Pacman's position, so each ghost's column is
+    moved by its own cached transition sampler.
+    """
+    def __init__(self, numParticles=600, resampling=particleSampling.SYSTEMATIC):
+        self.setNumParticles(numParticles)
+        self.resampling = resampling
+
+    def initialize(self, gameState, legalPositions):
+        """
+        Store information about the game, then initialize particles.
+        """
+        self.numGhosts = gameState.getNumAgents() - 1
+        self.ghostAgents = []
+        self.legalPositions = legalPositions
+        self.allPositions = list(legalPositions) + [self.getJailPosition(i) for i in range(self.numGhosts)]
+        self.cellPositions = np.array(self.allPositions, dtype=np.int64)
+        self.filter = ForwardFilter(self.allPositions)
+        self.transitionSamplers = {}
+        self.randomSource = np.random.default_rng(random.getrandbits(64))
+        self.initializeUniformly(gameState)
+
+    def initializeUniformly(self, gameState):
+        """
+        Spread the particles evenly over the legal positions for each ghost
+        separately, pairing them up at random; the joint state space is far
+        too large to enumerate with several ghosts.  Captured ghosts are put
+        in their jails.
+        """
+        numLegal = len(self.legalPositions)
+        evenly = (np.arange(self.numParticles) % numLegal).astype(np.int32)
+        self.particles = np.empty((self.numParticles, self.numGhosts), dtype=np.int32)
+        for i in range(self.numGhosts):
+            self.particles[:, i] = self.randomSource.permutation(evenly)
+        self.jailCapturedGhosts(gameState.getLivingGhosts()[1:])
+
+    def jailCapturedGhosts(self, living):
+        """
+        Put every ghost i with living[i] false in its jail cell in every
+        particle.
+        """
+        for i, alive in enumerate(living[:self.numGhosts]):
+            if not alive:
+                self.particles[:, i] = len(self.legalPositions) + i
+
+    def addGhostAgent(self, agent):
+        """
+        Each ghost agent is registered separately and stored (in case they
+        are different).
+        """
+        self.ghostAgents.append(agent)
+
+    def getJailPosition(self, i):
+        return (2 * i + 1, 1)
+
+    def observe(self, gameState):
+        """
+        Resample the set of particles using the likelihood of the noisy
+        observations.
+        """
+        observation = gameState.getNoisyGhostDistances()
+        self.observeUpdate(observation, gameState)
+
+    def observeUpdate(self, observation, gameState):
+        """
+        Weight every particle by the likelihood of all the ghosts' noisy
+        distances together and resample the rows; start over uniformly if
+        every particle has weight 0.  A ghost observed as None has been
+        captured, so it is moved to its jail first.
+        """
+        self.jailCapturedGhosts([distance is not None for distance in observation])
+        pacmanPosition = gameState.getPacmanPosition()
+        weights = np.ones(len(self.particles))
+        for i in range(self.numGhosts):
+            weights *= self.getObservationProbs(observation[i], pacmanPosition, self.particles[:, i],
+                                                self.getJailPosition(i))
+        if weights.sum() == 0:
+            self.initializeUniformly(gameState)
+            return
+        counts = particleSampling.resampleCounts(weights, self.numParticles, self.randomSource, self.resampling)
+        self.particles = np.repeat(self.particles, counts, axis=0)
+
+    def getTransitionSampler(self, gameState, i):
+        """
+        The cached transition sampler of ghost i with Pacman where he is in
+        gameState.  Only ghost i's own cells (the legal positions and its
+        jail) have transitions.
+        """
+        agent = self.ghostAgents[i]
+        key = (gameState.getPacmanPosition(), type(agent), i)
+        sampler = self.transitionSamplers.get(key)
+        if sampler is None:
+            # A ghost's move only depends on its own position, so the other
+            # ghosts are put at the same position.
+            getDistribution = lambda position: self.getPositionDistribution(
+                gameState, (position,) * self.numGhosts, i, agent)
+            cells = list(range(len(self.legalPositions))) + [len(self.legalPositions) + i]
+            newIndices, oldIndices, probabilities = self.filter.buildTransitions(getDistribution, cells)
+            sampler = particleSampling.TransitionSampler(newIndices, oldIndices, probabilities,
+                                                         len(self.allPositions))
+            self.transitionSamplers[key] = sampler
+        return sampler
+
+    def elapseTime(self, gameState):
+        """
+        Sample each particle's next state based on its current state and the
+        gameState.
+        """
+        particles = np.empty_like(self.particles)
+        for i in range(self.numGhosts):
+            particles[:, i] = self.getTransitionSampler(gameState, i).sample(self.particles[:, i],
+                                                                              self.randomSource)
+        self.particles = particles
+
+    def getMarginalCounts(self, i):
+        " The number of particles that put ghost i on each cell "
+        return np.bincount(self.particles[:, i], minlength=len(self.allPositions))
+
+    def getMarginalDistribution(self, i):
+        """
+        The belief distribution over ghost i's position alone.
+        """
+        counts = self.getMarginalCounts(i)
+        cells = np.flatnonzero(counts)
+        return DiscreteDistribution(zip([self.allPositions[cell] for cell in cells.tolist()],
+                                        (counts[cells] / float(len(self.particles))).tolist()))
+
+    def getBeliefDistribution(self):
+        """
+        The belief distribution over tuples of ghost positions.
+        """
+        rows, counts = np.unique(self.particles, axis=0, return_counts=True)
+        return DiscreteDistribution(zip([tuple([self.allPositions[cell] for cell in row]) for row in rows.tolist()],
+                                        (counts / float(len(self.particles))).tolist()))
+
+
+# One JointInference module is shared globally across instances of MarginalInference
+jointInference = JointParticleFilter()
+
+
+class MarginalInference(InferenceModule):
+    """
+    A wrapper around the JointInference module that returns marginal beliefs
+    about ghosts.
+    """
+    def initializeUniformly(self, gameState):
+        """
+        Set the belief state to an initial, prior value.
+        """
+        if self.index == 1:
+            jointInference.initialize(gameState, self.legalPositions)
+        jointInference.addGhostAgent(self.ghostAgent)
+
+    def observe(self, gameState):
+        """
+        Update beliefs based on the given distance observation and gameState.
+        """
+        if self.index == 1:
+            jointInference.observe(gameState)
+
+    def elapseTime(self, gameState):
+        """
+        Predict beliefs for a time step elapsing from a gameState.
+        """
+        if self.index == 1:
+            jointInference.elapseTime(gameState)
+
+    def getBeliefDistribution(self):
+        """
+        Return the marginal belief over a particular ghost by summing out the
+        others.
+        """
+        return jointInference.getMarginalDistribution(self.index - 1)
+
+    def getBeliefArray(self):
+        """
+        The marginal beliefs over this module's own cells: the legal
+        positions, which come first in the joint filter's cells too, and
+        this ghost's jail.
+        """
+        i = self.index - 1
+        counts = jointInference.getMarginalCounts(i)
+        numLegal = len(self.legalPositions)
+        counts = np.append(counts[:numLegal], counts[numLegal + i])
+        return counts / float(len(jointInference.particles))
@@ -0,0 +1,380 @@
+# junctionTree.py
+# ---------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+Junction trees for answering many queries against one Bayes net.
+
+JunctionTree compiles a BayesNet once:
+
+  - moralize: connect each variable to its parents and the parents of a
+    variable to each other;
+  - triangulate by eliminating the variables in min-fill (or min-weight)
+    order; the maximal sets {variable} + neighbours seen along the way
+    are the cliques;
+  - join the cliques into a tree by a maximum spanning tree over
+    separator sizes;
+  - multiply every CPT into one clique containing its family.
+
+Calibration passes messages (einsum products summed down to the
+separator) in toward a root and back out, after which every clique
+belief is proportional to the joint of its variables and the evidence,
+so all single-variable marginals come out of one two-pass schedule.
+
+Evidence is multiplied in as indicator vectors.  Changing it recomputes
+only the potentials of the cliques that hold the changed variables, and
+only the messages flowing away from those cliques are invalidated; the
+next query recomputes just those.
+
+If a clique table would have more than maxTableSize entries, the tree
+is not built and queries fall back to einsumInference.
+
+> tree = junctionTree.JunctionTree(bayesNet)
+> tree.setEvidence({'Observation0': 3})
+> marginals = tree.getAllMarginals()
+"""
+
+import numpy as np
+
+from bayesNet import Factor
+import einsumInference
+
+MAX_TABLE_SIZE = 10 ** 7
+
+
+class JunctionTree:
+
+    def __init__(self, bayesNet, maxTableSize=MAX_TABLE_SIZE, heuristic=einsumInference.MIN_FILL):
+        self.bayesNet = bayesNet
+        self.variables = sorted(bayesNet.variablesSet())
+        self.domains = bayesNet.variableDomainsDict()
+        self.domainSizes = dict((variable, len(self.domains[variable])) for variable in self.variables)
+        self.valueIndices = dict((variable, dict((value, i) for i, value in enumerate(self.domains[variable])))
+                                 for variable in self.variables)
+        inEdges = bayesNet.inEdges()
+        self.families = dict((variable, (variable,) + tuple(sorted(inEdges[variable])))
+                             for variable in self.variables)
+
+        self.cliques = self.findCliques(heuristic)
+        self.tableSizes = [int(np.prod([self.domainSizes[v] for v in clique])) for clique in self.cliques]
+        self.maxTableSize = maxTableSize
+        self.fallback = max(self.tableSizes) > maxTableSize
+        self.evidence = {}
+        if self.fallback:
+            return
+
+        self.buildTree()
+        self.assignFactors()
+        self.messages = {}
+
+    ################
+    # Compilation  #
+    ################
+
+    def findCliques(self, heuristic):
+        """
+        Maximal cliques of the moral graph triangulated by the elimination
+        order of the heuristic.
+        """
+        scopes = list(self.families.values())
+        order = einsumInference.getEliminationOrder(scopes, self.variables, self.domainSizes, heuristic)
+        neighbours = dict((variable, set()) for variable in self.variables)
+        for family in scopes:
+            for variable in family:
+                neighbours[variable].update(family)
+        for variable in self.variables:
+            neighbours[variable].discard(variable)
+
+        candidates = []
+        for variable in order:
+            adjacent = neighbours.pop(variable)
+            candidates.append(frozenset(adjacent | set([variable])))
+            for u in adjacent:
+                neighbours[u].discard(variable)
+                neighbours[u].update(adjacent - set([u]))
+        cliques = []
+        for clique in sorted(candidates, key=len, reverse=True):
+            if not any(clique <= other for other in cliques):
+                cliques.append(clique)
+        return [tuple(sorted(clique)) for clique in cliques]
+
+    def buildTree(self):
+        """
+        Connects the cliques by a maximum spanning tree over separator
+        sizes (Kruskal), and records for every directed edge the cliques
+        on its sending side.
+        """
+        numCliques = len(self.cliques)
+        edges = sorted(((len(set(self.cliques[i]) & set(self.cliques[j])), i, j)
+                        for i in range(numCliques) for j in range(i + 1, numCliques)),
+                       key=lambda edge: (-edge[0], edge[1], edge[2]))
+        parent = list(range(numCliques))
+
+        def find(i):
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        self.neighbours = [[] for _ in range(numCliques)]
+        for _, i, j in edges:
+            rootI, rootJ = find(i), find(j)
+            if rootI != rootJ:
+                parent[rootI] = rootJ
+                self.neighbours[i].append(j)
+                self.neighbours[j].append(i)
+
+        self.separators = {}
+        for i in range(numCliques):
+            for j in self.neighbours[i]:
+                self.separators[i, j] = tuple(sorted(set(self.cliques[i]) & set(self.cliques[j])))
+
+        # Collect order: children before parents, root (clique 0) last.
+        self.parents = {0: None}
+        order = [0]
+        for i in order:
+            for j in self.neighbours[i]:
+                if j not in self.parents:
+                    self.parents[j] = i
+                    order.append(j)
+        self.collectOrder = list(reversed(order))
+
+        self.upstream = {}
+        for i in reversed(order):
+            # Cliques below i, on its side of the edge to its parent.
+            below = set([i])
+            for j in self.neighbours[i]:
+                if self.parents.get(j) == i:
+                    below |= self.upstream[j, i]
+            if self.parents[i] is not None:
+                self.upstream[i, self.parents[i]] = below
+        for i in order:
+            p = self.parents[i]
+            if p is not None:
+                self.upstream[p, i] = set(range(numCliques)) - self.upstream[i, p]
+
+    def assignFactors(self):
+        """
+        Multiplies each CPT into the first clique holding its family.
+        """
+        self.home = {}
+        self.basePotentials = [np.ones([self.domainSizes[v] for v in clique]) for clique in self.cliques]
+        for variable in self.variables:
+            family = self.families[variable]
+            home = next(i for i, clique in enumerate(self.cliques) if set(family) <= set(clique))
+            self.home[variable] = home
+            CPT = self.bayesNet.getCPT(variable)
+            array = CPT.getArray(family)
+            # Reorder the CPT's axes to the clique's domain orders.
+            cptDomains = CPT.variableDomainsDict()
+            for axis, v in enumerate(family):
+                if cptDomains[v] is not self.domains[v] and list(cptDomains[v]) != list(self.domains[v]):
+                    positions = dict((value, i) for i, value in enumerate(cptDomains[v]))
+                    array = np.take(array, [positions[value] for value in self.domains[v]], axis=axis)
+            clique = self.cliques[home]
+            sublists, output = einsumInference.einsumArguments([clique, family], clique)
+            self.basePotentials[home] = np.einsum(self.basePotentials[home], sublists[0],
+                                                  array, sublists[1], output)
+        self.potentials = list(self.basePotentials)
+
+    ##############
+    # Evidence   #
+    ##############
+
+    def setEvidence(self, evidenceDict):
+        """
+        Replaces the evidence.  Only variables whose evidence changed are
+        absorbed again.
+        """
+        changed = dict(evidenceDict)
+        for variable in self.evidence:
+            if variable not in evidenceDict:
+                changed[variable] = None
+        self.updateEvidence(changed)
+
+    def updateEvidence(self, evidenceDict):
+        """
+        Sets or changes evidence on the given variables; a value of None
+        retracts it.  Evidence on other variables is kept.
+        """
+        touched = set()
+        for variable, value in evidenceDict.items():
+            if variable not in self.domainSizes:
+                raise ValueError("Evidence variable not in bayes net: " + str(variable))
+            if value is not None and value not in self.valueIndices[variable]:
+                raise ValueError("Evidence value " + str(value) + " not in the domain of " + str(variable))
+            if self.evidence.get(variable) == value:
+                continue
+            if value is None:
+                del self.evidence[variable]
+            else:
+                self.evidence[variable] = value
+            touched.add(variable)
+        if self.fallback or not touched:
+            return
+
+        changedCliques = set(self.home[variable] for variable in touched)
+        for i in changedCliques:
+            potential = self.basePotentials[i]
+            clique = self.cliques[i]
+            for axis, variable in enumerate(clique):
+                if variable in self.evidence and self.home[variable] == i:
+                    indicator = np.zeros(self.domainSizes[variable])
+                    indicator[self.valueIndices[variable][self.evidence[variable]]] = 1.0
+                    shape = [1] * len(clique)
+                    shape[axis] = len(indicator)
+                    potential = potential * indicator.reshape(shape)
+            self.potentials[i] = potential
+        for edge in list(self.messages):
+            if self.upstream[edge] & changedCliques:
+                del self.messages[edge]
+
+    ################
+    # Calibration  #
+    ################
+
+    def getMessage(self, i, j):
+        """
+        The message from clique i to its neighbour j: i's potential times
+        the messages into i from its other neighbours, summed down to the
+        separator.
+        """
+        message = self.messages.get((i, j))
+        if message is None:
+            scopes = [self.cliques[i]]
+            arrays = [self.potentials[i]]
+            for k in self.neighbours[i]:
+                if k != j:
+                    scopes.append(self.separators[k, i])
+                    arrays.append(self.getMessage(k, i))
+            message = self.contract(arrays, scopes, self.separators[i, j])
+            # Rescale to keep long chains away from underflow; beliefs are
+            # normalized anyway.
+            total = message.sum()
+            if total > 0:
+                message = message / total
+            self.messages[i, j] = message
+        return message
+
+    def contract(self, arrays, scopes, outputScope):
+        sublists, output = einsumInference.einsumArguments(scopes, outputScope)
+        arguments = []
+        for array, sublist in zip(arrays, sublists):
+            arguments += [array, sublist]
+        arguments.append(output)
+        return np.einsum(*arguments, optimize=len(arrays) > 2)
+
+    def calibrate(self):
+        """
+        Two-pass schedule: messages in toward the root, then back out.
+        Messages still valid from earlier calibrations are reused.
+        """
+        for i in self.collectOrder:
+            if self.parents[i] is not None:
+                self.getMessage(i, self.parents[i])
+        for i in reversed(self.collectOrder):
+            if self.parents[i] is not None:
+                self.getMessage(self.parents[i], i)
+
+    def getCliqueBelief(self, i):
+        scopes = [self.cliques[i]]
+        arrays = [self.potentials[i]]
+        for k in self.neighbours[i]:
+            scopes.append(self.separators[k, i])
+            arrays.append(self.getMessage(k, i))
+        return self.contract(arrays, scopes, self.cliques[i])
+
+    ############
+    # Queries  #
+    ############
+
+    def makeFactor(self, queryVariables, joint):
+        """
+        Normalizes a joint table over queryVariables into the factor
+        P(queryVariables | evidence), shaped as inferenceByVariableElimination
+        returns it.
+        """
+        evidenceVariables = tuple(sorted(self.evidence))
+        reducedDomains = self.bayesNet.getReducedVariableDomains(self.evidence)
+        for axis, variable in enumerate(queryVariables):
+            if variable in self.evidence:
+                raise ValueError("Query variables can't also be evidence variables: " + str(variable))
+        joint = joint.reshape(joint.shape + (1,) * len(evidenceVariables))
+        jointFactor = Factor.fromArray(queryVariables, evidenceVariables, reducedDomains,
+                                       joint, tuple(queryVariables) + evidenceVariables)
+        return jointFactor.normalize()
+
+    def query(self, queryVariables):
+        """
+        P(queryVariables | current evidence).  Variables that share a
+        clique are read off its belief; others go through einsumInference.
+        """
+        queryVariables = tuple(queryVariables)
+        if not self.fallback:
+            for i, clique in enumerate(self.cliques):
+                if set(queryVariables) <= set(clique):
+                    belief = self.getCliqueBelief(i)
+                    joint = self.contract([belief], [clique], queryVariables)
+                    return self.makeFactor(queryVariables, joint)
+        return einsumInference.inferenceByEinsum(self.bayesNet, list(queryVariables), dict(self.evidence))
+
+    def getMarginal(self, variable):
+        return self.query([variable])
+
+    def getAllMarginals(self):
+        """
+        P(variable | evidence) for every variable without evidence, from
+        one calibration.
+        """
+        marginals = {}
+        queryVariables = [variable for variable in self.variables if variable not in self.evidence]
+        if self.fallback:
+            for variable in queryVariables:
+                marginals[variable] = self.getMarginal(variable)
+            return marginals
+        self.calibrate()
+        beliefs = {}
+        for variable in queryVariables:
+            # The smallest clique holding the variable is the cheapest to sum.
+            i = min((i for i, clique in enumerate(self.cliques) if variable in clique),
+                    key=lambda i: self.tableSizes[i])
+            if i not in beliefs:
+                beliefs[i] = self.getCliqueBelief(i)
+            joint = self.contract([beliefs[i]], [self.cliques[i]], (variable,))
+            marginals[variable] = self.makeFactor((variable,), joint)
+        return marginals
+
+    ##########
+    # Memory #
+    ##########
+
+    def memoryReport(self):
+        """
+        (clique variables, table entries, bytes) for every clique, plus
+        the separators' message tables at the end of the list.
+        """
+        itemSize = np.dtype(float).itemsize
+        report = [(clique, size, size * itemSize) for clique, size in zip(self.cliques, self.tableSizes)]
+        if not self.fallback:
+            for (i, j), separator in sorted(self.separators.items()):
+                if i < j:
+                    size = int(np.prod([self.domainSizes[v] for v in separator]))
+                    report.append((separator, size, 2 * size * itemSize))
+        return report
+
+    def printMemoryReport(self):
+        report = self.memoryReport()
+        for variables, entries, numBytes in report:
+            print('%-50s %12d entries %12d bytes' % (', '.join(variables), entries, numBytes))
+        print('Total: %d bytes%s' % (sum(numBytes for _, _, numBytes in report),
+                                      ' (over the size cap, using variable elimination)' if self.fallback else ''))
@@ -52,6 +52,51 @@ import sys, types, time, random, os
 # YOUR INTERFACE TO THE PACMAN WORLD: A GameState #
 ###################################################
 
+class StateTracker:
+    """
+    Records the states generated by GameState.generateSuccessor while it is
+    active.  With retain=True the parent and child of every transition are
+    kept in a set; with retain=False only the number of generated successors
+    is counted.  Trackers are only consulted while active, so normal play
+    pays nothing:
+
+        with GameState.trackStates() as tracker:
+            agent.getAction( state )
+        numExplored = len( tracker.getStates() )
+    """
+
+    def __init__( self, retain=True ):
+        self.retain = retain
+        self.states = set()
+        self.count = 0
+
+    def record( self, parent, child ):
+        self.count += 1
+        if self.retain:
+            self.states.add( parent )
+            self.states.add( child )
+
+    def getCount( self ):
+        return self.count
+
+    def getStates( self ):
+        return self.states
+
+    def start( self ):
+        GameState.trackers.append( self )
+        return self
+
+    def stop( self ):
+        if self in GameState.trackers:
+            GameState.trackers.remove( self )
+
+    def __enter__( self ):
+        return self.start()
+
+    def __exit__( self, *exc ):
+        self.stop()
+        return False
+
 class GameState:
     """
     A GameState specifies the full game state, including the food, capsules,
@@ -71,19 +116,20 @@ class GameState:
     # Accessor methods: use these to access state data #
     ####################################################
 
-    # static variable keeps track of which states have had getLegalActions called
-    explored = set()
-    def getAndResetExplored():
-        tmp = GameState.explored.copy()
-        GameState.explored = set()
-        return tmp
-    getAndResetExplored = staticmethod(getAndResetExplored)
+    # static variable holds the active StateTrackers (see trackStates)
+    trackers = []
+    def trackStates( retain=True ):
+        """
+        Returns a StateTracker to use as a context manager around the code
+        whose generated states should be recorded.
+        """
+        return StateTracker( retain )
+    trackStates = staticmethod(trackStates)
 
     def getLegalActions( self, agentIndex=0 ):
         """
         Returns the legal actions for the agent specified.
         """
-#        GameState.explored.add(self)
         if self.isWin() or self.isLose(): return []
 
         if agentIndex == 0:  # Pacman is moving
@@ -120,8 +166,8 @@ class GameState:
         # Book keeping
         state.data._agentMoved = agentIndex
         state.data.score += state.data.scoreChange
-        GameState.explored.add(self)
-        GameState.explored.add(state)
+        for tracker in GameState.trackers:
+            tracker.record( self, state )
         return state
 
     def getLegalPacmanActions( self ):
@@ -0,0 +1,100 @@
+# particleSampling.py
+# -------------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+Sampling for particle filters whose particles are numpy arrays of cell ids.
+
+Particles only ever sit on a few hundred cells, so the work per update is
+done per cell where possible:
+
+  - resampleCounts draws how many of the new particles go to each cell
+    from per-cell weights (the number of particles on the cell times the
+    observation likelihood there).  Systematic resampling takes one
+    uniform number and is O(cells + particles); stratified resampling
+    takes one per particle.
+  - TransitionSampler holds, for every cell, its successor cells and the
+    cumulative probabilities of moving to them, padded to a fixed width,
+    so moving every particle is a comparison against its row.
+"""
+
+import numpy as np
+
+SYSTEMATIC = 'systematic'
+STRATIFIED = 'stratified'
+
+
+def resampleCounts(weights, numParticles, randomSource, method=SYSTEMATIC):
+    """
+    Numbers of particles (summing to numParticles) to put on each cell,
+    drawn in proportion to weights, which must have a positive sum.
+    """
+    cdf = np.cumsum(weights, dtype=float)
+    cdf = cdf / cdf[-1]
+    if method == SYSTEMATIC:
+        # Points (k + u) / n for k < n: the number below cdf[i] is
+        # ceil(cdf[i] * n - u).
+        u = randomSource.random()
+        below = np.ceil(cdf * numParticles - u)
+        below = np.clip(below, 0, numParticles).astype(np.int64)
+        below[-1] = numParticles
+        return np.diff(below, prepend=0)
+    if method == STRATIFIED:
+        points = (np.arange(numParticles) + randomSource.random(numParticles)) / numParticles
+        cells = np.minimum(np.searchsorted(cdf, points, side='right'), len(cdf) - 1)
+        return np.bincount(cells, minlength=len(cdf))
+    raise ValueError("Unknown resampling method: " + str(method))
+
+
+def particlesFromCounts(counts, dtype=np.int32):
+    """
+    The particle array with counts[i] particles on cell i.
+    """
+    return np.repeat(np.arange(len(counts), dtype=dtype), counts)
+
+
+class TransitionSampler:
+    """
+    Samples successor cells from a transition matrix given as arrays
+    (new cell ids, old cell ids, probabilities), as ForwardFilter builds
+    them.  Probability is renormalized over the listed successors; a cell
+    without any stays where it is.
+    """
+
+    def __init__(self, newIndices, oldIndices, probabilities, numCells):
+        order = np.argsort(oldIndices, kind='stable')
+        newIndices, oldIndices, probabilities = newIndices[order], oldIndices[order], probabilities[order]
+        rowLengths = np.bincount(oldIndices, minlength=numCells)
+        width = max(1, int(rowLengths.max()) if len(rowLengths) else 1)
+
+        self.successors = np.repeat(np.arange(numCells, dtype=np.int32)[:, None], width, axis=1)
+        # Padding entries have a cumulative probability above any draw.
+        self.cdfs = np.full((numCells, width), 2.0)
+        starts = np.cumsum(rowLengths) - rowLengths
+        columns = np.arange(len(oldIndices)) - starts[oldIndices]
+        self.successors[oldIndices, columns] = newIndices
+        totals = np.bincount(oldIndices, weights=probabilities, minlength=numCells)
+        cumulative = np.cumsum(probabilities) - np.repeat(np.cumsum(totals) - totals, rowLengths)
+        self.cdfs[oldIndices, columns] = cumulative / totals[oldIndices]
+        # Make the last successor of each cell catch every draw below 1.
+        hasSuccessors = rowLengths > 0
+        self.cdfs[hasSuccessors, rowLengths[hasSuccessors] - 1] = 1.0
+        self.cdfs[~hasSuccessors, 0] = 1.0
+
+    def sample(self, cells, randomSource):
+        """
+        One successor for each entry of cells.
+        """
+        draws = randomSource.random(len(cells))
+        columns = (self.cdfs[cells] <= draws[:, None]).sum(axis=1)
+        return self.successors[cells, columns]
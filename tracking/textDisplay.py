@@ -42,6 +42,9 @@ class NullGraphics:
     def updateDistributions(self, dist):
         pass
 
+    def updateBeliefArrays(self, beliefArrays, cellPositions):
+        pass
+
     def finish(self):
         pass
 
@@ -313,9 +313,7 @@ class Counter(dict):
         >>> a.sortedKeys()
         ['second', 'third', 'first']
         """
-        sortedItems = self.items()
-        compare = lambda x, y:  sign(y[1] - x[1])
-        sortedItems.sort(cmp=compare)
+        sortedItems = sorted(self.items(), key=lambda x: -x[1])
         return [x[0] for x in sortedItems]
 
     def totalCount(self):
@@ -408,7 +406,7 @@ class Counter(dict):
         >>> (a + b)['first']
         1
         """
-        addend = Counter()
+        addend = type(self)()
         for key in self:
             if key in y:
                 addend[key] = self[key] + y[key]
@@ -434,7 +432,7 @@ class Counter(dict):
         >>> (a - b)['first']
         -5
         """
-        addend = Counter()
+        addend = type(self)()
         for key in self:
             if key in y:
                 addend[key] = self[key] - y[key]
@@ -490,7 +488,7 @@ def nSample(distribution, values, n):
     return samples
 
 def sample(distribution, values = None):
-    if type(distribution) == Counter:
+    if isinstance(distribution, dict):
         items = sorted(distribution.items())
         distribution = [i[1] for i in items]
         values = [i[0] for i in items]
@@ -524,7 +522,7 @@ def flipCoin( p ):
 
 def chooseFromDistribution( distribution ):
     "Takes either a counter or a list of (prob, key) pairs and samples"
-    if type(distribution) == dict or type(distribution) == Counter:
+    if isinstance(distribution, dict):
         return sample(distribution)
     r = random.random()
     base = 0.0